@@ -0,0 +1,182 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Счётчики фоновых писателей
+batch_dropped = REGISTRY.counter(
+    "batch_writer_dropped", "Записи, отброшенные из-за переполнения очереди", ("writer",)
+)
+batch_written = REGISTRY.counter(
+    "batch_writer_written", "Записи, сброшенные фоновым писателем", ("writer",)
+)
+batch_failed = REGISTRY.counter(
+    "batch_writer_failed", "Записи, потерянные из-за ошибки записи", ("writer",)
+)
+
+# Запись журнала запросов
+AccessRecord = namedtuple(
+    "AccessRecord",
+    "ts method route status latency_ms client_ip user_agent locale",
+)
+
+ACCESS_LOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS access_log (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    method TEXT NOT NULL,
+    route TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    client_ip TEXT,
+    user_agent TEXT,
+    locale TEXT
+);
+CREATE INDEX IF NOT EXISTS access_log_ts ON access_log (ts);
+"""
+
+INSERT_ACCESS_RECORD = """
+INSERT INTO access_log (ts, method, route, status, latency_ms, client_ip, user_agent, locale)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class BatchWriter:
+    """Фоновый писатель: копит записи в ограниченной очереди и сбрасывает их
+    пачками из отдельного потока по размеру пачки или по истечении интервала.
+
+    При переполнении очереди запись отбрасывается и учитывается в счётчике,
+    вызывающий код никогда не блокируется.
+    """
+
+    name = "batch"
+
+    def __init__(self, queue_size, batch_size, flush_interval):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._dropped_metric = batch_dropped.labels(self.name)
+        self._written_metric = batch_written.labels(self.name)
+        self._failed_metric = batch_failed.labels(self.name)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            self._dropped_metric.inc()
+            return False
+        return True
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def open(self):
+        """Вызывается в потоке писателя перед первой записью."""
+
+    def close(self):
+        """Вызывается в потоке писателя после последней записи."""
+
+    def write_batch(self, batch):
+        raise NotImplementedError
+
+    def _run(self):
+        self.open()
+        try:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while not self._stop.is_set():
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    self._drain_into(batch, self.batch_size)
+                except queue.Empty:
+                    pass
+                if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                    self._flush(batch)
+                    batch = []
+                    deadline = time.monotonic() + self.flush_interval
+            # Досбрасываем всё, что осталось в очереди на момент остановки
+            self._drain_into(batch, self.queue.maxsize or self.queue.qsize())
+            while batch:
+                self._flush(batch[:self.batch_size])
+                batch = batch[self.batch_size:]
+        finally:
+            self.close()
+
+    def _drain_into(self, batch, limit):
+        while len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            self.write_batch(batch)
+        except Exception:
+            logger.exception("%s: не удалось записать пачку из %d записей", self.name, len(batch))
+            self._failed_metric.inc(len(batch))
+        else:
+            self._written_metric.inc(len(batch))
+
+
+class AccessLogWriter(BatchWriter):
+    """Журнал запросов в SQLite: одна транзакция executemany на пачку.
+
+    Дополнительные обработчики из `sinks` (объекты с методами `setup(conn)` и
+    `write(conn, batch)`) получают то же соединение и пишут внутри той же
+    транзакции, что и вставка пачки.
+    """
+
+    name = "access_log"
+
+    def __init__(self, path, queue_size=10000, batch_size=500, flush_interval=1.0):
+        super().__init__(queue_size, batch_size, flush_interval)
+        self.path = path
+        self.sinks = []
+        self._conn = None
+
+    def open(self):
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(ACCESS_LOG_SCHEMA)
+        for sink in self.sinks:
+            sink.setup(self._conn)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def write_batch(self, batch):
+        with self._conn:
+            self._conn.executemany(INSERT_ACCESS_RECORD, batch)
+            for sink in self.sinks:
+                sink.write(self._conn, batch)
@@ -0,0 +1,98 @@
+import asyncio
+import math
+import time
+from collections import deque
+
+from metrics import REGISTRY
+
+admission_rejected = REGISTRY.counter(
+    "admission_rejected", "Запросы, отклонённые контролем допуска", ("route", "reason")
+)
+admission_wait = REGISTRY.histogram(
+    "admission_wait_seconds", "Время ожидания допуска в очереди", ("route",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+DEFAULT_KEY = "default"
+
+
+class RouteLimiter:
+    """Ограничение одновременных запросов с ограниченной очередью ожидания.
+
+    Работает только в потоке цикла событий, поэтому без блокировок.
+    Освободившийся слот передаётся первому ожидающему напрямую.
+    """
+
+    def __init__(self, key, limit, max_queue):
+        self.key = key
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters = deque()
+        self._wait_metric = admission_wait.labels(key)
+        self._queue_full = admission_rejected.labels(key, "queue_full")
+        self._timeout = admission_rejected.labels(key, "timeout")
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    async def acquire(self, timeout):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self._queue_full.inc()
+            return False
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._timeout.inc()
+            return False
+        except BaseException:
+            # Отмена после того, как слот уже передан: возвращаем его следующему
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        self._wait_metric.observe(time.perf_counter() - started)
+        return True
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    """Контроль допуска: лимиты по маршрутам, общий лимит для остальных путей
+    и пути-исключения (проверки живости), которые никогда не отбрасываются.
+    """
+
+    def __init__(self, route_limits=None, default_limit=0, max_queue=100,
+                 queue_timeout=0.5, exempt_prefixes=(), retry_after=None):
+        self.queue_timeout = queue_timeout
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.retry_after = str(retry_after if retry_after is not None else max(1, math.ceil(queue_timeout)))
+        self.limiters = {
+            path: RouteLimiter(path, limit, max_queue)
+            for path, limit in (route_limits or {}).items()
+        }
+        self.default = RouteLimiter(DEFAULT_KEY, default_limit, max_queue) if default_limit > 0 else None
+
+    def limiter_for(self, path):
+        if path.startswith(self.exempt_prefixes):
+            return None
+        return self.limiters.get(path, self.default)
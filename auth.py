@@ -0,0 +1,25 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+import settings
+
+# Заголовок с токеном отладочных маршрутов
+DEBUG_TOKEN_HEADER = "X-Debug-Token"
+
+
+def debug_token_valid(token: Optional[str]) -> bool:
+    return bool(settings.DEBUG_TOKEN) and token is not None and hmac.compare_digest(
+        token.encode(), settings.DEBUG_TOKEN.encode()
+    )
+
+
+def require_debug_token(x_debug_token: Optional[str] = Header(None)):
+    """Зависимость отладочных маршрутов: без настроенного DEBUG_TOKEN маршруты
+    не существуют (404), с неверным токеном — 403.
+    """
+    if not settings.DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not debug_token_valid(x_debug_token):
+        raise HTTPException(status_code=403, detail="Неверный токен отладки")
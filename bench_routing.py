@@ -0,0 +1,120 @@
+"""Сравнение маршрутизации статических GET-маршрутов: обычный перебор против
+поиска по словарю (fast_routes).
+
+Меряются отдельно выбор маршрута (route_*) и полный запрос через ASGI без
+сети (request_*); между прогонами подменяется только `router.middleware_stack`.
+
+Примеры:
+    python bench_routing.py
+    python bench_routing.py --requests 20000 --path /health/live --path /info/server
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import time
+
+from starlette.routing import Match
+
+from fast_routes import StaticDispatcher
+
+DEFAULT_PATHS = ("/health/live", "/info/server", "/info/client", "/")
+
+
+def make_scope(path):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"user-agent", b"bench-routing")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+        "state": {},
+    }
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def scan(routes, scope):
+    # Тот же перебор, что в APIRouter.app
+    for route in routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return route, child_scope
+    return None
+
+
+def time_selection(select, path, count):
+    scope = make_scope(path)
+    started = time.perf_counter()
+    for _ in range(count):
+        select(scope)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+async def run(app, path, count):
+    status = None
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    started = time.perf_counter()
+    for _ in range(count):
+        await app(make_scope(path), receive, send)
+    elapsed = time.perf_counter() - started
+    return status, elapsed / count * 1e6
+
+
+async def bench(app, paths, count, rounds):
+    router = app.router
+    fallback = router.middleware_stack
+    if isinstance(fallback, StaticDispatcher):
+        fallback = fallback.fallback
+    fast = StaticDispatcher(router, fallback)
+    installed = router.middleware_stack
+    results = {}
+    for path in paths:
+        selection = {
+            "router": lambda scope: scan(router.routes, scope),
+            "fast": fast.select,
+        }
+        best = {}
+        for _ in range(rounds):
+            for name, dispatch in (("router", fallback), ("fast", fast)):
+                route_us = time_selection(selection[name], path, count)
+                router.middleware_stack = dispatch
+                status, request_us = await run(app, path, count)
+                best[f"route_{name}_us"] = min(best.get(f"route_{name}_us", route_us), route_us)
+                best[f"request_{name}_us"] = min(best.get(f"request_{name}_us", request_us), request_us)
+        results[path] = {"status": status, **{key: round(value, 2) for key, value in best.items()}}
+        results[path]["saved_us"] = round(best["route_router_us"] - best["route_fast_us"], 2)
+    router.middleware_stack = installed
+    return {"routes": len(router.routes), "requests": count, "rounds": rounds, "paths": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main:app", help="приложение в виде модуль:атрибут")
+    parser.add_argument("--path", action="append", help="статический путь (можно несколько раз)")
+    parser.add_argument("--requests", type=int, default=5000, help="запросов на путь за раунд")
+    parser.add_argument("--rounds", type=int, default=3, help="раундов; берётся лучший")
+    args = parser.parse_args(argv)
+
+    module_name, _, attribute = args.app.partition(":")
+    app = getattr(importlib.import_module(module_name), attribute or "app")
+    report = asyncio.run(bench(app, args.path or DEFAULT_PATHS, args.requests, args.rounds))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
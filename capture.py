@@ -0,0 +1,107 @@
+import json
+import os
+import random
+import time
+
+from starlette.requests import Request
+
+from access_log import BatchWriter
+
+# Заголовки, которые не попадают в запись трафика
+REDACTED_HEADERS = frozenset(("authorization", "cookie", "x-debug-token", "proxy-authorization"))
+
+
+def capture_record(request, status, started, duration_ms):
+    """Строка записи трафика: всё, что нужно для воспроизведения запроса."""
+    return {
+        "ts": started,
+        "method": request.method,
+        "path": request.url.path,
+        "query": request.url.query,
+        "headers": {
+            name: value
+            for name, value in request.headers.items()
+            if name not in REDACTED_HEADERS
+        },
+        "status": status,
+        "duration_ms": round(duration_ms, 3),
+    }
+
+
+class CaptureMiddleware:
+    """ASGI-слой выборочной записи трафика в `capture()`.
+
+    Пока запись выключена или запрос не попал в выборку, вызов сразу
+    уходит приложению; запись создаётся по началу ответа.
+    """
+
+    def __init__(self, app, capture, enabled):
+        self.app = app
+        self.capture = capture
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled():
+            return await self.app(scope, receive, send)
+        capture = self.capture()
+        if not capture.sampled():
+            return await self.app(scope, receive, send)
+        started_at = time.time()
+        started = time.perf_counter()
+
+        async def send_and_capture(message):
+            if message["type"] == "http.response.start":
+                duration_ms = (time.perf_counter() - started) * 1000
+                capture.submit(capture_record(Request(scope), message["status"], started_at, duration_ms))
+            await send(message)
+
+        await self.app(scope, receive, send_and_capture)
+
+
+class TrafficCapture(BatchWriter):
+    """Выборочная запись входящих запросов в JSONL.
+
+    Строки сериализуются и пишутся пачками из фонового потока; когда файл
+    превышает `max_bytes`, он переименовывается в `<path>.1` (старые копии
+    сдвигаются до `<path>.<backups>`), и запись продолжается в новый файл.
+    """
+
+    name = "capture"
+
+    def __init__(self, path, sample_rate=1.0, max_bytes=64 * 1024 * 1024, backups=5,
+                 queue_size=10000, batch_size=500, flush_interval=1.0):
+        super().__init__(queue_size, batch_size, flush_interval)
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = None
+
+    def sampled(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def open(self):
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1024 * 1024)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def write_batch(self, batch):
+        self._file.write("".join(json.dumps(item, ensure_ascii=False) + "\n" for item in batch))
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        self.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.open()
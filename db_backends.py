@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from deadlines import Deadline, DeadlineExceeded, sqlite_deadline
+from metrics import REGISTRY
+from server_timing import phase
+from threadpool import run_sync
+
+try:
+    import duckdb
+except ImportError:  # DuckDB необязателен
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+backend_probe_seconds = REGISTRY.histogram(
+    "database_probe_seconds", "Длительность проверки версии хранилища", ("backend",)
+)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class BackendUnavailable(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Пул соединений фиксированного размера; соединения создаются лениво."""
+
+    def __init__(self, factory, size=4):
+        self.factory = factory
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self.factory()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"нет свободного соединения за {timeout:g} с") from None
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self, timeout=None):
+        with phase("db-connect"):
+            conn = self._acquire(timeout)
+        try:
+            yield conn
+        except (sqlite3.InterfaceError, sqlite3.ProgrammingError):
+            # Соединение в неизвестном состоянии — не возвращаем его в пул
+            self._discard(conn)
+            raise
+        except BaseException:
+            self._idle.put(conn)
+            raise
+        else:
+            self._idle.put(conn)
+
+    def stats(self):
+        idle = self._idle.qsize()
+        return {"size": self.size, "open": self._created, "idle": idle, "in_use": self._created - idle}
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+class Backend:
+    kind = ""
+    database = ""
+
+    def __init__(self, name, target, pool_size=4):
+        self.name = name
+        self.target = target
+        self.pool = ConnectionPool(self.connect, pool_size)
+
+    def connect(self):
+        raise NotImplementedError
+
+    def version(self, conn, deadline):
+        raise NotImplementedError
+
+    def probe(self, deadline):
+        deadline.check()
+        with self.pool.connection(deadline.remaining()) as conn:
+            return self.version(conn, deadline)
+
+    def close(self):
+        self.pool.close()
+
+
+class SQLiteBackend(Backend):
+    kind = "sqlite"
+    database = "SQLite"
+
+    def connect(self):
+        # Соединения пула переходят между рабочими потоками, но используются по одному
+        return sqlite3.connect(self.target, check_same_thread=False)
+
+    def version(self, conn, deadline):
+        with sqlite_deadline(conn, deadline), phase("db-query"):
+            return conn.execute("SELECT sqlite_version()").fetchone()[0]
+
+
+class DuckDBBackend(Backend):
+    kind = "duckdb"
+    database = "DuckDB"
+
+    def connect(self):
+        return duckdb.connect(self.target)
+
+    def version(self, conn, deadline):
+        with phase("db-query"):
+            return conn.execute("SELECT version()").fetchone()[0]
+
+
+BACKEND_KINDS = {"sqlite": SQLiteBackend}
+if duckdb is not None:
+    BACKEND_KINDS["duckdb"] = DuckDBBackend
+
+
+def parse_backends(spec, pool_size=4):
+    """Хранилища из строки "имя=вид:путь,...", например
+    "main=sqlite:example.db,scratch=sqlite::memory:,olap=duckdb:analytics.duckdb".
+    """
+    backends = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, rest = item.partition("=")
+        kind, _, target = rest.partition(":")
+        backend_class = BACKEND_KINDS.get(kind.strip())
+        if backend_class is None:
+            if kind.strip() == "duckdb":
+                logger.warning("Хранилище %s пропущено: пакет duckdb не установлен", name)
+                continue
+            raise ValueError(f"Неизвестный вид хранилища: {kind!r}")
+        backends.append(backend_class(name.strip(), target.strip(), pool_size))
+    return backends
+
+
+def backend_status(backend, version=None):
+    """Сведения о хранилище в форме результата проверки (BackendInfo)."""
+    return {"name": backend.name, "database": backend.database, "target": backend.target,
+            "status": "ok", "version": version, "error": None}
+
+
+class BackendRegistry:
+    """Набор настроенных хранилищ; первое считается основным."""
+
+    def __init__(self, backends):
+        if not backends:
+            raise ValueError("Не настроено ни одного хранилища")
+        self.backends = {backend.name: backend for backend in backends}
+
+    @property
+    def primary(self):
+        return next(iter(self.backends.values()))
+
+    def get(self, name):
+        return self.backends[name]
+
+    async def probe(self, backend, deadline, timeout):
+        """Версия одного хранилища в пределах собственного тайм-аута и общего
+        бюджета запроса; зависший поток бросается, а работа SQLite прерывается.
+        """
+        budget = min(timeout, deadline.remaining()) if deadline is not None else timeout
+        result = backend_status(backend)
+        started = time.perf_counter()
+        try:
+            result["version"] = await asyncio.wait_for(
+                run_sync(backend.probe, Deadline(budget), abandon_on_cancel=True), budget
+            )
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            result["status"] = "timeout"
+            result["error"] = f"нет ответа за {budget:g} с"
+        except Exception as exc:
+            result["status"] = "error"
+            result["error"] = str(exc) or type(exc).__name__
+        backend_probe_seconds.labels(backend.name).observe(time.perf_counter() - started)
+        return result
+
+    async def probe_all(self, deadline=None, timeout=1.0):
+        return await asyncio.gather(*(
+            self.probe(backend, deadline, timeout) for backend in self.backends.values()
+        ))
+
+    def close(self):
+        for backend in self.backends.values():
+            backend.close()
@@ -0,0 +1,136 @@
+import heapq
+import itertools
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import REGISTRY
+
+request_timeouts = REGISTRY.counter(
+    "request_timeouts", "Запросы, прерванные по истечении бюджета времени", ("route",)
+)
+
+# Заголовок, которым клиент может сократить бюджет времени запроса (секунды)
+TIMEOUT_HEADER = "X-Request-Timeout"
+
+# Как часто SQLite вызывает обработчик прогресса (в инструкциях виртуальной машины)
+PROGRESS_STEPS = 1000
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, budget):
+        super().__init__(f"Превышен бюджет времени запроса: {budget:g} с")
+        self.budget = budget
+
+
+class Deadline:
+    __slots__ = ("budget", "expires_at")
+
+    def __init__(self, budget, now=None):
+        self.budget = budget
+        self.expires_at = (time.monotonic() if now is None else now) + budget
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        if self.expired:
+            raise DeadlineExceeded(self.budget)
+
+
+def request_budget(path, header_value, route_budgets, default_budget):
+    """Бюджет запроса: бюджет маршрута, который клиент может только сократить."""
+    budget = route_budgets.get(path, default_budget)
+    if header_value:
+        try:
+            requested = float(header_value)
+        except ValueError:
+            requested = None
+        if requested is not None and requested > 0:
+            budget = min(budget, requested)
+    return budget
+
+
+class InterruptWatchdog:
+    """Один фоновый поток, прерывающий соединения SQLite по истечении срока.
+
+    Обработчик прогресса сам останавливает выполняющийся запрос, а сторож
+    нужен, когда поток завис в вводе-выводе и инструкции не выполняются.
+    """
+
+    def __init__(self):
+        self._heap = []
+        # Ожидающие прерывания соединения по токену; cancel() убирает запись
+        # до возврата соединения в пул, поэтому сторож не прервёт чужой запрос
+        self._active = {}
+        self._ids = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def watch(self, conn, expires_at):
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sqlite-watchdog", daemon=True)
+                self._thread.start()
+            token = next(self._ids)
+            self._active[token] = conn
+            heapq.heappush(self._heap, (expires_at, token))
+            self._condition.notify()
+        return token
+
+    def cancel(self, token):
+        with self._condition:
+            self._active.pop(token, None)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                expires_at, token = self._heap[0]
+                if token not in self._active:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = expires_at - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                conn = self._active.pop(token)
+                # Прерывание под блокировкой: cancel() не может завершиться,
+                # пока соединение прерывается
+                try:
+                    conn.interrupt()
+                except sqlite3.ProgrammingError:
+                    # Соединение уже закрыто — прерывать нечего
+                    pass
+                del conn
+
+
+watchdog = InterruptWatchdog()
+
+
+@contextmanager
+def sqlite_deadline(conn, deadline):
+    """Прерывает работу SQLite на соединении `conn` по истечении `deadline`."""
+    if deadline is None:
+        yield conn
+        return
+    deadline.check()
+    expires_at = deadline.expires_at
+    conn.set_progress_handler(lambda: time.monotonic() >= expires_at, PROGRESS_STEPS)
+    token = watchdog.watch(conn, expires_at)
+    try:
+        yield conn
+    except sqlite3.OperationalError as exc:
+        if deadline.expired and "interrupted" in str(exc):
+            raise DeadlineExceeded(deadline.budget) from exc
+        raise
+    finally:
+        watchdog.cancel(token)
+        conn.set_progress_handler(None, 0)
@@ -0,0 +1,140 @@
+"""Схема OpenAPI и страницы документации как заранее подготовленные ответы.
+
+Схему можно собрать при сборке образа и положить рядом с приложением:
+    python docs_assets.py --app main:app --output openapi.json
+"""
+import argparse
+import gzip
+import hashlib
+import importlib
+import json
+import mimetypes
+import os
+import sys
+
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import Response
+
+# Версионированные ресурсы не меняются, остальное перепроверяется по ETag
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Меньше этого сжатие не окупается
+MIN_GZIP_SIZE = 1024
+
+
+def accepts_gzip(request):
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
+class StaticAsset:
+    """Тело ответа, его сжатая копия и ETag, вычисленные один раз."""
+
+    def __init__(self, body, media_type, cache_control=REVALIDATE):
+        self.body = body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.etag = f'"{self.digest[:32]}"'
+        compressed = gzip.compress(body, compresslevel=9, mtime=0) if len(body) >= MIN_GZIP_SIZE else None
+        self.gzipped = compressed if compressed is not None and len(compressed) < len(body) else None
+
+    @property
+    def version(self):
+        return self.digest[:12]
+
+    def respond(self, request):
+        headers = {"ETag": self.etag, "Cache-Control": self.cache_control}
+        if self.gzipped is not None:
+            headers["Vary"] = "Accept-Encoding"
+        if self.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        body = self.body
+        if self.gzipped is not None and accepts_gzip(request):
+            body = self.gzipped
+            headers["Content-Encoding"] = "gzip"
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+def serialize_schema(schema):
+    return json.dumps(schema, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class DocsAssets:
+    """Схема OpenAPI, страницы /docs и /redoc и их ресурсы из локального каталога.
+
+    Всё готовится в `build()` при запуске; если схема собрана заранее
+    (`schema_path`), она берётся из файла как есть.
+    """
+
+    def __init__(self, app, assets_dir, prefix="/docs-assets", openapi_url="/openapi.json", schema_path=""):
+        self.app = app
+        self.assets_dir = assets_dir
+        self.prefix = prefix
+        self.openapi_url = openapi_url
+        self.schema_path = schema_path
+        self.schema = None
+        self.pages = {}
+        self.files = {}
+
+    @property
+    def ready(self):
+        return self.schema is not None
+
+    def build(self):
+        for name in sorted(os.listdir(self.assets_dir)):
+            path = os.path.join(self.assets_dir, name)
+            media_type = mimetypes.guess_type(name)[0]
+            if media_type is None or not os.path.isfile(path):
+                continue
+            with open(path, "rb") as file:
+                self.files[name] = StaticAsset(file.read(), media_type, IMMUTABLE)
+        if self.schema_path and os.path.exists(self.schema_path):
+            with open(self.schema_path, "rb") as file:
+                schema = file.read()
+        else:
+            schema = serialize_schema(self.app.openapi())
+        title = self.app.title
+        self.pages["docs"] = self._page(get_swagger_ui_html(
+            openapi_url=self.openapi_url,
+            title=f"{title} - Swagger UI",
+            swagger_js_url=self.url("swagger-ui-bundle.js"),
+            swagger_css_url=self.url("swagger-ui.css"),
+            swagger_favicon_url=self.url("favicon.png"),
+        ))
+        self.pages["redoc"] = self._page(get_redoc_html(
+            openapi_url=self.openapi_url,
+            title=f"{title} - ReDoc",
+            redoc_js_url=self.url("redoc.standalone.js"),
+            redoc_favicon_url=self.url("favicon.png"),
+            with_google_fonts=False,
+        ))
+        self.schema = StaticAsset(schema, "application/json")
+        return self
+
+    def url(self, name):
+        return f"{self.prefix}/{name}?v={self.files[name].version}"
+
+    @staticmethod
+    def _page(response):
+        return StaticAsset(bytes(response.body), "text/html; charset=utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main:app", help="приложение в виде модуль:атрибут")
+    parser.add_argument("--output", default="-", help="файл схемы ('-' — стандартный вывод)")
+    args = parser.parse_args(argv)
+
+    module_name, _, attribute = args.app.partition(":")
+    app = getattr(importlib.import_module(module_name), attribute or "app")
+    schema = serialize_schema(app.openapi())
+    if args.output == "-":
+        sys.stdout.buffer.write(schema)
+    else:
+        with open(args.output, "wb") as file:
+            file.write(schema)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import json
+from functools import lru_cache
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.exception_handlers import http_exception_handler
+from fastapi.responses import Response
+
+from metrics import REGISTRY
+
+# Ответы об ошибках, закодированные заранее на каждом поддерживаемом языке.
+# Частые ошибки (404 от сканеров, 405, 422) не проходят через сборку словаря
+# и jsonable_encoder, а счётчики для них связаны с метками заранее.
+
+DEFAULT_LANGUAGE = "ru"
+
+MESSAGES = {
+    404: {"ru": "Не найдено", "en": "Not Found"},
+    405: {"ru": "Метод не поддерживается", "en": "Method Not Allowed"},
+    422: {"ru": "Ошибка проверки запроса", "en": "Request validation failed"},
+}
+
+SUPPORTED_LANGUAGES = frozenset(language for messages in MESSAGES.values() for language in messages)
+
+# Стандартные описания Starlette: только такие исключения подменяются
+# заготовками, собственные описания маршрутов отдаются как есть
+DEFAULT_DETAILS = {404: "Not Found", 405: "Method Not Allowed"}
+
+http_errors = REGISTRY.counter("http_errors", "Ответы об ошибках клиента по кодам", ("status",))
+
+
+@lru_cache(maxsize=256)
+def negotiate(locale):
+    """Первый поддерживаемый язык из значения Accept-Language, сохранённого set_locale."""
+    for item in (locale or "").split(","):
+        language = item.split(";", 1)[0].strip().lower().split("-", 1)[0]
+        if language in SUPPORTED_LANGUAGES:
+            return language
+    return DEFAULT_LANGUAGE
+
+
+def request_language(request):
+    return negotiate(getattr(request.state, "locale", None))
+
+
+def _encode(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class ErrorResponses:
+    def __init__(self):
+        self.bodies = {
+            (status, language): _encode({"detail": message})
+            for status, messages in MESSAGES.items()
+            for language, message in messages.items()
+        }
+        # Хвост тела 422 после списка ошибок
+        self.validation_tails = {
+            language: b',"message":' + _encode(message) + b"}"
+            for language, message in MESSAGES[422].items()
+        }
+        self.counters = {status: http_errors.labels(status) for status in (404, 405, 422)}
+
+    def body(self, status, language):
+        return self.bodies.get((status, language)) or self.bodies[status, DEFAULT_LANGUAGE]
+
+    async def http_exception(self, request, exc):
+        status = exc.status_code
+        if DEFAULT_DETAILS.get(status) != exc.detail:
+            http_errors.labels(status).inc()
+            return await http_exception_handler(request, exc)
+        self.counters[status].inc()
+        return Response(
+            self.body(status, request_language(request)),
+            status_code=status,
+            headers=exc.headers,
+            media_type="application/json",
+        )
+
+    async def validation_error(self, request, exc):
+        self.counters[422].inc()
+        language = request_language(request)
+        errors = json.dumps(
+            exc.errors(), ensure_ascii=False, separators=(",", ":"), default=jsonable_encoder
+        ).encode()
+        tail = self.validation_tails.get(language) or self.validation_tails[DEFAULT_LANGUAGE]
+        return Response(b'{"detail":' + errors + tail, status_code=422, media_type="application/json")
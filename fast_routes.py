@@ -0,0 +1,76 @@
+from starlette.routing import Host, Match, Mount, Route, get_route_path
+
+# Быстрая диспетчеризация статических GET-маршрутов: вместо перебора всех
+# маршрутов по регулярным выражениям путь ищется в словаре, и проверяется
+# только найденный маршрут. Обработчик, зависимости и response_model те же,
+# а всё, что не нашлось в словаре, уходит в обычный маршрутизатор.
+
+
+def static_get_routes(routes):
+    """Путь → маршрут для GET-запросов, которые обычный маршрутизатор отдал бы
+    именно этому статическому маршруту (с учётом порядка объявления).
+    """
+    table = {}
+    claimed = []
+    for route in routes:
+        if isinstance(route, Host):
+            # Маршрутизация по хосту не сводится к пути — дальше не заглядываем
+            break
+        if isinstance(route, Route) and not route.param_convertors and "GET" in (route.methods or ()):
+            path = route.path
+            if path not in table and not any(earlier.path_regex.match(path) for earlier in claimed):
+                table[path] = route
+        if isinstance(route, (Route, Mount)) and (
+            isinstance(route, Mount) or route.methods is None or "GET" in route.methods
+        ):
+            claimed.append(route)
+    return table
+
+
+class StaticDispatcher:
+    """ASGI-приложение на месте `router.middleware_stack`.
+
+    Таблица строится при первом запросе и перестраивается, если набор
+    маршрутов изменился.
+    """
+
+    def __init__(self, router, fallback=None):
+        self.router = router
+        self.fallback = fallback if fallback is not None else router.middleware_stack
+        self.table = {}
+        self._routes_count = None
+
+    def rebuild(self):
+        self.table = static_get_routes(self.router.routes)
+        self._routes_count = len(self.router.routes)
+
+    def select(self, scope):
+        """Маршрут и дочерняя область запроса либо None, если решать обычному маршрутизатору."""
+        if self._routes_count != len(self.router.routes):
+            self.rebuild()
+        route = self.table.get(get_route_path(scope))
+        if route is None:
+            return None
+        match, child_scope = route.matches(scope)
+        if match != Match.FULL:
+            return None
+        return route, child_scope
+
+    async def __call__(self, scope, receive, send):
+        # Запросы с телеметрией FastAPI идут обычным путём: он отмечает выбранный маршрут
+        if scope["type"] == "http" and scope["method"] == "GET" and "fastapi.telemetry" not in scope:
+            selected = self.select(scope)
+            if selected is not None:
+                route, child_scope = selected
+                if "router" not in scope:
+                    scope["router"] = self.router
+                scope.update(child_scope)
+                await route.handle(scope, receive, send)
+                return
+        await self.fallback(scope, receive, send)
+
+
+def install(router):
+    dispatcher = StaticDispatcher(router)
+    router.middleware_stack = dispatcher
+    return dispatcher
@@ -0,0 +1,153 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import REGISTRY
+
+try:
+    import maxminddb
+except ImportError:  # maxminddb необязателен
+    maxminddb = None
+
+logger = logging.getLogger(__name__)
+
+geoip_lookups = REGISTRY.counter(
+    "geoip_lookups", "Определения местоположения по IP", ("result",)
+)
+geoip_reloads = REGISTRY.counter("geoip_reloads", "Перезагрузки баз GeoIP", ("database",))
+
+
+def open_mmap(path):
+    # Файл отображается в память: поиск не делает ввода-вывода на запрос
+    return maxminddb.open_database(path, maxminddb.MODE_MMAP)
+
+
+def _name(record, key):
+    names = (record.get(key) or {}).get("names") or {}
+    return names.get("en")
+
+
+def geo_fields(record):
+    """Поля ответа из записи базы MaxMind (GeoLite2/GeoIP2 City, Country, ASN)."""
+    fields = {}
+    country = record.get("country") or {}
+    if country:
+        fields["country_code"] = country.get("iso_code")
+        fields["country"] = _name(record, "country")
+    if record.get("city"):
+        fields["city"] = _name(record, "city")
+    if "autonomous_system_number" in record:
+        fields["asn"] = record["autonomous_system_number"]
+        fields["as_org"] = record.get("autonomous_system_organization")
+    return fields
+
+
+class MMapDatabase:
+    """Одна база MaxMind с заменой читателя при замене файла.
+
+    Файл сверяется не чаще раза в `check_interval` секунд; новый читатель
+    открывается рядом со старым и подменяется одним присваиванием. Старый
+    не закрывается явно — его могут ещё использовать другие потоки, отображение
+    освобождается вместе с последней ссылкой.
+    """
+
+    def __init__(self, path, opener=open_mmap, check_interval=30.0):
+        self.path = path
+        self.opener = opener
+        self.check_interval = check_interval
+        self.generation = 0
+        self._reader = None
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def refresh(self, now=None):
+        """Перечитывает файл, если он заменён; возвращает True при перезагрузке."""
+        now = time.monotonic() if now is None else now
+        if now < self._next_check:
+            return False
+        with self._lock:
+            if now < self._next_check:
+                return False
+            self._next_check = now + self.check_interval
+            try:
+                signature = self._stat()
+                if signature == self._signature:
+                    return False
+                reader = self.opener(self.path)
+            except Exception as exc:
+                # Остаёмся на прежнем читателе, если он есть
+                logger.warning("База GeoIP %s не загружена: %s", self.path, exc)
+                return False
+            self._reader, self._signature = reader, signature
+            self.generation += 1
+        geoip_reloads.labels(os.path.basename(self.path)).inc()
+        logger.info("База GeoIP %s загружена (поколение %d)", self.path, self.generation)
+        return True
+
+    def get(self, ip):
+        reader = self._reader
+        if reader is None:
+            return None
+        return reader.get(ip)
+
+
+class GeoIPResolver:
+    """Страна, город и ASN клиента по локальным базам MaxMind.
+
+    Результаты кэшируются в ограниченном LRU; кэш сбрасывается, когда
+    перезагружается любая из баз.
+    """
+
+    def __init__(self, databases, cache_size=4096):
+        self.databases = databases
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.databases)
+
+    def lookup(self, ip):
+        if not self.databases:
+            return None
+        if any([database.refresh() for database in self.databases]):
+            with self._lock:
+                self._cache.clear()
+        with self._lock:
+            if ip in self._cache:
+                self._cache.move_to_end(ip)
+                geoip_lookups.labels("cached").inc()
+                return self._cache[ip]
+        fields = {}
+        try:
+            for database in self.databases:
+                record = database.get(ip)
+                if record:
+                    fields.update(geo_fields(record))
+        except ValueError:
+            # Не IP-адрес (например, "testclient")
+            fields = {}
+        result = fields or None
+        geoip_lookups.labels("found" if result else "not_found").inc()
+        with self._lock:
+            self._cache[ip] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+
+def build_resolver(paths, cache_size=4096, check_interval=30.0):
+    if paths and maxminddb is None:
+        logger.warning("GeoIP отключён: пакет maxminddb не установлен")
+        paths = []
+    return GeoIPResolver(
+        [MMapDatabase(path, check_interval=check_interval) for path in paths], cache_size
+    )
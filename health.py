@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Ответ проверки живости: постоянный, без ввода-вывода
+LIVE_BODY = b'{"status":"ok"}'
+
+
+class HealthMonitor:
+    """Периодически выполняет проверки подсистем в фоновом потоке и хранит
+    готовый к отправке результат, так что частые пробы ничего не стоят.
+
+    Проверка — функция без аргументов; она возвращает строку с описанием,
+    если всё в порядке, и бросает исключение, если нет.
+    """
+
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.checks = {}
+        # (код ответа, тело JSON) последнего прогона проверок
+        self.result = (503, json.dumps({"status": "starting", "checks": {}}).encode())
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_check(self, name, check):
+        self.checks[name] = check
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            self.run_checks()
+            if self._stop.wait(self.interval):
+                break
+
+    def run_checks(self):
+        results = {}
+        for name, check in self.checks.items():
+            started = time.perf_counter()
+            try:
+                detail = check()
+                ok = True
+            except Exception as exc:
+                detail = str(exc) or type(exc).__name__
+                ok = False
+                logger.warning("Проверка готовности %s не пройдена: %s", name, detail)
+            results[name] = {
+                "ok": ok,
+                "detail": detail,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+        ready = all(result["ok"] for result in results.values())
+        body = {"status": "ready" if ready else "not_ready", "checked_at": time.time(), "checks": results}
+        self.result = (200 if ready else 503, json.dumps(body, ensure_ascii=False).encode())
+        return self.result
+
+
+class LoopLagProbe:
+    """Задача в цикле событий, измеряющая задержку планирования.
+
+    Поток проверок читает наибольшую задержку с прошлой проверки (`peak`)
+    и время последнего срабатывания: если цикл заблокирован прямо сейчас,
+    сердцебиение перестаёт обновляться.
+    """
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.lag = 0.0
+        self.peak = 0.0
+        self.last_beat = None
+        self._task = None
+
+    def start(self):
+        self.last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.lag = max(0.0, now - expected)
+            self.peak = max(self.peak, self.lag)
+            self.last_beat = now
+            self.observe(self.lag)
+
+    def observe(self, lag):
+        """Точка расширения: вызывается в цикле событий после каждого замера."""
+
+    def check(self, max_lag):
+        if self.last_beat is None:
+            raise RuntimeError("измерение задержки не запущено")
+        stalled = time.monotonic() - self.last_beat - self.interval
+        lag = max(self.peak, stalled)
+        self.peak = 0.0
+        if lag > max_lag:
+            raise RuntimeError(f"задержка цикла событий {lag * 1000:.0f} мс")
+        return f"задержка {lag * 1000:.1f} мс"
+
+
+def thread_check(name, component):
+    """Проверка того, что фоновый поток компонента работает."""
+    def check():
+        if not component.running:
+            raise RuntimeError(f"{name} не запущен")
+        return "работает"
+    return check
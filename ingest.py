@@ -0,0 +1,293 @@
+import asyncio
+import itertools
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from db_backends import ConnectionPool, SQLiteBackend
+from server_timing import phase
+from threadpool import run_sync
+
+logger = logging.getLogger(__name__)
+
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+# Диапазон INTEGER в SQLite: знаковое 64-битное целое
+SQLITE_INT_MIN = -2 ** 63
+SQLITE_INT_MAX = 2 ** 63 - 1
+
+# Сколько ошибок строк сохраняется в отчёте
+MAX_REPORTED_ERRORS = 20
+
+
+class IngestError(Exception):
+    pass
+
+
+class LineSplitter:
+    """Инкрементальное разбиение потока байтов на строки NDJSON.
+
+    В буфере хранится только незавершённая строка, поэтому память не зависит
+    от размера загрузки; слишком длинная строка считается ошибкой.
+    """
+
+    def __init__(self, max_line_bytes):
+        self.max_line_bytes = max_line_bytes
+        self._buffer = bytearray()
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        start = 0
+        while True:
+            end = self._buffer.find(b"\n", start)
+            if end < 0:
+                break
+            yield bytes(self._buffer[start:end])
+            start = end + 1
+        del self._buffer[:start]
+        if len(self._buffer) > self.max_line_bytes:
+            raise IngestError(f"строка длиннее {self.max_line_bytes} байт")
+
+    def finish(self):
+        if self._buffer.strip():
+            yield bytes(self._buffer)
+        self._buffer.clear()
+
+
+class TableSchema:
+    def __init__(self, conn, table):
+        rows = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+        if not rows:
+            raise LookupError(table)
+        self.table = table
+        self.columns = {row[1] for row in rows}
+        # NOT NULL без значения по умолчанию (кроме INTEGER PRIMARY KEY — это rowid)
+        self.required = {
+            name for _, name, type_, notnull, default, pk in rows
+            if notnull and default is None and not (pk and type_.upper() == "INTEGER")
+        }
+
+    def validate(self, row):
+        if not isinstance(row, dict):
+            raise ValueError("строка должна быть объектом JSON")
+        unknown = row.keys() - self.columns
+        if unknown:
+            raise ValueError(f"неизвестные столбцы: {', '.join(sorted(unknown))}")
+        missing = self.required - row.keys()
+        if missing:
+            raise ValueError(f"нет обязательных столбцов: {', '.join(sorted(missing))}")
+        for name, value in row.items():
+            if not isinstance(value, SCALAR_TYPES):
+                raise ValueError(f"столбец {name}: ожидается скалярное значение")
+            if isinstance(value, int) and not SQLITE_INT_MIN <= value <= SQLITE_INT_MAX:
+                raise ValueError(f"столбец {name}: целое вне 64-битного диапазона")
+
+
+class IngestJob:
+    """Состояние одной загрузки: пишет в своё соединение из рабочих потоков."""
+
+    def __init__(self, job_id, backend, pool, table, batch_size, commit_interval, timeout=None):
+        self.id = job_id
+        self.backend = backend
+        self.pool = pool
+        self.table = table
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.timeout = timeout
+        self.status = "running"
+        self.lines = 0
+        self.rows = 0
+        self.rejected = 0
+        self.batches = 0
+        self.commits = 0
+        self.errors = []
+        self.started = time.time()
+        self.finished = None
+        self.schema = None
+        self._conn_context = None
+        self._conn = None
+        self._last_commit = time.monotonic()
+
+    def open(self):
+        self._conn_context = self.pool.connection(self.timeout)
+        self._conn = self._conn_context.__enter__()
+        try:
+            self.schema = TableSchema(self._conn, self.table)
+        except BaseException:
+            self.close()
+            raise
+
+    def reject(self, line_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "error": message})
+
+    def write_batch(self, rows):
+        """Вставка порции в открытую транзакцию; фиксация — по интервалу."""
+        groups = defaultdict(list)
+        for row in rows:
+            groups[tuple(sorted(row))].append(row)
+        for columns, group in groups.items():
+            names = ", ".join(f'"{name}"' for name in columns)
+            marks = ", ".join("?" for _ in columns)
+            with phase("db-query"):
+                self._conn.executemany(
+                    f'INSERT INTO "{self.table}" ({names}) VALUES ({marks})',
+                    [tuple(row[name] for name in columns) for row in group],
+                )
+        self.rows += len(rows)
+        self.batches += 1
+        if time.monotonic() - self._last_commit >= self.commit_interval:
+            self.commit()
+        logger.info("Загрузка %s: порция %d, строк %d, отклонено %d",
+                    self.id, self.batches, self.rows, self.rejected)
+
+    def commit(self):
+        self._conn.commit()
+        self.commits += 1
+        self._last_commit = time.monotonic()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        if self._conn_context is not None:
+            self._conn_context.__exit__(None, None, None)
+            self._conn_context = None
+            self._conn = None
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "backend": self.backend.name,
+            "table": self.table,
+            "status": self.status,
+            "lines": self.lines,
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "commits": self.commits,
+            "batch_size": self.batch_size,
+            "commit_interval": self.commit_interval,
+            "elapsed_s": round((self.finished or time.time()) - self.started, 3),
+            "errors": list(self.errors),
+        }
+
+
+class Ingestor:
+    """Потоковая загрузка NDJSON в таблицы SQLite.
+
+    Пока одна порция вставляется в рабочем потоке, следующая уже разбирается
+    из тела запроса; в памяти не больше двух порций. Загрузка держит
+    соединение всё время приёма тела, поэтому соединения берутся из
+    собственного пула (`pool_size`), а не из пула хранилища, которым
+    пользуются проверки /info/database и /health/ready.
+    """
+
+    def __init__(self, registry, pool_size=2, max_line_bytes=1024 * 1024, keep_jobs=32, timeout=5.0):
+        self.registry = registry
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_line_bytes = max_line_bytes
+        self.keep_jobs = keep_jobs
+        self.jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def _backend(self, name):
+        try:
+            backend = self.registry.get(name) if name else self.registry.primary
+        except KeyError:
+            raise IngestError(f"Хранилище {name} не настроено") from None
+        # У базы в памяти своё содержимое на каждое соединение
+        if not isinstance(backend, SQLiteBackend) or backend.target == ":memory:":
+            raise IngestError(f"Хранилище {backend.name} не поддерживает загрузку")
+        return backend
+
+    def _pool(self, backend):
+        with self._lock:
+            pool = self._pools.get(backend.name)
+            if pool is None:
+                pool = self._pools[backend.name] = ConnectionPool(backend.connect, self.pool_size)
+        return pool
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+
+    def _register(self, job):
+        with self._lock:
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.keep_jobs:
+                self.jobs.popitem(last=False)
+
+    def list(self):
+        with self._lock:
+            return [job.summary() for job in reversed(self.jobs.values())]
+
+    async def ingest(self, chunks, table, backend=None, batch_size=1000, commit_interval=1.0):
+        if not IDENTIFIER.match(table):
+            raise IngestError(f"Недопустимое имя таблицы: {table!r}")
+        backend = self._backend(backend)
+        job = IngestJob(f"{int(time.time())}-{next(self._ids)}", backend, self._pool(backend),
+                        table, batch_size, commit_interval, self.timeout)
+        await run_sync(job.open)
+        self._register(job)
+        splitter = LineSplitter(self.max_line_bytes)
+        pending = None
+        batch = []
+
+        async def flush(rows):
+            nonlocal pending
+            if pending is not None:
+                await pending
+            pending = asyncio.ensure_future(run_sync(job.write_batch, rows))
+
+        def accept(line):
+            job.lines += 1
+            if not line.strip():
+                return
+            try:
+                row = json.loads(line)
+                job.schema.validate(row)
+            except ValueError as exc:
+                job.reject(job.lines, str(exc))
+                return
+            batch.append(row)
+
+        try:
+            async for chunk in chunks:
+                for line in splitter.feed(chunk):
+                    accept(line)
+                    if len(batch) >= batch_size:
+                        await flush(batch)
+                        batch = []
+            for line in splitter.finish():
+                accept(line)
+            if batch:
+                await flush(batch)
+            if pending is not None:
+                await pending
+            await run_sync(job.commit)
+            job.status = "done"
+        except BaseException as exc:
+            if pending is not None and not pending.done():
+                await asyncio.wait([pending])
+            job.status = "failed"
+            job.errors.append({"line": job.lines, "error": str(exc) or type(exc).__name__})
+            await run_sync(job.rollback)
+            if isinstance(exc, sqlite3.Error):
+                raise IngestError(str(exc)) from exc
+            raise
+        finally:
+            job.finished = time.time()
+            await run_sync(job.close)
+        return job
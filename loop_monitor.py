@@ -0,0 +1,124 @@
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from starlette.requests import HTTPConnection
+
+from health import LoopLagProbe
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Наблюдение за циклом событий: сердцебиение в цикле пишет задержку
+# планирования в гистограмму, а сторожевой поток замечает, что сердцебиение
+# остановилось, и снимает стек потока цикла прямо во время блокировки —
+# в нём видна синхронная функция, которая держит цикл.
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+loop_lag = REGISTRY.histogram(
+    "event_loop_lag_seconds", "Задержка планирования цикла событий", buckets=LAG_BUCKETS
+)
+loop_blocks = REGISTRY.counter("event_loop_blocks", "Обнаруженные блокировки цикла событий")
+
+
+def request_context(frame, max_depth=64):
+    """Метод, путь и клиент запроса из ближайшего кадра стека, где он есть."""
+    depth = 0
+    while frame is not None and depth < max_depth:
+        for value in frame.f_locals.values():
+            if isinstance(value, HTTPConnection):
+                client = value.client
+                return {
+                    "method": value.scope.get("method"),
+                    "path": value.url.path,
+                    "client": client.host if client else None,
+                }
+        frame = frame.f_back
+        depth += 1
+    return None
+
+
+def describe(context):
+    if context is None:
+        return "вне запроса"
+    return f"{context['method']} {context['path']} от {context['client']}"
+
+
+class LoopMonitor(LoopLagProbe):
+    """Замер задержки цикла событий с поиском блокирующего кода.
+
+    Если сердцебиение не срабатывает дольше `interval + threshold`, стек
+    потока цикла и контекст запроса записываются в журнал — один раз на
+    блокировку и не чаще раза в `cooldown` секунд. Последние отчёты
+    хранятся в `reports`.
+    """
+
+    def __init__(self, interval=0.1, threshold=0.1, cooldown=5.0, max_depth=64, keep_reports=20):
+        super().__init__(interval)
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_depth = max_depth
+        self.reports = deque(maxlen=keep_reports)
+        self._loop_thread = None
+        self._reported_beat = None
+        self._last_report = None
+        self._stop_event = threading.Event()
+        self._watchdog = None
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        super().start()
+        self._stop_event.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop_event.set()
+        await super().stop()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    def observe(self, lag):
+        loop_lag.observe(lag)
+
+    def _watch(self):
+        poll = min(self.interval, self.threshold) / 2
+        while not self._stop_event.wait(poll):
+            self.inspect()
+
+    def inspect(self):
+        """Проверить сердцебиение из сторожевого потока; вернуть отчёт, если он записан."""
+        beat = self.last_beat
+        if beat is None or beat == self._reported_beat:
+            return None
+        now = time.monotonic()
+        blocked = now - beat - self.interval
+        if blocked < self.threshold:
+            return None
+        # Одна блокировка — одно срабатывание, даже если отчёт подавлен
+        self._reported_beat = beat
+        loop_blocks.inc()
+        if self._last_report is not None and now - self._last_report < self.cooldown:
+            return None
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return None
+        self._last_report = now
+        report = {
+            "detected_at": time.time(),
+            "blocked_ms": round(blocked * 1000, 1),
+            "request": request_context(frame, self.max_depth),
+            "stack": traceback.format_stack(frame, limit=self.max_depth),
+        }
+        del frame
+        self.reports.append(report)
+        logger.warning(
+            "Цикл событий заблокирован не меньше %.0f мс (%s), стек:\n%s",
+            report["blocked_ms"], describe(report["request"]), "".join(report["stack"]),
+        )
+        return report
@@ -1,12 +1,192 @@
-from fastapi import FastAPI, Request
-from pydantic import BaseModel
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 import platform
-import sqlite3
+import threading
+import time
 from datetime import datetime
+from typing import Dict, List, Optional, Union
 import pytz
 
+import settings
+from access_log import AccessLogWriter, AccessRecord
+from admission import AdmissionController
+from auth import debug_token_valid, require_debug_token
+from deadlines import Deadline, DeadlineExceeded, TIMEOUT_HEADER, request_budget, request_timeouts
+from capture import CaptureMiddleware, TrafficCapture
+from compact import CompactEncoder
+from db_backends import BackendRegistry, BackendUnavailable, PoolTimeout, backend_status, parse_backends
+from docs_assets import DocsAssets
+from errors import ErrorResponses
+from fast_routes import install as install_fast_path
+from geoip import build_resolver
+from health import LIVE_BODY, HealthMonitor, thread_check
+from ingest import IngestError, Ingestor
+from loop_monitor import LoopMonitor
+from memory_debug import MemoryTracer, resource_counts
+from metrics import REGISTRY
+from profiler import SamplingProfiler
+from request_profiler import ProfileStore, RequestProfileMiddleware, WorkerObserver
+from sql_query import QueryError, ReadOnlyQueries
+from server_timing import ServerTimingMiddleware, phase
+from shared_snapshots import SharedSnapshots
+from stats import RollupSink, StatsReader
+from swr_cache import CircuitBreaker, CircuitOpen, SWRCache
+from system_metrics import SystemSampler
+from threadpool import ThreadHopRoute, run_sync, thread_pools, worker_observers
+from timeseries import HistoryRecorder, RequestMeter, ServerHistory
+
+logger = logging.getLogger(__name__)
+
+# Журнал запросов с пакетной записью в SQLite из фонового потока
+access_log = AccessLogWriter(
+    settings.DATABASE_PATH,
+    queue_size=settings.ACCESS_LOG_QUEUE_SIZE,
+    batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+    flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL,
+)
+access_log.sinks.append(RollupSink())
+
+# Чтение минутных и часовых агрегатов журнала для панелей
+stats_reader = StatsReader(settings.DATABASE_PATH)
+
+# Выборочная запись трафика в JSONL (выключена по умолчанию)
+traffic_capture = TrafficCapture(
+    settings.CAPTURE_PATH,
+    sample_rate=settings.CAPTURE_SAMPLE_RATE,
+    max_bytes=settings.CAPTURE_MAX_BYTES,
+    backups=settings.CAPTURE_BACKUPS,
+)
+
+# Фоновый сбор системных метрик из /proc
+system_sampler = SystemSampler(settings.SYSTEM_SAMPLE_INTERVAL)
+
+# История метрик сервера: 1 с за 10 минут и 1 мин за сутки
+request_meter = RequestMeter()
+server_history = ServerHistory(("cpu_percent", "memory_used_percent", "request_rate", "latency_ms"))
+system_sampler.listeners.append(HistoryRecorder(server_history, request_meter))
+
+# Контроль допуска и сброс нагрузки при перегрузке
+admission = AdmissionController(
+    route_limits=settings.ADMISSION_ROUTE_LIMITS,
+    default_limit=settings.ADMISSION_DEFAULT_LIMIT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    exempt_prefixes=settings.ADMISSION_EXEMPT_PREFIXES,
+)
+
+# Настроенные хранилища данных, у каждого свой пул соединений
+database_backends = BackendRegistry(parse_backends(settings.DATABASE_BACKENDS, settings.DATABASE_POOL_SIZE))
+
+# Запросы только на чтение к файловым хранилищам SQLite
+read_only_queries = ReadOnlyQueries(
+    database_backends,
+    pool_size=settings.QUERY_POOL_SIZE,
+    cached_statements=settings.QUERY_CACHED_STATEMENTS,
+    timeout=settings.QUERY_TIMEOUT,
+)
+
+# Потоковая загрузка NDJSON в таблицы SQLite
+ingestor = Ingestor(
+    database_backends,
+    pool_size=settings.INGEST_POOL_SIZE,
+    max_line_bytes=settings.INGEST_MAX_LINE_BYTES,
+    keep_jobs=settings.INGEST_KEEP_JOBS,
+)
+
+# Местоположение клиентов по локальным базам MaxMind
+geoip = build_resolver(settings.GEOIP_DATABASES, settings.GEOIP_CACHE_SIZE, settings.GEOIP_CHECK_INTERVAL)
+
+# Готовые тела горячих ответов в разделяемой памяти, общие для рабочих процессов
+shared_snapshots = SharedSnapshots(
+    settings.SHARED_SNAPSHOT_PREFIX,
+    settings.SHARED_SNAPSHOT_LOCK,
+    interval=settings.SHARED_SNAPSHOT_INTERVAL,
+    max_age=settings.SHARED_SNAPSHOT_MAX_AGE,
+    capacity=settings.SHARED_SNAPSHOT_CAPACITY,
+)
+
+# Проверки готовности, выполняемые в фоне
+health_monitor = HealthMonitor(settings.HEALTH_CHECK_INTERVAL)
+
+# Задержка цикла событий и стеки кода, который его блокирует
+loop_lag_probe = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL,
+    threshold=settings.LOOP_BLOCK_THRESHOLD,
+    cooldown=settings.LOOP_BLOCK_COOLDOWN,
+)
+
+def check_database():
+    backend = database_backends.primary
+    backend.probe(Deadline(settings.HEALTH_DB_TIMEOUT))
+    pool = backend.pool.stats()
+    return f"{backend.name}: соединений {pool['open']} из {pool['size']}, свободно {pool['idle']}"
+
+def check_system_sampler():
+    sample = system_sampler.latest
+    if not system_sampler.running or sample is None:
+        raise RuntimeError("сборщик системных метрик не запущен")
+    age = time.time() - sample["sampled_at"]
+    if age > 3 * system_sampler.interval:
+        raise RuntimeError(f"последний снимок {age:.1f} с назад")
+    return f"снимок {age:.1f} с назад"
+
+health_monitor.add_check("database", check_database)
+health_monitor.add_check("system_sampler", check_system_sampler)
+health_monitor.add_check("event_loop", lambda: loop_lag_probe.check(settings.HEALTH_MAX_LOOP_LAG))
+if settings.ACCESS_LOG_ENABLED:
+    health_monitor.add_check("access_log", thread_check("журнал запросов", access_log))
+if settings.CAPTURE_ENABLED:
+    health_monitor.add_check("traffic_capture", thread_check("запись трафика", traffic_capture))
+
+# Запуск и остановка фоновых подсистем
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.COMPACT_RESPONSES:
+        validate_compact_encoders()
+    docs_assets.build()
+    system_sampler.start()
+    if settings.ACCESS_LOG_ENABLED:
+        access_log.start()
+    if settings.CAPTURE_ENABLED:
+        traffic_capture.start()
+    loop_lag_probe.start()
+    health_monitor.start()
+    if settings.SHARED_SNAPSHOTS:
+        shared_snapshots.start()
+    yield
+    await shared_snapshots.stop()
+    health_monitor.stop()
+    await loop_lag_probe.stop()
+    traffic_capture.stop()
+    access_log.stop()
+    system_sampler.stop()
+    read_only_queries.close()
+    ingestor.close()
+    database_backends.close()
+
 # Создание FastAPI приложения
-app = FastAPI()
+# Схема и страницы документации отдаются собственными маршрутами (см. docs_assets)
+app = FastAPI(lifespan=lifespan, openapi_url=None, docs_url=None, redoc_url=None)
+# Синхронные обработчики уходят в пул своей группы через ThreadHopRoute
+thread_pools.configure(settings.THREADPOOL_SIZE, settings.THREADPOOL_GROUPS)
+app.router.route_class = ThreadHopRoute
+# Статические GET-маршруты находятся по словарю, остальные — обычным перебором
+if settings.STATIC_FAST_PATH:
+    install_fast_path(app.router)
+
+# Схема OpenAPI и страницы документации, подготовленные при запуске
+docs_assets = DocsAssets(app, settings.DOCS_ASSETS_DIR, schema_path=settings.OPENAPI_SCHEMA_PATH)
+
+# Профили отдельных запросов (заголовок X-Profile с токеном отладки)
+request_profiles = ProfileStore(settings.REQUEST_PROFILE_KEEP)
+worker_observers.append(WorkerObserver())
 
 # Установка часового пояса (Екатеринбург)
 yekaterinburg_tz = pytz.timezone('Asia/Yekaterinburg')
@@ -17,58 +197,331 @@ class ServerInfo(BaseModel):
     system: str
     server_time: str
 
+class GeoInfo(BaseModel):
+    country_code: Optional[str] = None
+    country: Optional[str] = None
+    city: Optional[str] = None
+    asn: Optional[int] = None
+    as_org: Optional[str] = None
+
 class ClientInfo(BaseModel):
     ip: str
     useragent: str
+    geo: Optional[GeoInfo] = None
+
+class BackendInfo(BaseModel):
+    name: str
+    database: str
+    target: str
+    status: str
+    version: Optional[str]
+    error: Optional[str]
 
 class DatabaseInfo(BaseModel):
     database: str
     version: str
+    backends: List[BackendInfo]
+
+class MetricSeries(BaseModel):
+    timestamps: List[int]
+    values: List[float]
+    min: Optional[float]
+    max: Optional[float]
+    avg: Optional[float]
+
+class ServerHistoryInfo(BaseModel):
+    resolution: int
+    window: int
+    series: Dict[str, MetricSeries]
+
+class SystemInfo(BaseModel):
+    cpu_percent: Optional[float]
+    load_average: Optional[List[float]]
+    memory_total: Optional[int]
+    memory_available: Optional[int]
+    memory_used_percent: Optional[float]
+    swap_total: Optional[int]
+    swap_used: Optional[int]
+    uptime_seconds: Optional[float]
+    process_uptime_seconds: float
+    sampled_at: float
+
+class RouteStats(BaseModel):
+    route: str
+    requests: int
+    client_errors: int
+    server_errors: int
+    error_rate: float
+    avg_latency_ms: float
+    max_latency_ms: float
+
+class LatencyStats(BaseModel):
+    route: str
+    requests: int
+    p50_ms: Optional[float]
+    p90_ms: Optional[float]
+    p95_ms: Optional[float]
+    p99_ms: Optional[float]
+
+class ClientStats(BaseModel):
+    client_ip: str
+    requests: int
+    errors: int
+
+class LocaleStats(BaseModel):
+    bucket: int
+    resolution: int
+    locale: str
+    requests: int
+
+# Быстрые кодировщики ответов горячих маршрутов (режим COMPACT_RESPONSES)
+compact_encoders = {model: CompactEncoder(model) for model in (ServerInfo, ClientInfo, DatabaseInfo)}
+
+# Однократная проверка значений горячих маршрутов при запуске
+def validate_compact_encoders():
+    compact_encoders[ServerInfo].validate(server_info_values())
+    # Запрос без User-Agent — крайний случай поставщика
+    compact_encoders[ClientInfo].validate(client_info_values("127.0.0.1", None))
+    # Хранилища при запуске могут быть недоступны: проверяется форма значения
+    # fetch_database_info на образце, без обращения к ним
+    backends = [backend_status(backend, "startup") for backend in database_backends.backends.values()]
+    compact_encoders[DatabaseInfo].validate(
+        {"database": backends[0]["database"], "version": "startup", "backends": backends}
+    )
+
+class QueryRequest(BaseModel):
+    sql: str
+    params: List[Union[int, float, str, None]] = []
+    backend: Optional[str] = None
+    format: str = Field("ndjson", pattern="^(ndjson|csv)$")
+    max_rows: Optional[int] = Field(None, ge=1)
+
+# Middleware контроля допуска: при переполненной очереди или истёкшем ожидании
+# сразу отвечаем 503 с Retry-After, а не копим запросы в пуле потоков
+@app.middleware("http")
+async def admit_request(request: Request, call_next):
+    limiter = admission.limiter_for(request.url.path) if settings.ADMISSION_ENABLED else None
+    if limiter is None:
+        return await call_next(request)
+    if not await limiter.acquire(admission.queue_timeout):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Сервер перегружен, повторите запрос позже"},
+            headers={"Retry-After": admission.retry_after},
+        )
+    try:
+        return await call_next(request)
+    finally:
+        limiter.release()
 
 # Middleware для локализации
 @app.middleware("http")
 async def set_locale(request: Request, call_next):
-    # Получаем язык из заголовка Accept-Language
-    accept_language = request.headers.get("Accept-Language", "ru")
-    # Устанавливаем русский язык по умолчанию
-    if "ru" not in accept_language:
-        accept_language = "ru"
-    request.state.locale = accept_language
-    print(f"Locale set to: {request.state.locale}")  # Debug statement
+    with phase("locale"):
+        # Получаем язык из заголовка Accept-Language
+        accept_language = request.headers.get("Accept-Language", "ru")
+        # Устанавливаем русский язык по умолчанию
+        if "ru" not in accept_language:
+            accept_language = "ru"
+        request.state.locale = accept_language
+        logger.debug("Locale set to: %s", request.state.locale)
     response = await call_next(request)
     return response
 
+# Middleware для журнала и счётчика запросов (без ожидания записи в базу)
+@app.middleware("http")
+async def log_access(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        latency_ms = (time.perf_counter() - started) * 1000
+        request_meter.record(latency_ms)
+        if settings.ACCESS_LOG_ENABLED:
+            route = request.scope.get("route")
+            access_log.submit(AccessRecord(
+                ts=time.time(),
+                method=request.method,
+                route=getattr(route, "path", ""),
+                status=status,
+                latency_ms=latency_ms,
+                client_ip=request.client.host if request.client else None,
+                user_agent=request.headers.get("user-agent"),
+                locale=getattr(request.state, "locale", None),
+            ))
+
+# Выборочная запись трафика; выключенная, сразу передаёт вызов приложению
+app.add_middleware(CaptureMiddleware, capture=lambda: traffic_capture, enabled=lambda: settings.CAPTURE_ENABLED)
+
+# Middleware бюджета времени: срок отсчитывается от поступления запроса,
+# включая ожидание допуска и пула потоков
+@app.middleware("http")
+async def set_deadline(request: Request, call_next):
+    budget = request_budget(
+        request.url.path,
+        request.headers.get(TIMEOUT_HEADER),
+        settings.DEADLINE_ROUTE_BUDGETS,
+        settings.DEADLINE_DEFAULT,
+    )
+    request.state.deadline = Deadline(budget)
+    return await call_next(request)
+
+# Профилирование отдельного запроса с заголовком X-Profile; запросы без
+# заголовка проходят сразу
+app.add_middleware(
+    RequestProfileMiddleware,
+    store=request_profiles,
+    authorize=debug_token_valid,
+    interval=lambda: settings.REQUEST_PROFILE_INTERVAL_MS / 1000,
+)
+
+# Заголовок Server-Timing: внешний слой, чтобы замерить весь запрос;
+# выключенный, он сразу передаёт вызов приложению
+app.add_middleware(ServerTimingMiddleware, enabled=lambda: settings.SERVER_TIMING)
+
+# Заранее закодированные ответы об ошибках на языке из set_locale
+error_responses = ErrorResponses()
+app.add_exception_handler(StarletteHTTPException, error_responses.http_exception)
+app.add_exception_handler(RequestValidationError, error_responses.validation_error)
+
+# Истёкший бюджет времени — 504 с понятным телом
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    route = request.scope.get("route")
+    request_timeouts.labels(getattr(route, "path", "")).inc()
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "Превышено время обработки запроса", "timeout": exc.budget},
+    )
+
+# Проверка живости: постоянный ответ без ввода-вывода
+@app.get("/health/live", include_in_schema=False)
+async def health_live():
+    return Response(LIVE_BODY, media_type="application/json")
+
+# Проверка готовности: результат последнего фонового прогона проверок
+@app.get("/health/ready", include_in_schema=False)
+async def health_ready():
+    status_code, body = health_monitor.result
+    return Response(body, status_code=status_code, media_type="application/json")
+
 # Маршрут для получения информации о сервере
 @app.get("/info/server", response_model=ServerInfo)
 def get_server_info(request: Request):
+    if settings.SHARED_SNAPSHOTS:
+        body = shared_snapshots.read("server")
+        if body is not None:
+            return Response(body, media_type="application/json")
+    values = server_info_values()
+    if settings.COMPACT_RESPONSES:
+        return compact_encoders[ServerInfo].render(values)
+    return ServerInfo(**values)
+
+def server_info_values():
     # Получаем текущее время в часовом поясе Екатеринбурга
     current_time = datetime.now(yekaterinburg_tz).strftime('%Y-%m-%d %H:%M:%S')
-    return ServerInfo(
-        python_version=platform.python_version(),
-        system=platform.system(),
-        server_time=current_time
-    )
+    return {
+        "python_version": platform.python_version(),
+        "system": platform.system(),
+        "server_time": current_time,
+    }
+
+# Маршрут для получения истории метрик сервера
+@app.get("/info/server/history", response_model=ServerHistoryInfo)
+def get_server_history(
+    resolution: int = Query(1, description="Разрешение в секундах: 1 или 60"),
+    window: int = Query(600, ge=1, le=24 * 3600),
+    metrics: Optional[str] = Query(None, description="Список метрик через запятую"),
+):
+    if resolution not in server_history.resolutions:
+        raise HTTPException(status_code=422, detail=f"Допустимые разрешения: {server_history.resolutions}")
+    names = set(metrics.split(",")) if metrics else None
+    return {
+        "resolution": resolution,
+        "window": window,
+        "series": server_history.read(resolution, window, names, now=time.time()),
+    }
+
+# Маршрут для получения системных метрик (из последнего фонового снимка)
+@app.get("/info/system", response_model=SystemInfo)
+def get_system_info():
+    sample = system_sampler.latest
+    if sample is None:
+        raise HTTPException(status_code=503, detail="Системные метрики ещё не собраны")
+    return sample
+
+def client_info_values(ip, useragent):
+    # Без заголовка User-Agent — пустая строка в обоих режимах ответа
+    return {"ip": ip, "useragent": useragent if useragent is not None else "", "geo": geoip.lookup(ip)}
 
 # Маршрут для получения информации о клиенте
 @app.get("/info/client", response_model=ClientInfo)
 def get_client_info(request: Request):
-    return ClientInfo(
-        ip=request.client.host,
-        useragent=request.headers.get("user-agent")
-    )
+    values = client_info_values(request.client.host, request.headers.get("user-agent"))
+    if settings.COMPACT_RESPONSES:
+        if values["geo"] is not None:
+            values["geo"] = GeoInfo.model_construct(**values["geo"])
+        return compact_encoders[ClientInfo].render(values)
+    return ClientInfo(**values)
 
 # Маршрут для получения информации о базе данных
 @app.get("/info/database", response_model=DatabaseInfo)
-def get_database_info():
-    # Подключение к SQLite (пример)
-    conn = sqlite3.connect('example.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT sqlite_version()")
-    db_version = cursor.fetchone()[0]
-    return DatabaseInfo(
-        database="SQLite",
-        version=db_version
-    )
+async def get_database_info(request: Request, response: Response):
+    if settings.SHARED_SNAPSHOTS:
+        body = shared_snapshots.read("database")
+        if body is not None:
+            return Response(body, media_type="application/json", headers={"X-Cache": "shared"})
+    values, cache_status = await database_info_values(request.state.deadline)
+    if settings.COMPACT_RESPONSES:
+        values["backends"] = [BackendInfo.model_construct(**backend) for backend in values["backends"]]
+        rendered = compact_encoders[DatabaseInfo].render(values)
+        rendered.headers["X-Cache"] = cache_status
+        return rendered
+    response.headers["X-Cache"] = cache_status
+    return DatabaseInfo(**values)
+
+async def fetch_database_info():
+    # Все хранилища проверяются параллельно, каждое в пределах своего тайм-аута;
+    # вычисление общее для всех ожидающих, поэтому срок запроса сюда не передаётся
+    backends = await database_backends.probe_all(None, settings.DATABASE_PROBE_TIMEOUT)
+    primary = backends[0]
+    if primary["status"] != "ok":
+        raise BackendUnavailable(f"Основное хранилище недоступно: {primary['error']}")
+    return {"database": primary["database"], "version": primary["version"], "backends": backends}
+
+# Сведения о хранилищах: одно вычисление на все одновременные промахи, устаревшее
+# значение пока идёт обновление и последнее удачное при отказах хранилища
+database_info_cache = SWRCache(
+    "database_info",
+    fetch_database_info,
+    ttl=settings.DATABASE_INFO_TTL,
+    stale_ttl=settings.DATABASE_INFO_STALE_TTL,
+    breaker=CircuitBreaker(settings.DATABASE_INFO_FAILURE_THRESHOLD, settings.DATABASE_INFO_RESET_TIMEOUT),
+)
+
+async def database_info_values(deadline):
+    deadline.check()
+    try:
+        values, cache_status = await database_info_cache.get(deadline)
+    except (BackendUnavailable, CircuitOpen) as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    # Копия: значение в кэше общее для всех запросов
+    return dict(values, backends=list(values["backends"])), cache_status
+
+# Поставщики общих снимков: тела ответов кодируются так же, как в быстром режиме
+async def server_info_snapshot():
+    return compact_encoders[ServerInfo].encode(server_info_values())
+
+async def database_info_snapshot():
+    values, _ = await database_info_cache.get()
+    backends = [BackendInfo.model_construct(**backend) for backend in values["backends"]]
+    return compact_encoders[DatabaseInfo].encode(dict(values, backends=backends))
+
+shared_snapshots.add("server", server_info_snapshot)
+shared_snapshots.add("database", database_info_snapshot)
 
 # Корневой маршрут
 @app.get("/")
@@ -81,3 +534,184 @@ def read_root(request: Request):
     else:
         return {"message": "Welcome to Laboratory Work №1!"}
 
+# Метрики процесса в формате Prometheus
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# Длина окна статистики в секундах: от минуты до 30 суток
+StatsWindow = Query(3600, ge=60, le=30 * 24 * 3600)
+
+# Маршруты статистики по журналу запросов (из минутных и часовых агрегатов)
+@app.get("/stats/routes", response_model=List[RouteStats])
+def get_route_stats(window: int = StatsWindow):
+    return stats_reader.routes(window)
+
+@app.get("/stats/latency", response_model=List[LatencyStats])
+def get_latency_stats(window: int = StatsWindow, route: Optional[str] = None):
+    return stats_reader.latency(window, route)
+
+@app.get("/stats/clients", response_model=List[ClientStats])
+def get_client_stats(window: int = StatsWindow, limit: int = Query(10, ge=1, le=1000)):
+    return stats_reader.clients(window, limit)
+
+@app.get("/stats/locales", response_model=List[LocaleStats])
+def get_locale_stats(window: int = StatsWindow):
+    return stats_reader.locales(window)
+
+# Одновременно выполняется не больше одного профилирования
+profile_lock = threading.Lock()
+
+# Выборочное профилирование всех потоков процесса (защищено токеном отладки)
+@app.get("/debug/profile", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+async def debug_profile(
+    seconds: float = Query(5.0, gt=0, le=settings.PROFILE_MAX_SECONDS),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    interval_ms: float = Query(settings.PROFILE_DEFAULT_INTERVAL_MS, ge=settings.PROFILE_MIN_INTERVAL_MS),
+):
+    if not profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Профилирование уже выполняется")
+    try:
+        profiler = SamplingProfiler(interval=interval_ms / 1000).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile = profiler.stop()
+    finally:
+        profile_lock.release()
+    if format == "speedscope":
+        return JSONResponse(profile.speedscope(name=f"profile-{int(profile.started)}"))
+    return PlainTextResponse(profile.collapsed())
+
+# Список сохранённых профилей отдельных запросов
+@app.get("/debug/profile/requests", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+def list_request_profiles():
+    return request_profiles.list()
+
+# Профиль отдельного запроса по идентификатору из заголовка X-Profile-Id
+@app.get("/debug/profile/requests/{profile_id}", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+def get_request_profile(profile_id: str, format: str = Query("collapsed", pattern="^(collapsed|speedscope)$")):
+    entry = request_profiles.get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+    profile = entry["profile"]
+    if format == "speedscope":
+        return JSONResponse(profile.speedscope(name=f"{entry['method']} {entry['path']}"))
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.txt"'},
+    )
+
+# Последние обнаруженные блокировки цикла событий со стеками
+@app.get("/debug/loop/blocks", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+def list_loop_blocks():
+    return list(loop_lag_probe.reports)
+
+# Снимки tracemalloc для поиска утечек памяти
+memory_tracer = MemoryTracer(settings.MEMORY_MAX_SNAPSHOTS)
+
+@app.post("/debug/memory/start", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+def start_memory_tracing(frames: int = Query(1, ge=1, le=64)):
+    return memory_tracer.start(frames)
+
+@app.post("/debug/memory/stop", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+def stop_memory_tracing():
+    return memory_tracer.stop()
+
+@app.get("/debug/memory/snapshots", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+def get_memory_status():
+    return memory_tracer.status()
+
+@app.post("/debug/memory/snapshots/{name}", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+def take_memory_snapshot(name: str):
+    try:
+        return memory_tracer.take(name)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+# Наибольшие изменения аллокаций между снимками (без target — относительно текущего состояния)
+@app.get("/debug/memory/diff", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+def get_memory_diff(
+    base: str,
+    target: Optional[str] = None,
+    group_by: str = Query("lineno", pattern="^(lineno|filename)$"),
+    limit: int = Query(20, ge=1, le=500),
+):
+    try:
+        return memory_tracer.diff(base, target, group_by, limit)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Снимок {exc.args[0]} не найден")
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+# Открытые соединения SQLite и файловые дескрипторы процесса
+@app.get("/debug/memory/resources", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+def get_resource_counts():
+    return resource_counts()
+
+# Запрос только на чтение: строки отдаются потоком по мере выборки (NDJSON или CSV)
+@app.post("/db/query", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+async def run_read_only_query(query: QueryRequest):
+    try:
+        stream = await run_sync(
+            read_only_queries.execute, query.sql, query.params, query.backend,
+            settings.QUERY_BATCH_SIZE, query.max_rows,
+        )
+    except QueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if query.format == "csv":
+        return StreamingResponse(stream.csv(), media_type="text/csv", background=BackgroundTask(stream.close))
+    return StreamingResponse(stream.ndjson(), media_type="application/x-ndjson", background=BackgroundTask(stream.close))
+
+# Текущие и недавние загрузки с прогрессом по порциям
+@app.get("/db/ingest/jobs", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+async def list_ingest_jobs():
+    return ingestor.list()
+
+# Загрузка NDJSON: тело читается потоком, строки проверяются по схеме таблицы
+# и вставляются порциями executemany в транзакциях, фиксируемых по интервалу
+@app.post("/db/ingest/{table}", include_in_schema=False, dependencies=[Depends(require_debug_token)])
+async def ingest_rows(
+    table: str,
+    request: Request,
+    backend: Optional[str] = None,
+    batch_size: int = Query(settings.INGEST_BATCH_SIZE, ge=1, le=100000),
+    commit_interval: float = Query(settings.INGEST_COMMIT_INTERVAL, ge=0),
+):
+    try:
+        job = await ingestor.ingest(request.stream(), table, backend, batch_size, commit_interval)
+    except LookupError:
+        raise HTTPException(status_code=404, detail=f"Таблица {table} не найдена")
+    except PoolTimeout:
+        raise HTTPException(status_code=503, detail="Все соединения загрузки заняты", headers={"Retry-After": "1"})
+    except IngestError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return job.summary()
+
+def prepared_docs():
+    # Без запуска через lifespan (например, в тестах) — при первом обращении
+    if not docs_assets.ready:
+        docs_assets.build()
+    return docs_assets
+
+# Схема OpenAPI: собрана один раз, отдаётся с ETag и сжатием
+@app.get("/openapi.json", include_in_schema=False)
+async def get_openapi_schema(request: Request):
+    return prepared_docs().schema.respond(request)
+
+# Страницы документации с локальными ресурсами вместо CDN
+@app.get("/docs", include_in_schema=False)
+async def get_swagger_ui(request: Request):
+    return prepared_docs().pages["docs"].respond(request)
+
+@app.get("/redoc", include_in_schema=False)
+async def get_redoc(request: Request):
+    return prepared_docs().pages["redoc"].respond(request)
+
+# Ресурсы документации: адрес содержит хэш, поэтому кэшируются надолго
+@app.get("/docs-assets/{name}", include_in_schema=False)
+async def get_docs_asset(name: str, request: Request):
+    asset = prepared_docs().files.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Ресурс не найден")
+    return asset.respond(request)
@@ -0,0 +1,118 @@
+import gc
+import os
+import sqlite3
+import threading
+import tracemalloc
+from collections import OrderedDict
+
+# Служебные трассы, которые не относятся к приложению
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+DATABASE_SUFFIXES = (".db", ".sqlite", ".sqlite3", ".db-wal", ".db-shm", ".db-journal")
+
+
+class MemoryTracer:
+    """Именованные снимки tracemalloc и их сравнение.
+
+    Хранится не больше `max_snapshots` снимков: самый старый вытесняется.
+    """
+
+    def __init__(self, max_snapshots=8):
+        self.max_snapshots = max_snapshots
+        self.snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self):
+        with self._lock:
+            self.snapshots.clear()
+        tracemalloc.stop()
+        return self.status()
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_current": current,
+            "traced_peak": peak,
+            "snapshots": list(self.snapshots),
+        }
+
+    def take(self, name):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc не запущен")
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        with self._lock:
+            self.snapshots.pop(name, None)
+            self.snapshots[name] = snapshot
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+        return {"name": name, "traces": len(snapshot.traces), "size": sum(trace.size for trace in snapshot.traces)}
+
+    def diff(self, base, target=None, group_by="lineno", limit=20):
+        """Наибольшие изменения аллокаций между снимками `base` и `target`
+        (без `target` — относительно нового снимка), по файлу или строке.
+        """
+        with self._lock:
+            base_snapshot = self.snapshots[base]
+            target_snapshot = self.snapshots[target] if target is not None else None
+        if target_snapshot is None:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc не запущен")
+            target_snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        stats = target_snapshot.compare_to(base_snapshot, group_by)
+        return [
+            {
+                "file": stat.traceback[0].filename,
+                "line": stat.traceback[0].lineno if group_by == "lineno" else None,
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats[:limit]
+        ]
+
+
+def open_sqlite_connections():
+    """Число незакрытых объектов sqlite3.Connection в куче процесса."""
+    count = 0
+    for obj in gc.get_objects():
+        if isinstance(obj, sqlite3.Connection):
+            try:
+                obj.total_changes
+            except sqlite3.ProgrammingError:
+                continue
+            count += 1
+    return count
+
+
+def open_file_descriptors():
+    """Открытые дескрипторы процесса и те из них, что указывают на файлы баз."""
+    fd_dir = "/proc/self/fd"
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return {"open_fds": None, "database_fds": {}}
+    databases = {}
+    for fd in fds:
+        try:
+            target = os.readlink(os.path.join(fd_dir, fd))
+        except OSError:
+            continue
+        if target.endswith(DATABASE_SUFFIXES):
+            databases[target] = databases.get(target, 0) + 1
+    return {"open_fds": len(fds), "database_fds": databases}
+
+
+def resource_counts():
+    return {"sqlite_connections": open_sqlite_connections(), **open_file_descriptors()}
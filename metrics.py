@@ -0,0 +1,267 @@
+import math
+import threading
+from bisect import bisect_left
+
+import settings
+from mmap_metrics import ARCHIVE_WORKER, MMapStore
+
+# Реестр метрик процесса в текстовом формате Prometheus.
+# Значения хранятся в общем хранилище по ключу (имя сэмпла, метки),
+# сами метрики лишь вычисляют ключи и форматируют вывод.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LocalStore:
+    """Хранилище значений метрик в памяти текущего процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, key, amount=1.0):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, key):
+        return self._values.get(key, 0.0)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def snapshots(self):
+        return [(None, self.snapshot())]
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}")
+            child = self._children.setdefault(
+                values, self._make_child(tuple(zip(self.labelnames, values)))
+            )
+        return child
+
+    def _make_child(self, labels):
+        raise NotImplementedError
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name}: метрика требует метки {self.labelnames}")
+        return self.labels()
+
+
+class _CounterChild:
+    __slots__ = ("_store", "_key")
+
+    def __init__(self, store, key):
+        self._store = store
+        self._key = key
+
+    def inc(self, amount=1.0):
+        self._store.inc(self._key, amount)
+
+    @property
+    def value(self):
+        return self._store.get(self._key)
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        self._store.set(self._key, value)
+
+    def dec(self, amount=1.0):
+        self._store.inc(self._key, -amount)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _make_child(self, labels):
+        return _CounterChild(self.registry.store, (self.name + "_total", labels))
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+    @property
+    def value(self):
+        return self._default().value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _make_child(self, labels):
+        return _GaugeChild(self.registry.store, (self.name, labels))
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default().dec(amount)
+
+    @property
+    def value(self):
+        return self._default().value
+
+
+class _HistogramChild:
+    __slots__ = ("_store", "_bounds", "_bucket_keys", "_sum_key", "_count_key")
+
+    def __init__(self, store, name, labels, bounds):
+        self._store = store
+        self._bounds = bounds
+        self._bucket_keys = tuple(
+            (name + "_bucket", labels + (("le", _format_value(bound)),))
+            for bound in bounds + (math.inf,)
+        )
+        self._sum_key = (name + "_sum", labels)
+        self._count_key = (name + "_count", labels)
+
+    def observe(self, value):
+        # Бакеты храним некумулятивно, накопленные суммы считаются при выводе
+        self._store.inc(self._bucket_keys[bisect_left(self._bounds, value)])
+        self._store.inc(self._sum_key, value)
+        self._store.inc(self._count_key)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _make_child(self, labels):
+        return _HistogramChild(self.registry.store, self.name, labels, self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+
+class Registry:
+    def __init__(self, store=None):
+        self.store = store if store is not None else LocalStore()
+        self._metrics = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def collect(self):
+        """Значения всех процессов хранилища: счётчики и гистограммы суммируются
+        (вместе с архивом завершившихся процессов), датчики выводятся по
+        отдельности с меткой worker, а из архива не выводятся.
+        """
+        snapshots = self.store.snapshots()
+        if len(snapshots) == 1 and snapshots[0][0] is None:
+            return snapshots[0][1]
+        gauges = {metric.name for metric in self._metrics.values() if metric.kind == "gauge"}
+        merged = {}
+        for worker, values in snapshots:
+            for (sample, labels), value in values.items():
+                if sample in gauges:
+                    if worker == ARCHIVE_WORKER:
+                        continue
+                    key = (sample, labels + (("worker", worker),))
+                else:
+                    key = (sample, labels)
+                merged[key] = merged.get(key, 0.0) + value
+        return merged
+
+    def render(self):
+        values = self.collect()
+        by_sample = {}
+        for (sample, labels), value in values.items():
+            by_sample.setdefault(sample, []).append((labels, value))
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if metric.kind == "histogram":
+                lines.extend(_render_histogram(metric.name, by_sample))
+            else:
+                sample = metric.name + "_total" if metric.kind == "counter" else metric.name
+                for labels, value in sorted(by_sample.get(sample, ())):
+                    lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(name, by_sample):
+    lines = []
+    series = {}
+    for labels, value in by_sample.get(name + "_bucket", ()):
+        series.setdefault(labels[:-1], []).append((float(labels[-1][1]), value))
+    for labels in sorted(series):
+        cumulative = 0.0
+        for bound, value in sorted(series[labels]):
+            cumulative += value
+            le = (("le", _format_value(bound)),)
+            lines.append(f"{name}_bucket{_format_labels(labels + le)} {_format_value(cumulative)}")
+        for suffix in ("_sum", "_count"):
+            total = dict(by_sample.get(name + suffix, ())).get(labels, 0.0)
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(total)}")
+    return lines
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + inner + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def default_store():
+    # Каталог общих файлов метрик нужен, когда приложение запущено в несколько процессов
+    if settings.METRICS_MULTIPROC_DIR:
+        return MMapStore(settings.METRICS_MULTIPROC_DIR)
+    return LocalStore()
+
+
+# Общий реестр приложения
+REGISTRY = Registry(default_store())
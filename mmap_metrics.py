@@ -0,0 +1,321 @@
+import atexit
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # без flock архив не защищён от одновременной записи
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Значения метрик в файлах, отображённых в память: у каждого рабочего процесса
+# свой файл (своя область слотов) в общем каталоге. Процесс пишет только в
+# свой файл и без IPC читает чужие, когда отдаёт /metrics.
+#
+# Формат файла: 8 байт — занятый размер, затем записи
+# [длина ключа u32][ключ JSON, выровненный до 8][значение f64].
+# Запись сначала заполняется целиком и лишь потом учитывается в занятом
+# размере, поэтому читатель никогда не видит наполовину добавленный слот.
+#
+# Значения завершившихся процессов не пропадают: перед удалением файла они
+# прибавляются к архиву (archive.db), иначе сумма счётчика по процессам
+# уменьшилась бы, и Prometheus увидел бы ложный сброс. Датчики из архива
+# не выводятся — см. Registry.collect.
+
+USED = struct.Struct("<Q")
+KEY_LENGTH = struct.Struct("<I")
+VALUE = struct.Struct("<d")
+
+INITIAL_SIZE = 64 * 1024
+FILE_PATTERN = "metrics_{pid}.db"
+ARCHIVE_FILE = "archive.db"
+LOCK_FILE = "metrics.lock"
+
+# Метка worker значений архива
+ARCHIVE_WORKER = "archive"
+
+
+def _encode_key(key):
+    sample, labels = key
+    return json.dumps([sample, [list(pair) for pair in labels]], ensure_ascii=False).encode()
+
+
+def _decode_key(raw):
+    sample, labels = json.loads(raw)
+    return sample, tuple(tuple(pair) for pair in labels)
+
+
+def _aligned(size):
+    return (size + 7) & ~7
+
+
+def read_file(path):
+    """Значения из файла процесса: {ключ: значение}."""
+    values = {}
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < USED.size:
+                return values
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                # Писатель мог увеличить файл после отображения: записи за
+                # концом отображения не читаются
+                used = min(USED.unpack_from(data, 0)[0], len(data))
+                offset = USED.size
+                while offset + KEY_LENGTH.size <= used:
+                    length = KEY_LENGTH.unpack_from(data, offset)[0]
+                    key_start = offset + KEY_LENGTH.size
+                    value_offset = _aligned(key_start + length)
+                    if value_offset + VALUE.size > used:
+                        break
+                    values[_decode_key(data[key_start:key_start + length])] = VALUE.unpack_from(data, value_offset)[0]
+                    offset = value_offset + VALUE.size
+    except FileNotFoundError:
+        # Процесс завершился и убрал файл между listdir и open
+        pass
+    return values
+
+
+def write_file(path, values):
+    """Записать значения в файл того же формата целиком, с атомарной заменой."""
+    data = bytearray(USED.size)
+    for key, value in values.items():
+        raw = _encode_key(key)
+        data += KEY_LENGTH.pack(len(raw)) + raw
+        data += bytes(_aligned(len(data)) - len(data))
+        data += VALUE.pack(value)
+    USED.pack_into(data, 0, len(data))
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MMapStore:
+    """Хранилище метрик с тем же интерфейсом, что LocalStore.
+
+    Файл открывается при создании хранилища и заново после fork (по смене
+    pid). Первый процесс нового запуска (в каталоге нет файлов живых
+    процессов) очищает каталог вместе с архивом. При выходе процесса его
+    значения переносятся в архив, а файл удаляется; файлы процессов, умерших
+    без очистки, переносятся в архив при запуске следующего процесса и при
+    чтении /metrics. Перенос и чтение всех файлов
+    разделены блокировкой flock, чтобы значения не пропали из суммы и не
+    попали в неё дважды.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._pid = None
+        self._path = None
+        self._file = None
+        self._data = None
+        self._offsets = {}
+        self._used = USED.size
+        self._archive_path = os.path.join(directory, ARCHIVE_FILE)
+        self._lock_path = os.path.join(directory, LOCK_FILE)
+        os.makedirs(directory, exist_ok=True)
+        with self._files_locked():
+            if self._live_files():
+                self._archive_dead_locked()
+            else:
+                self._clear()
+            # Файл создаётся сразу: по нему следующие процессы видят, что запуск продолжается
+            with self._lock:
+                self._open()
+
+    def _clear(self):
+        # Вызывается под исключительной блокировкой каталога
+        for path in self._process_files() + [self._archive_path]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _path_for(self, pid):
+        return os.path.join(self.directory, FILE_PATTERN.format(pid=pid))
+
+    def _process_files(self):
+        return sorted(glob.glob(os.path.join(self.directory, FILE_PATTERN.format(pid="*"))))
+
+    @contextmanager
+    def _files_locked(self, shared=False):
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a+b") as file:
+            fcntl.flock(file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    def _archive(self, values, paths):
+        # Вызывается под исключительной блокировкой каталога
+        archived = read_file(self._archive_path)
+        for key, value in values.items():
+            archived[key] = archived.get(key, 0.0) + value
+        write_file(self._archive_path, archived)
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _dead_files(self):
+        dead = []
+        for path in self._process_files():
+            pid = self._pid_from_path(path)
+            if pid is not None and pid != os.getpid() and not _pid_alive(pid):
+                dead.append(path)
+        return dead
+
+    def _live_files(self):
+        live = []
+        for path in self._process_files():
+            pid = self._pid_from_path(path)
+            if pid is not None and pid != os.getpid() and _pid_alive(pid):
+                live.append(path)
+        return live
+
+    def archive_dead(self):
+        """Перенести значения процессов, умерших без очистки, в архив."""
+        if not self._dead_files():
+            return
+        with self._files_locked():
+            # Под блокировкой заново: другой процесс мог уже перенести файлы
+            self._archive_dead_locked()
+
+    def _archive_dead_locked(self):
+        dead = self._dead_files()
+        values = {}
+        for path in dead:
+            for key, value in read_file(path).items():
+                values[key] = values.get(key, 0.0) + value
+        if dead:
+            self._archive(values, dead)
+
+    @staticmethod
+    def _pid_from_path(path):
+        name = os.path.basename(path)
+        try:
+            return int(name[len("metrics_"):-len(".db")])
+        except ValueError:
+            return None
+
+    def _open(self):
+        # Вызывается под блокировкой; после fork наследованное отображение закрываем
+        if self._data is not None:
+            self._data.close()
+            self._file.close()
+        self._pid = os.getpid()
+        self._path = self._path_for(self._pid)
+        self._file = open(self._path, "w+b")
+        self._file.truncate(INITIAL_SIZE)
+        self._data = mmap.mmap(self._file.fileno(), INITIAL_SIZE)
+        self._offsets = {}
+        self._used = USED.size
+        USED.pack_into(self._data, 0, self._used)
+        atexit.register(self.close)
+
+    def _grow(self, needed):
+        size = len(self._data)
+        while size < needed:
+            size *= 2
+        self._data.close()
+        self._file.truncate(size)
+        self._data = mmap.mmap(self._file.fileno(), size)
+
+    def _offset(self, key):
+        offset = self._offsets.get(key)
+        if offset is not None:
+            return offset
+        raw = _encode_key(key)
+        start = self._used
+        value_offset = _aligned(start + KEY_LENGTH.size + len(raw))
+        end = value_offset + VALUE.size
+        if end > len(self._data):
+            self._grow(end)
+        KEY_LENGTH.pack_into(self._data, start, len(raw))
+        self._data[start + KEY_LENGTH.size:start + KEY_LENGTH.size + len(raw)] = raw
+        VALUE.pack_into(self._data, value_offset, 0.0)
+        self._used = end
+        USED.pack_into(self._data, 0, end)
+        self._offsets[key] = value_offset
+        return value_offset
+
+    def _ensure_open(self):
+        if self._pid != os.getpid():
+            self._open()
+
+    def inc(self, key, amount=1.0):
+        with self._lock:
+            self._ensure_open()
+            offset = self._offset(key)
+            VALUE.pack_into(self._data, offset, VALUE.unpack_from(self._data, offset)[0] + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            self._ensure_open()
+            VALUE.pack_into(self._data, self._offset(key), value)
+
+    def get(self, key):
+        with self._lock:
+            if self._pid != os.getpid():
+                return 0.0
+            offset = self._offsets.get(key)
+            return 0.0 if offset is None else VALUE.unpack_from(self._data, offset)[0]
+
+    def snapshot(self):
+        """Значения текущего процесса."""
+        with self._lock:
+            if self._pid != os.getpid():
+                return {}
+            return {key: VALUE.unpack_from(self._data, offset)[0] for key, offset in self._offsets.items()}
+
+    def snapshots(self):
+        """(pid, значения) всех живых процессов каталога, включая текущий,
+        и ("archive", значения) завершившихся."""
+        self.archive_dead()
+        result = []
+        with self._files_locked(shared=True):
+            archived = read_file(self._archive_path)
+            if archived:
+                result.append((ARCHIVE_WORKER, archived))
+            for path in self._process_files():
+                pid = self._pid_from_path(path)
+                if pid is None:
+                    continue
+                if pid == os.getpid():
+                    result.append((str(pid), self.snapshot()))
+                elif _pid_alive(pid):
+                    result.append((str(pid), read_file(path)))
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            values = {key: VALUE.unpack_from(self._data, offset)[0] for key, offset in self._offsets.items()}
+            with self._files_locked():
+                self._archive(values, [self._path])
+            self._data.close()
+            self._file.close()
+            self._pid = None
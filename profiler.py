@@ -0,0 +1,133 @@
+import sys
+import threading
+import time
+from collections import Counter
+
+# Выборочный профилировщик: с фиксированным интервалом снимает стеки всех
+# потоков через sys._current_frames() — и цикла событий, и пула потоков
+# синхронных маршрутов. Накладные расходы ограничены частотой и глубиной.
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def frame_key(code):
+    return (code.co_name, code.co_filename, code.co_firstlineno)
+
+
+def walk_stack(frame, max_depth):
+    """Стек от корня к текущей функции в виде кортежа ключей кадров."""
+    stack = []
+    while frame is not None and len(stack) < max_depth:
+        stack.append(frame_key(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class Profile:
+    """Результат профилирования: число выборок по (поток, стек)."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self.started = time.time()
+        self.duration = 0.0
+
+    def add(self, thread_name, stack, count=1):
+        self.samples[thread_name, stack] += count
+
+    def collapsed(self):
+        """Формат collapsed stacks (flamegraph.pl, speedscope, inferno)."""
+        lines = []
+        for (thread_name, stack), count in self.samples.most_common():
+            frames = [thread_name] + [
+                f"{name} ({filename}:{line})" for name, filename, line in stack
+            ]
+            lines.append(";".join(frame.replace(";", ":") for frame in frames) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name="profile"):
+        """Формат speedscope: отдельный профиль на каждый поток."""
+        frames = []
+        frame_index = {}
+        by_thread = {}
+        for (thread_name, stack), count in self.samples.items():
+            indexes = []
+            for key in stack:
+                index = frame_index.get(key)
+                if index is None:
+                    index = frame_index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                indexes.append(index)
+            samples, weights = by_thread.setdefault(thread_name, ([], []))
+            samples.append(indexes)
+            weights.append(count * self.interval)
+        profiles = [
+            {
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+            for thread_name, (samples, weights) in sorted(by_thread.items())
+        ]
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "server-applications profiler",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+class SamplingProfiler:
+    """Снимает стеки потоков из отдельного потока до вызова `stop()`.
+
+    `thread_filter` ограничивает набор потоков (по идентификатору);
+    по умолчанию профилируются все потоки, кроме самого профилировщика.
+    """
+
+    def __init__(self, interval=0.01, max_depth=128, thread_filter=None):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.thread_filter = thread_filter
+        self.profile = Profile(interval)
+        self._stop = threading.Event()
+        self._thread = None
+        self._names = {}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.profile
+
+    def _thread_name(self, ident):
+        name = self._names.get(ident)
+        if name is None:
+            self._names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._names.get(ident, f"thread-{ident}")
+        return name
+
+    def _run(self):
+        own = threading.get_ident()
+        started = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own or (self.thread_filter is not None and not self.thread_filter(ident)):
+                    continue
+                self.profile.add(self._thread_name(ident), walk_stack(frame, self.max_depth))
+            self.profile.sample_count += 1
+            del frames
+        self.profile.duration = time.perf_counter() - started
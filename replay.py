@@ -0,0 +1,162 @@
+"""Воспроизведение записанного трафика (requests.jsonl) против приложения.
+
+Примеры:
+    python replay.py requests.jsonl --target http://127.0.0.1:8000 --speed 1
+    python replay.py requests.jsonl --app main:app --speed max --concurrency 64
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+# Заголовки, которые клиент выставляет сам
+SKIPPED_HEADERS = frozenset(("host", "content-length", "connection", "transfer-encoding"))
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "method" in record and "path" in record:
+                yield record
+
+
+def parse_speed(value):
+    """'1', '10x', 'max' -> множитель скорости (None — без пауз)."""
+    value = value.strip().lower()
+    if value == "max":
+        return None
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("скорость должна быть положительной")
+    return speed
+
+
+def quantile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class ReplayReport:
+    def __init__(self):
+        self.latencies_ms = []
+        self.statuses = Counter()
+        self.errors = 0
+        self.max_lag_ms = 0.0
+        self.elapsed = 0.0
+
+    def summary(self):
+        latencies = sorted(self.latencies_ms)
+        count = len(latencies)
+        return {
+            "requests": count + self.errors,
+            "errors": self.errors,
+            "statuses": dict(sorted(self.statuses.items())),
+            "elapsed_s": round(self.elapsed, 3),
+            "rps": round(count / self.elapsed, 1) if self.elapsed else None,
+            "max_schedule_lag_ms": round(self.max_lag_ms, 3),
+            "latency_ms": {
+                "min": latencies[0] if latencies else None,
+                "p50": quantile(latencies, 0.50),
+                "p90": quantile(latencies, 0.90),
+                "p99": quantile(latencies, 0.99),
+                "max": latencies[-1] if latencies else None,
+                "mean": sum(latencies) / count if count else None,
+            },
+        }
+
+
+async def replay(records, client, speed=1.0, concurrency=16):
+    """Отправляет записи через `client` с исходными интервалами, делёнными на
+    `speed` (None — без пауз), не более `concurrency` запросов одновременно.
+    """
+    report = ReplayReport()
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = set()
+
+    async def send(record):
+        headers = {
+            name: value
+            for name, value in record.get("headers", {}).items()
+            if name.lower() not in SKIPPED_HEADERS
+        }
+        url = record["path"] + ("?" + record["query"] if record.get("query") else "")
+        started = time.perf_counter()
+        try:
+            response = await client.request(record["method"], url, headers=headers)
+        except httpx.HTTPError:
+            report.errors += 1
+        else:
+            report.latencies_ms.append((time.perf_counter() - started) * 1000)
+            report.statuses[response.status_code] += 1
+        finally:
+            semaphore.release()
+
+    replay_started = time.perf_counter()
+    first_ts = None
+    for record in records:
+        if speed is not None:
+            if first_ts is None:
+                first_ts = record["ts"]
+            due = replay_started + (record["ts"] - first_ts) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await semaphore.acquire()
+        if speed is not None:
+            report.max_lag_ms = max(report.max_lag_ms, (time.perf_counter() - due) * 1000)
+        task = asyncio.create_task(send(record))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+    report.elapsed = time.perf_counter() - replay_started
+    return report
+
+
+def load_app(spec):
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute or "app")
+
+
+async def run(args):
+    if args.app:
+        transport = httpx.ASGITransport(app=load_app(args.app))
+        base_url = "http://replay"
+    else:
+        transport = None
+        base_url = args.target
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits,
+                                 timeout=args.timeout) as client:
+        report = await replay(read_records(args.file), client, args.speed, args.concurrency)
+    return report.summary()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Воспроизведение записанного трафика")
+    parser.add_argument("file", nargs="?", default="requests.jsonl")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--target", default="http://127.0.0.1:8000", help="базовый URL сервера")
+    target.add_argument("--app", help="ASGI-приложение в процессе, например main:app")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1, 10x или max")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args(argv)
+    json.dump(asyncio.run(run(args)), sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from profiler import SamplingProfiler
+
+# Профиль текущего запроса; пуст для всех запросов без заголовка X-Profile
+current_profile = ContextVar("current_profile", default=None)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+class RequestProfile:
+    """Профиль одного запроса: выборки только из потока цикла событий и тех
+    рабочих потоков, где в этот момент выполняется обработчик запроса.
+    """
+
+    def __init__(self, interval):
+        self.threads = {threading.get_ident()}
+        self.sampler = SamplingProfiler(interval, thread_filter=self.threads.__contains__)
+
+    def start(self):
+        self.sampler.start()
+        return self
+
+    def stop(self):
+        return self.sampler.stop()
+
+
+class WorkerObserver:
+    """Наблюдатель перехода в пул: добавляет рабочий поток к профилю запроса."""
+
+    def enter(self):
+        profile = current_profile.get()
+        if profile is None:
+            return None
+        ident = threading.get_ident()
+        profile.threads.add(ident)
+        return profile, ident
+
+    def exit(self, token):
+        if token is not None:
+            profile, ident = token
+            profile.threads.discard(ident)
+
+
+class ProfileStore:
+    """Кольцевой буфер последних профилей запросов."""
+
+    def __init__(self, size=32):
+        self.size = size
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._profiles = OrderedDict()
+
+    def add(self, method, path, status, profile):
+        profile_id = f"{int(time.time())}-{next(self._ids)}"
+        with self._lock:
+            self._profiles[profile_id] = {
+                "id": profile_id,
+                "method": method,
+                "path": path,
+                "status": status,
+                "duration_ms": round(profile.duration * 1000, 3),
+                "samples": profile.sample_count,
+                "profile": profile,
+            }
+            while len(self._profiles) > self.size:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            return [
+                {key: value for key, value in entry.items() if key != "profile"}
+                for entry in reversed(self._profiles.values())
+            ]
+
+
+class RequestProfileMiddleware:
+    """ASGI-слой профилирования запроса с заголовком X-Profile: от входа в
+    приложение до начала ответа, включая переход обработчика в пул потоков.
+
+    Запрос без заголовка сразу уходит приложению.
+    """
+
+    def __init__(self, app, store, authorize, interval):
+        self.app = app
+        self.store = store
+        self.authorize = authorize
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = Headers(scope=scope).get(PROFILE_HEADER)
+        if token is None or not self.authorize(token):
+            return await self.app(scope, receive, send)
+        profile = RequestProfile(self.interval()).start()
+        profile_id = None
+
+        def record(status):
+            nonlocal profile_id
+            profile_id = self.store.add(scope["method"], scope["path"], status, profile.stop())
+            return profile_id
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start" and profile_id is None:
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = record(message["status"])
+            await send(message)
+
+        reset = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            current_profile.reset(reset)
+            if profile_id is None:
+                record(500)
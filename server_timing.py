@@ -0,0 +1,129 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+
+# Длительности фаз запроса для заголовка Server-Timing. Объект замеров живёт
+# в контекстной переменной: пока заголовок выключен, она пуста, и каждая
+# точка замера обходится одним чтением этой переменной.
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+current_timings = ContextVar("current_timings", default=None)
+
+# Порядок фаз в заголовке
+PHASES = (
+    "middleware",
+    "locale",
+    "threadpool-wait",
+    "handler",
+    "db-connect",
+    "db-query",
+    "serialize",
+    "total",
+)
+
+
+class ServerTimings:
+    """Накопленные длительности фаз в наносекундах.
+
+    Фазы могут идти параллельно в нескольких рабочих потоках (например,
+    проверки хранилищ), поэтому сложение под блокировкой. Фаза "route" —
+    всё время внутри маршрута; из неё в `finish()` выводится сериализация,
+    а из общего времени — доля middleware.
+    """
+
+    __slots__ = ("durations", "_lock")
+
+    def __init__(self):
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, nanoseconds):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0) + nanoseconds
+
+    def get(self, name):
+        return self.durations.get(name, 0)
+
+    def finish(self, total):
+        durations = self.durations
+        route = durations.pop("route", None)
+        if route is not None:
+            durations["serialize"] = max(0, route - self.get("handler") - self.get("threadpool-wait"))
+        durations["middleware"] = max(0, total - (route or 0) - self.get("locale"))
+        durations["total"] = total
+
+    def header(self):
+        return ", ".join(
+            f"{name};dur={self.durations[name] / 1e6:.3f}"
+            for name in PHASES if name in self.durations
+        )
+
+
+class _Phase:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.name, time.perf_counter_ns() - self.started)
+        return False
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name):
+    """`with phase("db-query"): ...` — замер, если у запроса включён Server-Timing."""
+    timings = current_timings.get()
+    if timings is None:
+        return _NO_PHASE
+    return _Phase(timings, name)
+
+
+class ServerTimingMiddleware:
+    """ASGI-слой заголовка Server-Timing: внешний, чтобы замерить весь запрос.
+
+    Пока `enabled()` ложно, вызов сразу уходит приложению — без лишней
+    задачи и буферизации ответа, как у `@app.middleware`.
+    """
+
+    def __init__(self, app, enabled):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled():
+            return await self.app(scope, receive, send)
+        timings = ServerTimings()
+        started = time.perf_counter_ns()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                timings.finish(time.perf_counter_ns() - started)
+                MutableHeaders(scope=message).append(SERVER_TIMING_HEADER, timings.header())
+            await send(message)
+
+        reset = current_timings.set(timings)
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            current_timings.reset(reset)
@@ -0,0 +1,173 @@
+import os
+import tempfile
+
+# Настройки приложения из переменных окружения
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def env_list(name: str, default: str) -> list:
+    return [item.strip() for item in os.environ.get(name, default).split(",") if item.strip()]
+
+
+def env_mapping(name: str, default: str) -> dict:
+    """Словарь из строки вида "key=value,key=value"."""
+    mapping = {}
+    for item in env_list(name, default):
+        key, _, value = item.partition("=")
+        mapping[key.strip()] = value.strip()
+    return mapping
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Файл базы данных SQLite
+DATABASE_PATH = os.environ.get("DATABASE_PATH", "example.db")
+
+# Хранилища для /info/database ("имя=вид:путь,..."; первое — основное),
+# размер пула соединений каждого и тайм-аут проверки версии, секунды
+DATABASE_BACKENDS = os.environ.get("DATABASE_BACKENDS", f"main=sqlite:{DATABASE_PATH}")
+DATABASE_POOL_SIZE = env_int("DATABASE_POOL_SIZE", 4)
+DATABASE_PROBE_TIMEOUT = env_float("DATABASE_PROBE_TIMEOUT", 1.0)
+
+# Кэш /info/database: срок свежести, окно отдачи устаревшего значения с фоновым
+# обновлением и предохранитель (неудач подряд до размыкания, пауза до пробы), с
+DATABASE_INFO_TTL = env_float("DATABASE_INFO_TTL", 5.0)
+DATABASE_INFO_STALE_TTL = env_float("DATABASE_INFO_STALE_TTL", 30.0)
+DATABASE_INFO_FAILURE_THRESHOLD = env_int("DATABASE_INFO_FAILURE_THRESHOLD", 3)
+DATABASE_INFO_RESET_TIMEOUT = env_float("DATABASE_INFO_RESET_TIMEOUT", 15.0)
+
+# Журнал запросов (access log) с отложенной пакетной записью
+ACCESS_LOG_ENABLED = env_bool("ACCESS_LOG_ENABLED", True)
+ACCESS_LOG_QUEUE_SIZE = env_int("ACCESS_LOG_QUEUE_SIZE", 10000)
+ACCESS_LOG_BATCH_SIZE = env_int("ACCESS_LOG_BATCH_SIZE", 500)
+ACCESS_LOG_FLUSH_INTERVAL = env_float("ACCESS_LOG_FLUSH_INTERVAL", 1.0)
+
+# Запись входящего трафика в JSONL для последующего воспроизведения (replay.py)
+CAPTURE_ENABLED = env_bool("CAPTURE_ENABLED", False)
+CAPTURE_PATH = os.environ.get("CAPTURE_PATH", "requests.jsonl")
+CAPTURE_SAMPLE_RATE = env_float("CAPTURE_SAMPLE_RATE", 1.0)
+CAPTURE_MAX_BYTES = env_int("CAPTURE_MAX_BYTES", 64 * 1024 * 1024)
+CAPTURE_BACKUPS = env_int("CAPTURE_BACKUPS", 5)
+
+# Интервал фонового сбора системных метрик, секунды
+SYSTEM_SAMPLE_INTERVAL = env_float("SYSTEM_SAMPLE_INTERVAL", 1.0)
+
+# Контроль допуска: лимиты одновременных запросов по маршрутам ("путь=лимит"),
+# общий лимит остальных путей (0 — без ограничения) и очередь ожидания
+ADMISSION_ENABLED = env_bool("ADMISSION_ENABLED", True)
+ADMISSION_ROUTE_LIMITS = {
+    path: int(limit)
+    for path, limit in env_mapping("ADMISSION_ROUTE_LIMITS", "/info/database=16").items()
+}
+ADMISSION_DEFAULT_LIMIT = env_int("ADMISSION_DEFAULT_LIMIT", 64)
+ADMISSION_MAX_QUEUE = env_int("ADMISSION_MAX_QUEUE", 100)
+ADMISSION_QUEUE_TIMEOUT = env_float("ADMISSION_QUEUE_TIMEOUT", 0.5)
+ADMISSION_EXEMPT_PREFIXES = env_list("ADMISSION_EXEMPT_PREFIXES", "/health/,/metrics")
+
+# Бюджеты времени запросов, секунды: по умолчанию и по маршрутам ("путь=секунды");
+# клиент может сократить бюджет заголовком X-Request-Timeout
+DEADLINE_DEFAULT = env_float("DEADLINE_DEFAULT", 10.0)
+DEADLINE_ROUTE_BUDGETS = {
+    path: float(budget)
+    for path, budget in env_mapping("DEADLINE_ROUTE_BUDGETS", "/info/database=2").items()
+}
+
+# Проверки готовности: интервал фонового прогона и пороги
+HEALTH_CHECK_INTERVAL = env_float("HEALTH_CHECK_INTERVAL", 5.0)
+HEALTH_DB_TIMEOUT = env_float("HEALTH_DB_TIMEOUT", 1.0)
+HEALTH_MAX_LOOP_LAG = env_float("HEALTH_MAX_LOOP_LAG", 0.5)
+
+# Наблюдение за циклом событий: интервал замера задержки, порог, после
+# которого снимается стек блокирующего кода, и пауза между такими отчётами
+LOOP_MONITOR_INTERVAL = env_float("LOOP_MONITOR_INTERVAL", 0.1)
+LOOP_BLOCK_THRESHOLD = env_float("LOOP_BLOCK_THRESHOLD", 0.1)
+LOOP_BLOCK_COOLDOWN = env_float("LOOP_BLOCK_COOLDOWN", 5.0)
+
+# Пул потоков синхронных обработчиков (общий с FastAPI) и отдельные пулы
+# групп маршрутов по префиксу пути: "/info/database=8"
+THREADPOOL_SIZE = env_int("THREADPOOL_SIZE", 40)
+THREADPOOL_GROUPS = {
+    prefix: int(size)
+    for prefix, size in env_mapping("THREADPOOL_GROUPS", "").items()
+}
+
+# Токен отладочных маршрутов (/debug/...); пустой — маршруты выключены
+DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN", "")
+
+# Выборочный профилировщик: предельная длительность и интервал выборки
+PROFILE_MAX_SECONDS = env_float("PROFILE_MAX_SECONDS", 60.0)
+PROFILE_DEFAULT_INTERVAL_MS = env_float("PROFILE_DEFAULT_INTERVAL_MS", 10.0)
+PROFILE_MIN_INTERVAL_MS = env_float("PROFILE_MIN_INTERVAL_MS", 1.0)
+
+# Профилирование отдельных запросов по заголовку X-Profile
+REQUEST_PROFILE_INTERVAL_MS = env_float("REQUEST_PROFILE_INTERVAL_MS", 1.0)
+REQUEST_PROFILE_KEEP = env_int("REQUEST_PROFILE_KEEP", 32)
+
+# Число хранимых именованных снимков tracemalloc
+MEMORY_MAX_SNAPSHOTS = env_int("MEMORY_MAX_SNAPSHOTS", 8)
+
+# Быстрые ответы горячих маршрутов без повторной проверки моделей
+COMPACT_RESPONSES = env_bool("COMPACT_RESPONSES", False)
+
+# Общие для рабочих процессов снимки /info/server и /info/database: ведущий процесс
+# (flock на SHARED_SNAPSHOT_LOCK) публикует их в разделяемую память каждые
+# SHARED_SNAPSHOT_INTERVAL с, снимок старше SHARED_SNAPSHOT_MAX_AGE не отдаётся
+SHARED_SNAPSHOTS = env_bool("SHARED_SNAPSHOTS", False)
+SHARED_SNAPSHOT_PREFIX = os.environ.get("SHARED_SNAPSHOT_PREFIX", "server-app")
+SHARED_SNAPSHOT_LOCK = os.environ.get(
+    "SHARED_SNAPSHOT_LOCK", os.path.join(tempfile.gettempdir(), "server-app-snapshots.lock")
+)
+SHARED_SNAPSHOT_INTERVAL = env_float("SHARED_SNAPSHOT_INTERVAL", 1.0)
+SHARED_SNAPSHOT_MAX_AGE = env_float("SHARED_SNAPSHOT_MAX_AGE", 5.0)
+SHARED_SNAPSHOT_CAPACITY = env_int("SHARED_SNAPSHOT_CAPACITY", 65536)
+
+# Каталог файлов метрик рабочих процессов (по файлу на процесс); /metrics любого
+# процесса сводит их все. Пусто — метрики только текущего процесса. Первый
+# процесс нового запуска очищает каталог, включая архив завершившихся процессов
+METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR", "")
+
+# Каталог локальных ресурсов Swagger UI и ReDoc и файл заранее собранной схемы
+# OpenAPI (python docs_assets.py --output ...); без файла схема собирается при запуске
+DOCS_ASSETS_DIR = os.environ.get(
+    "DOCS_ASSETS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "docs")
+)
+OPENAPI_SCHEMA_PATH = os.environ.get("OPENAPI_SCHEMA_PATH", "")
+
+# Заголовок Server-Timing с длительностями фаз запроса
+SERVER_TIMING = env_bool("SERVER_TIMING", False)
+
+# Поиск статических GET-маршрутов по словарю до обычного маршрутизатора
+STATIC_FAST_PATH = env_bool("STATIC_FAST_PATH", False)
+
+# Запросы только на чтение (/db/query): пул соединений, кэш подготовленных
+# выражений на соединение, тайм-аут запроса и размер порции fetchmany
+QUERY_POOL_SIZE = env_int("QUERY_POOL_SIZE", 2)
+QUERY_CACHED_STATEMENTS = env_int("QUERY_CACHED_STATEMENTS", 128)
+QUERY_TIMEOUT = env_float("QUERY_TIMEOUT", 30.0)
+QUERY_BATCH_SIZE = env_int("QUERY_BATCH_SIZE", 500)
+
+# Загрузка NDJSON: размер порции executemany и интервал фиксации транзакции, с
+INGEST_BATCH_SIZE = env_int("INGEST_BATCH_SIZE", 1000)
+INGEST_COMMIT_INTERVAL = env_float("INGEST_COMMIT_INTERVAL", 1.0)
+INGEST_MAX_LINE_BYTES = env_int("INGEST_MAX_LINE_BYTES", 1024 * 1024)
+INGEST_KEEP_JOBS = env_int("INGEST_KEEP_JOBS", 32)
+# Соединения загрузок — отдельный пул, не занимающий пул проверок хранилища
+INGEST_POOL_SIZE = env_int("INGEST_POOL_SIZE", 2)
+
+# Базы MaxMind для /info/client (например, GeoLite2-City.mmdb,GeoLite2-ASN.mmdb);
+# пустой список отключает определение местоположения
+GEOIP_DATABASES = env_list("GEOIP_DATABASES", "")
+GEOIP_CACHE_SIZE = env_int("GEOIP_CACHE_SIZE", 4096)
+GEOIP_CHECK_INTERVAL = env_float("GEOIP_CHECK_INTERVAL", 30.0)
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from metrics import REGISTRY
+
+try:
+    import fcntl
+except ImportError:  # без flock каждый процесс сам себе ведущий
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+snapshot_reads = REGISTRY.counter(
+    "shared_snapshot_reads", "Чтения общих снимков ответов", ("key", "result")
+)
+snapshot_publishes = REGISTRY.counter(
+    "shared_snapshot_publishes", "Публикации общих снимков ведущим процессом", ("key", "outcome")
+)
+
+# Заголовок сегмента: счётчик seqlock, длина полезной нагрузки, время публикации
+SEQ = struct.Struct("<Q")
+META = struct.Struct("<Id")
+HEADER_SIZE = SEQ.size + META.size
+
+# Сколько раз читатель повторяет попытку, попав на запись
+READ_RETRIES = 64
+
+
+def _open_segment(name, create, size=0):
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    # Сегмент живёт дольше любого отдельного процесса: resource_tracker не должен
+    # удалять его при выходе процесса, который его создал или открыл
+    if os.name == "posix":
+        resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+class SnapshotSegment:
+    """Один снимок в разделяемой памяти под защитой seqlock.
+
+    Писатель один (ведущий процесс): нечётный счётчик означает запись в
+    процессе. Читатель копирует байты и сверяет счётчик до и после —
+    несовпадение означает, что копия могла разорваться, и чтение повторяется.
+    """
+
+    def __init__(self, segment):
+        self.segment = segment
+        self.capacity = segment.size - HEADER_SIZE
+
+    @classmethod
+    def create(cls, name, capacity):
+        try:
+            segment = _open_segment(name, create=True, size=HEADER_SIZE + capacity)
+        except FileExistsError:
+            # Сегмент остался от прежнего ведущего — продолжаем писать в него
+            segment = _open_segment(name, create=False)
+        return cls(segment)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_open_segment(name, create=False))
+
+    def publish(self, payload):
+        if len(payload) > self.capacity:
+            raise ValueError(f"снимок {len(payload)} байт больше сегмента ({self.capacity})")
+        buf = self.segment.buf
+        seq = SEQ.unpack_from(buf, 0)[0]
+        if seq & 1:
+            # Прежний ведущий умер посреди записи
+            seq += 1
+        SEQ.pack_into(buf, 0, seq + 1)
+        buf[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+        META.pack_into(buf, SEQ.size, len(payload), time.time())
+        SEQ.pack_into(buf, 0, seq + 2)
+
+    def read(self):
+        """(байты, время публикации) или None, если снимка ещё нет."""
+        buf = self.segment.buf
+        for _ in range(READ_RETRIES):
+            seq = SEQ.unpack_from(buf, 0)[0]
+            if seq == 0:
+                return None
+            if seq & 1:
+                time.sleep(0)
+                continue
+            length, published = META.unpack_from(buf, SEQ.size)
+            if length <= self.capacity:
+                payload = bytes(buf[HEADER_SIZE:HEADER_SIZE + length])
+                if SEQ.unpack_from(buf, 0)[0] == seq:
+                    return payload, published
+        return None
+
+    def close(self):
+        self.segment.close()
+
+    def unlink(self):
+        # SharedMemory.unlink снимает регистрацию, снятую уже при открытии
+        if os.name == "posix":
+            resource_tracker.register(self.segment._name, "shared_memory")
+        self.segment.unlink()
+
+
+class SharedSnapshots:
+    """Готовые тела ответов, общие для всех рабочих процессов.
+
+    Ведущим становится процесс, захвативший flock на `lock_path`; он
+    периодически вызывает поставщиков (асинхронные функции, возвращающие
+    байты) и публикует результаты. Остальные пробуют захватить блокировку
+    с тем же интервалом, так что после смерти ведущего его место занимает
+    другой процесс. Снимок старше `max_age` не отдаётся — маршрут считает
+    ответ сам.
+    """
+
+    def __init__(self, prefix, lock_path, interval=1.0, max_age=5.0, capacity=65536):
+        self.prefix = prefix
+        self.lock_path = lock_path
+        self.interval = interval
+        self.max_age = max_age
+        self.capacity = capacity
+        self.providers = {}
+        self.segments = {}
+        self.leader = False
+        self._lock_fd = None
+        self._task = None
+        # Сегменты подключаются из рабочих потоков (read) и заменяются или
+        # закрываются в цикле событий; закрытие во время чтения недопустимо
+        self._segments_lock = threading.Lock()
+
+    def add(self, key, provider):
+        self.providers[key] = provider
+
+    def segment_name(self, key):
+        return f"{self.prefix}-{key}"
+
+    def try_lead(self):
+        if self.leader:
+            return True
+        if fcntl is not None:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._lock_fd = fd
+        try:
+            # Открытые ведомым сегменты заменяются своими
+            with self._segments_lock:
+                self._close_segments()
+                for key in self.providers:
+                    self.segments[key] = SnapshotSegment.create(self.segment_name(key), self.capacity)
+        except BaseException:
+            self._release_lock()
+            raise
+        self.leader = True
+        logger.info("Процесс %d публикует общие снимки", os.getpid())
+        return True
+
+    async def refresh(self):
+        for key, provider in self.providers.items():
+            try:
+                self.segments[key].publish(await provider())
+            except Exception as exc:
+                snapshot_publishes.labels(key, "error").inc()
+                logger.warning("Снимок %s не опубликован: %s", key, exc)
+            else:
+                snapshot_publishes.labels(key, "ok").inc()
+
+    def read(self, key):
+        """Свежие байты снимка или None."""
+        with self._segments_lock:
+            segment = self.segments.get(key)
+            if segment is None:
+                try:
+                    segment = self.segments[key] = SnapshotSegment.attach(self.segment_name(key))
+                except FileNotFoundError:
+                    snapshot_reads.labels(key, "missing").inc()
+                    return None
+            snapshot = segment.read()
+        if snapshot is None:
+            snapshot_reads.labels(key, "missing").inc()
+            return None
+        payload, published = snapshot
+        if time.time() - published > self.max_age:
+            snapshot_reads.labels(key, "stale").inc()
+            return None
+        snapshot_reads.labels(key, "hit").inc()
+        return payload
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                # Остановка сервера не должна прерываться из-за фоновой задачи
+                logger.exception("Задача общих снимков завершилась с ошибкой")
+            self._task = None
+        with self._segments_lock:
+            self._close_segments()
+        self._release_lock()
+        self.leader = False
+
+    async def _run(self):
+        while True:
+            try:
+                if self.try_lead():
+                    await self.refresh()
+            except Exception as exc:
+                logger.warning("Общие снимки не обновлены, повтор через %g с: %s", self.interval, exc)
+            await asyncio.sleep(self.interval)
+
+    def _release_lock(self):
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _close_segments(self):
+        # Вызывается под _segments_lock
+        for segment in self.segments.values():
+            segment.close()
+        self.segments.clear()
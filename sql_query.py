@@ -0,0 +1,162 @@
+import csv
+import io
+import json
+import sqlite3
+import threading
+from contextlib import ExitStack
+from pathlib import Path
+
+from db_backends import ConnectionPool, SQLiteBackend
+from deadlines import Deadline, sqlite_deadline
+from server_timing import phase
+
+# Действия, которые разрешены запросам только на чтение
+ALLOWED_ACTIONS = frozenset((
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+))
+
+
+class QueryError(Exception):
+    pass
+
+
+def read_only_authorizer(action, arg1, arg2, db_name, trigger):
+    return sqlite3.SQLITE_OK if action in ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def connect_read_only(path, cached_statements):
+    # as_uri экранирует ?, # и % в пути, иначе они меняют смысл URI
+    uri = Path(path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=cached_statements)
+    conn.execute("PRAGMA query_only = ON")
+    conn.set_authorizer(read_only_authorizer)
+    return conn
+
+
+class QueryStream:
+    """Открытый курсор, строки которого выбираются порциями fetchmany.
+
+    Соединение возвращается в пул в `close()`; он вызывается и по окончании
+    выборки, и фоновой задачей ответа, если клиент отключился раньше.
+    """
+
+    def __init__(self, resources, cursor, batch_size, max_rows):
+        self.columns = [column[0] for column in cursor.description or ()]
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.rows = 0
+        self._resources = resources
+        self._cursor = cursor
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def batches(self):
+        try:
+            while self.max_rows is None or self.rows < self.max_rows:
+                size = self.batch_size
+                if self.max_rows is not None:
+                    size = min(size, self.max_rows - self.rows)
+                with self._lock:
+                    if self._closed:
+                        return
+                    rows = self._cursor.fetchmany(size)
+                if not rows:
+                    return
+                self.rows += len(rows)
+                yield rows
+        finally:
+            self.close()
+
+    def ndjson(self):
+        columns = self.columns
+        for rows in self.batches():
+            yield "".join(
+                json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_encode_bytes) + "\n"
+                for row in rows
+            ).encode()
+
+    def csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        for rows in self.batches():
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._cursor.close()
+            self._resources.close()
+
+
+def _encode_bytes(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется")
+
+
+class ReadOnlyQueries:
+    """Запросы только на чтение к файловым хранилищам SQLite.
+
+    Соединения открываются с mode=ro и query_only, авторизатор запрещает
+    всё, кроме чтения, а кэш подготовленных выражений у каждого соединения
+    свой (`cached_statements`).
+    """
+
+    def __init__(self, registry, pool_size=4, cached_statements=128, timeout=30.0):
+        self.registry = registry
+        self.pool_size = pool_size
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, backend_name):
+        try:
+            backend = self.registry.get(backend_name) if backend_name else self.registry.primary
+        except KeyError:
+            raise QueryError(f"Хранилище {backend_name} не настроено") from None
+        if not isinstance(backend, SQLiteBackend) or backend.target == ":memory:":
+            raise QueryError(f"Хранилище {backend.name} не поддерживает запросы только на чтение")
+        with self._lock:
+            pool = self._pools.get(backend.name)
+            if pool is None:
+                pool = self._pools[backend.name] = ConnectionPool(
+                    lambda: connect_read_only(backend.target, self.cached_statements), self.pool_size
+                )
+        return pool
+
+    def execute(self, sql, params=(), backend=None, batch_size=500, max_rows=None):
+        """Выполняет запрос и возвращает поток строк; ошибки разбора и запрета
+        записи всплывают здесь, до начала ответа.
+        """
+        pool = self._pool(backend)
+        resources = ExitStack()
+        try:
+            try:
+                conn = resources.enter_context(pool.connection(self.timeout))
+                resources.enter_context(sqlite_deadline(conn, Deadline(self.timeout)))
+                with phase("db-query"):
+                    cursor = conn.execute(sql, params)
+            except sqlite3.Error as exc:
+                raise QueryError(str(exc)) from exc
+        except BaseException:
+            resources.close()
+            raise
+        return QueryStream(resources, cursor, batch_size, max_rows)
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
@@ -0,0 +1,246 @@
+import sqlite3
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import closing
+
+# Агрегаты журнала запросов по минутам и часам.
+# Поддерживаются инкрементально в той же транзакции, что и вставка пачки
+# в access_log, поэтому запросы панелей читают сотни строк вместо миллионов.
+
+MINUTE = 60
+HOUR = 3600
+RESOLUTIONS = (MINUTE, HOUR)
+
+# Окна до шести часов читаем из минутных агрегатов, длиннее — из часовых
+MINUTE_WINDOW_LIMIT = 6 * HOUR
+
+# Границы бакетов гистограммы задержек, мс (последний бакет — всё, что больше)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS access_rollup (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    route TEXT NOT NULL,
+    locale TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    client_errors INTEGER NOT NULL,
+    server_errors INTEGER NOT NULL,
+    latency_sum REAL NOT NULL,
+    latency_max REAL NOT NULL,
+    PRIMARY KEY (resolution, bucket, route, locale)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS access_rollup_latency (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    route TEXT NOT NULL,
+    le_index INTEGER NOT NULL,
+    requests INTEGER NOT NULL,
+    PRIMARY KEY (resolution, bucket, route, le_index)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS access_rollup_clients (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    client_ip TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    PRIMARY KEY (resolution, bucket, client_ip)
+) WITHOUT ROWID;
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO access_rollup VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, bucket, route, locale) DO UPDATE SET
+    requests = requests + excluded.requests,
+    client_errors = client_errors + excluded.client_errors,
+    server_errors = server_errors + excluded.server_errors,
+    latency_sum = latency_sum + excluded.latency_sum,
+    latency_max = max(latency_max, excluded.latency_max)
+"""
+
+UPSERT_LATENCY = """
+INSERT INTO access_rollup_latency VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (resolution, bucket, route, le_index) DO UPDATE SET
+    requests = requests + excluded.requests
+"""
+
+UPSERT_CLIENTS = """
+INSERT INTO access_rollup_clients VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (resolution, bucket, client_ip) DO UPDATE SET
+    requests = requests + excluded.requests,
+    errors = errors + excluded.errors
+"""
+
+
+def locale_key(locale):
+    """Основной языковой тег из Accept-Language: 'ru-RU,ru;q=0.9' -> 'ru'."""
+    if not locale:
+        return ""
+    return locale.split(",", 1)[0].split(";", 1)[0].split("-", 1)[0].strip().lower()
+
+
+class RollupSink:
+    """Обработчик пачек журнала запросов, обновляющий агрегаты."""
+
+    def setup(self, conn):
+        conn.executescript(ROLLUP_SCHEMA)
+
+    def write(self, conn, batch):
+        rollup = defaultdict(lambda: [0, 0, 0, 0.0, 0.0])
+        latency = defaultdict(int)
+        clients = defaultdict(lambda: [0, 0])
+        for record in batch:
+            le_index = bisect_left(LATENCY_BUCKETS_MS, record.latency_ms)
+            client_error = 400 <= record.status < 500
+            server_error = record.status >= 500
+            locale = locale_key(record.locale)
+            for resolution in RESOLUTIONS:
+                bucket = int(record.ts) // resolution * resolution
+                row = rollup[resolution, bucket, record.route, locale]
+                row[0] += 1
+                row[1] += client_error
+                row[2] += server_error
+                row[3] += record.latency_ms
+                row[4] = max(row[4], record.latency_ms)
+                latency[resolution, bucket, record.route, le_index] += 1
+                client = clients[resolution, bucket, record.client_ip or ""]
+                client[0] += 1
+                client[1] += client_error or server_error
+        conn.executemany(UPSERT_ROLLUP, [key + tuple(row) for key, row in rollup.items()])
+        conn.executemany(UPSERT_LATENCY, [key + (count,) for key, count in latency.items()])
+        conn.executemany(UPSERT_CLIENTS, [key + tuple(row) for key, row in clients.items()])
+
+
+def window_range(window, now=None):
+    """Разрешение агрегатов и начало окна для окна длиной `window` секунд."""
+    now = time.time() if now is None else now
+    resolution = MINUTE if window <= MINUTE_WINDOW_LIMIT else HOUR
+    since = int(now - window) // resolution * resolution
+    return resolution, since
+
+
+def percentile(counts, q):
+    """Оценка перцентиля по гистограмме {le_index: requests} с интерполяцией
+    внутри бакета. Для последнего (открытого) бакета возвращается его нижняя граница.
+    """
+    total = sum(counts.values())
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for le_index in sorted(counts):
+        count = counts[le_index]
+        if seen + count >= rank:
+            lower = LATENCY_BUCKETS_MS[le_index - 1] if le_index > 0 else 0.0
+            if le_index >= len(LATENCY_BUCKETS_MS):
+                return float(lower)
+            upper = LATENCY_BUCKETS_MS[le_index]
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+class StatsReader:
+    """Запросы панелей к таблицам агрегатов."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _query(self, sql, params):
+        with closing(sqlite3.connect(self.path)) as conn:
+            try:
+                return conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as exc:
+                # Агрегаты ещё не созданы: писатель журнала не запускался
+                if "no such table" in str(exc):
+                    return []
+                raise
+
+    def routes(self, window, now=None):
+        resolution, since = window_range(window, now)
+        rows = self._query(
+            """
+            SELECT route, SUM(requests), SUM(client_errors), SUM(server_errors),
+                   SUM(latency_sum), MAX(latency_max)
+            FROM access_rollup
+            WHERE resolution = ? AND bucket >= ?
+            GROUP BY route
+            ORDER BY SUM(requests) DESC
+            """,
+            (resolution, since),
+        )
+        return [
+            {
+                "route": route,
+                "requests": requests,
+                "client_errors": client_errors,
+                "server_errors": server_errors,
+                "error_rate": (client_errors + server_errors) / requests,
+                "avg_latency_ms": latency_sum / requests,
+                "max_latency_ms": latency_max,
+            }
+            for route, requests, client_errors, server_errors, latency_sum, latency_max in rows
+        ]
+
+    def latency(self, window, route=None, now=None):
+        resolution, since = window_range(window, now)
+        sql = """
+            SELECT route, le_index, SUM(requests)
+            FROM access_rollup_latency
+            WHERE resolution = ? AND bucket >= ?
+        """
+        params = [resolution, since]
+        if route is not None:
+            sql += " AND route = ?"
+            params.append(route)
+        sql += " GROUP BY route, le_index"
+        histograms = defaultdict(dict)
+        for route_path, le_index, count in self._query(sql, params):
+            histograms[route_path][le_index] = count
+        return [
+            {
+                "route": route_path,
+                "requests": sum(counts.values()),
+                "p50_ms": percentile(counts, 0.50),
+                "p90_ms": percentile(counts, 0.90),
+                "p95_ms": percentile(counts, 0.95),
+                "p99_ms": percentile(counts, 0.99),
+            }
+            for route_path, counts in sorted(histograms.items())
+        ]
+
+    def clients(self, window, limit=10, now=None):
+        resolution, since = window_range(window, now)
+        rows = self._query(
+            """
+            SELECT client_ip, SUM(requests) AS total, SUM(errors)
+            FROM access_rollup_clients
+            WHERE resolution = ? AND bucket >= ?
+            GROUP BY client_ip
+            ORDER BY total DESC
+            LIMIT ?
+            """,
+            (resolution, since, limit),
+        )
+        return [
+            {"client_ip": client_ip, "requests": requests, "errors": errors}
+            for client_ip, requests, errors in rows
+        ]
+
+    def locales(self, window, now=None):
+        resolution, since = window_range(window, now)
+        rows = self._query(
+            """
+            SELECT bucket, locale, SUM(requests)
+            FROM access_rollup
+            WHERE resolution = ? AND bucket >= ?
+            GROUP BY bucket, locale
+            ORDER BY bucket, locale
+            """,
+            (resolution, since),
+        )
+        return [
+            {"bucket": bucket, "resolution": resolution, "locale": locale, "requests": requests}
+            for bucket, locale, requests in rows
+        ]
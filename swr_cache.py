@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+
+from deadlines import DeadlineExceeded
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+cache_requests = REGISTRY.counter(
+    "provider_cache_requests", "Обращения к кэшу поставщиков данных", ("cache", "result")
+)
+cache_refreshes = REGISTRY.counter(
+    "provider_cache_refreshes", "Вычисления значений кэша поставщиков", ("cache", "outcome")
+)
+circuit_open = REGISTRY.gauge(
+    "provider_circuit_open", "Разомкнут ли предохранитель поставщика (1 — да)", ("cache",)
+)
+
+# Результат обращения, возвращаемый вместе со значением
+FRESH, STALE, MISS, FALLBACK = "fresh", "stale", "miss", "fallback"
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Размыкается после `threshold` неудач подряд; через `reset_timeout`
+    пропускает одну пробную попытку (полуоткрытое состояние).
+    """
+
+    def __init__(self, threshold=3, reset_timeout=15.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class SWRCache:
+    """Кэш одного значения поставщика: stale-while-revalidate и single-flight.
+
+    - моложе `ttl` — отдаётся как есть;
+    - моложе `ttl + stale_ttl` — отдаётся сразу, а обновление идёт в фоне;
+    - иначе все одновременные промахи ждут одно общее вычисление.
+
+    Если вычисление не удалось или предохранитель разомкнут, отдаётся
+    последнее удачное значение любого возраста; без него ошибка всплывает.
+    Вычисление выполняется в своей задаче, и отмена ожидающего запроса его
+    не прерывает.
+    """
+
+    def __init__(self, name, compute, ttl=5.0, stale_ttl=30.0, breaker=None):
+        self.name = name
+        self.compute = compute
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.breaker = breaker or CircuitBreaker()
+        self.value = None
+        self.updated_at = None
+        self.last_error = None
+        self._inflight = None
+
+    def clear(self):
+        self.value = None
+        self.updated_at = None
+
+    def age(self):
+        return None if self.updated_at is None else time.monotonic() - self.updated_at
+
+    def _refresh(self):
+        """Общая задача вычисления; новая создаётся, только если нет текущей."""
+        loop = asyncio.get_running_loop()
+        if self._inflight is None or self._inflight.get_loop() is not loop:
+            self._inflight = loop.create_task(self._run())
+            # Ошибка уже учтена в _run; забираем её, даже если ждать некому
+            self._inflight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._inflight
+
+    async def _run(self):
+        try:
+            value = await self.compute()
+        except Exception as exc:
+            self.last_error = exc
+            self.breaker.failure()
+            cache_refreshes.labels(self.name, "error").inc()
+            logger.warning("Обновление %s не удалось (%d подряд): %s",
+                           self.name, self.breaker.failures, exc)
+            raise
+        else:
+            self.value = value
+            self.updated_at = time.monotonic()
+            self.breaker.success()
+            cache_refreshes.labels(self.name, "ok").inc()
+            return value
+        finally:
+            if self._inflight is asyncio.current_task():
+                self._inflight = None
+            circuit_open.labels(self.name).set(1 if self.breaker.state == "open" else 0)
+
+    def _result(self, result, value):
+        cache_requests.labels(self.name, result).inc()
+        return value, result
+
+    async def get(self, deadline=None):
+        """(значение, результат обращения); ожидание ограничено сроком запроса."""
+        age = self.age()
+        if age is not None and age < self.ttl:
+            return self._result(FRESH, self.value)
+        if not self.breaker.allow():
+            if self.updated_at is not None:
+                return self._result(FALLBACK, self.value)
+            raise CircuitOpen(f"{self.name}: предохранитель разомкнут") from self.last_error
+        if age is not None and age < self.ttl + self.stale_ttl:
+            self._refresh()
+            return self._result(STALE, self.value)
+        task = self._refresh()
+        try:
+            if deadline is None:
+                value = await asyncio.shield(task)
+            else:
+                value = await asyncio.wait_for(asyncio.shield(task), deadline.remaining())
+        except asyncio.TimeoutError:
+            if self.updated_at is not None:
+                return self._result(FALLBACK, self.value)
+            raise DeadlineExceeded(deadline.budget) from None
+        except Exception:
+            if self.updated_at is not None:
+                return self._result(FALLBACK, self.value)
+            raise
+        return self._result(MISS, value)
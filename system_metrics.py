@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STARTED = time.monotonic()
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def read_cpu_times():
+    """Суммарное и простаивающее время CPU в тиках из /proc/stat."""
+    text = _read("/proc/stat")
+    if text is None:
+        return None
+    fields = [int(value) for value in text.split("\n", 1)[0].split()[1:]]
+    # user nice system idle iowait irq softirq steal (guest уже учтён в user)
+    total = sum(fields[:8])
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return total, idle
+
+
+def read_meminfo():
+    text = _read("/proc/meminfo")
+    if text is None:
+        return {}
+    values = {}
+    for line in text.splitlines():
+        name, _, rest = line.partition(":")
+        parts = rest.split()
+        if parts:
+            values[name] = int(parts[0]) * 1024
+    return values
+
+
+def read_loadavg():
+    text = _read("/proc/loadavg")
+    if text is not None:
+        return [float(value) for value in text.split()[:3]]
+    if hasattr(os, "getloadavg"):
+        return list(os.getloadavg())
+    return None
+
+
+def read_uptime():
+    text = _read("/proc/uptime")
+    return float(text.split()[0]) if text else None
+
+
+class SystemSampler:
+    """Фоновый сбор загрузки CPU, памяти и load average из /proc.
+
+    Обработчики запросов читают только последний снимок (`latest`), сами
+    файлы /proc читаются лишь в потоке сборщика с фиксированным интервалом.
+    Слушатели из `listeners` вызываются с каждым новым снимком в том же потоке.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.latest = None
+        self.listeners = []
+        self._cpu = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        # Первый снимок при запуске, чтобы маршрут не ждал интервал
+        self.sample_once()
+        self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample_once()
+            except Exception:
+                logger.exception("Не удалось собрать системные метрики")
+
+    def sample_once(self):
+        cpu = read_cpu_times()
+        cpu_percent = None
+        if cpu is not None and self._cpu is not None:
+            total = cpu[0] - self._cpu[0]
+            idle = cpu[1] - self._cpu[1]
+            if total > 0:
+                cpu_percent = round(100.0 * (total - idle) / total, 2)
+        self._cpu = cpu
+
+        memory = read_meminfo()
+        memory_total = memory.get("MemTotal")
+        memory_available = memory.get("MemAvailable", memory.get("MemFree"))
+        swap_total = memory.get("SwapTotal")
+        swap_free = memory.get("SwapFree")
+        sample = {
+            "cpu_percent": cpu_percent,
+            "load_average": read_loadavg(),
+            "memory_total": memory_total,
+            "memory_available": memory_available,
+            "memory_used_percent": (
+                round(100.0 * (memory_total - memory_available) / memory_total, 2)
+                if memory_total and memory_available is not None else None
+            ),
+            "swap_total": swap_total,
+            "swap_used": swap_total - swap_free if swap_total is not None and swap_free is not None else None,
+            "uptime_seconds": read_uptime(),
+            "process_uptime_seconds": round(time.monotonic() - PROCESS_STARTED, 3),
+            "sampled_at": time.time(),
+        }
+        # Снимок заменяется целиком, читатели никогда не видят его частично
+        self.latest = sample
+        for listener in self.listeners:
+            listener(sample)
+        return sample
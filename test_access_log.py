@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from access_log import AccessLogWriter, AccessRecord
+
+
+def make_record(route="/", status=200):
+    return AccessRecord(time.time(), "GET", route, status, 1.5, "127.0.0.1", "pytest", "ru")
+
+
+# Пачки сбрасываются в таблицу access_log из фонового потока
+def test_writer_flushes_batches(tmp_path):
+    path = str(tmp_path / "access.db")
+    writer = AccessLogWriter(path, queue_size=100, batch_size=10, flush_interval=0.05)
+    writer.start()
+    for _ in range(25):
+        assert writer.submit(make_record())
+    writer.stop()
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM access_log").fetchone()[0] == 25
+    conn.close()
+
+
+# При переполнении очереди запись отбрасывается и учитывается в счётчике
+def test_writer_drops_on_backpressure(tmp_path):
+    writer = AccessLogWriter(str(tmp_path / "access.db"), queue_size=2)
+    assert writer.submit(make_record())
+    assert writer.submit(make_record())
+    assert not writer.submit(make_record())
+    assert writer.dropped == 1
+
+
+# Middleware ставит запись о запросе в очередь с маршрутом и локалью
+def test_middleware_enqueues_record(tmp_path, monkeypatch):
+    writer = AccessLogWriter(str(tmp_path / "access.db"), queue_size=10)
+    monkeypatch.setattr(main, "access_log", writer)
+    response = TestClient(main.app).get("/info/client", headers={"Accept-Language": "ru"})
+    assert response.status_code == 200
+    record = writer.queue.get_nowait()
+    assert record.route == "/info/client"
+    assert record.status == 200
+    assert record.locale == "ru"
+    assert record.user_agent == "testclient"
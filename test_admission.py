@@ -0,0 +1,51 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from admission import AdmissionController, RouteLimiter
+
+
+# Сверх лимита запросы ждут в очереди, сверх очереди — сразу отклоняются
+def test_limiter_queues_and_rejects():
+    async def scenario():
+        limiter = RouteLimiter("/", limit=1, max_queue=1)
+        assert await limiter.acquire(1.0)
+        waiting = asyncio.create_task(limiter.acquire(1.0))
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        assert not await limiter.acquire(1.0)
+        limiter.release()
+        assert await waiting
+        assert limiter.active == 1
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+
+
+# По истечении срока ожидания запрос отклоняется и освобождает очередь
+def test_limiter_deadline():
+    async def scenario():
+        limiter = RouteLimiter("/", limit=1, max_queue=10)
+        assert await limiter.acquire(1.0)
+        assert not await limiter.acquire(0.01)
+        assert limiter.queued == 0
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+
+
+# Перегруженный маршрут отвечает 503 с Retry-After, проверки живости не отбрасываются
+def test_shedding_response(monkeypatch):
+    controller = AdmissionController(
+        route_limits={"/info/client": 0}, max_queue=0, queue_timeout=2.0, exempt_prefixes=("/health/",)
+    )
+    monkeypatch.setattr(main, "admission", controller)
+    client = TestClient(main.app)
+    response = client.get("/info/client")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert client.get("/info/server").status_code == 200
+    assert controller.limiter_for("/health/live") is None
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import os
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from capture import CaptureMiddleware, TrafficCapture
+from replay import parse_speed, read_records, replay
+
+
+def capture_requests(tmp_path, monkeypatch, paths):
+    capture = TrafficCapture(str(tmp_path / "requests.jsonl"), flush_interval=0.01)
+    monkeypatch.setattr(settings, "CAPTURE_ENABLED", True)
+    monkeypatch.setattr(main, "traffic_capture", capture)
+    client = TestClient(main.app)
+    for path in paths:
+        client.get(path, headers={"Accept-Language": "ru", "Authorization": "secret"})
+    capture.start()
+    capture.stop()
+    return capture.path
+
+
+# Middleware записывает запросы в JSONL без секретных заголовков
+def test_capture_writes_jsonl(tmp_path, monkeypatch):
+    path = capture_requests(tmp_path, monkeypatch, ["/", "/info/server?x=1"])
+    records = list(read_records(path))
+    assert [record["path"] for record in records] == ["/", "/info/server"]
+    assert records[1]["query"] == "x=1"
+    assert records[0]["status"] == 200
+    assert records[0]["headers"]["accept-language"] == "ru"
+    assert "authorization" not in records[0]["headers"]
+
+
+# Файл ротируется по размеру с сохранением резервных копий
+def test_capture_rotates(tmp_path):
+    path = str(tmp_path / "requests.jsonl")
+    capture = TrafficCapture(path, max_bytes=100, backups=2)
+    capture.open()
+    for index in range(4):
+        capture.write_batch([{"method": "GET", "path": "/" + "x" * 100, "ts": index}])
+    capture.close()
+    assert os.path.exists(path + ".1")
+    assert os.path.exists(path + ".2")
+    assert not os.path.exists(path + ".3")
+    with open(path + ".1") as file:
+        assert json.loads(file.readline())["ts"] == 3
+
+
+# Записанный трафик воспроизводится против приложения с отчётом о задержках
+def test_replay_against_app(tmp_path, monkeypatch):
+    path = capture_requests(tmp_path, monkeypatch, ["/", "/info/client", "/missing"])
+    monkeypatch.setattr(settings, "CAPTURE_ENABLED", False)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            return await replay(read_records(path), client, speed=None, concurrency=2)
+
+    summary = asyncio.run(run()).summary()
+    assert summary["requests"] == 3
+    assert summary["statuses"] == {200: 2, 404: 1}
+    assert summary["latency_ms"]["p50"] is not None
+
+
+def test_parse_speed():
+    assert parse_speed("10x") == 10.0
+    assert parse_speed("1") == 1.0
+    assert parse_speed("max") is None
+
+
+# Выключенная запись не обращается к TrafficCapture и не оборачивает send
+def test_disabled_middleware_passes_through():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append((receive, send))
+
+    async def receive():
+        pass
+
+    async def send(message):
+        pass
+
+    def capture():
+        raise AssertionError("запись выключена")
+
+    middleware = CaptureMiddleware(app, capture, enabled=lambda: False)
+    asyncio.run(middleware({"type": "http"}, receive, send))
+    assert calls == [(receive, send)]
@@ -0,0 +1,55 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from db_backends import BackendRegistry, SQLiteBackend
+
+client = TestClient(main.app)
+# Клиент без заголовка User-Agent
+bare_client = TestClient(main.app)
+del bare_client.headers["user-agent"]
+
+FIXED_SERVER_INFO = {"python_version": "3.11.7", "system": "Линукс", "server_time": "2024-01-01 10:00:00"}
+
+
+def fetch_all(compact, monkeypatch):
+    monkeypatch.setattr(settings, "COMPACT_RESPONSES", compact)
+    return [
+        (response.status_code, response.headers["content-type"], response.content)
+        for response in (
+            client.get("/info/server"),
+            client.get("/info/client", headers={"User-Agent": "agent/1.0 \"quoted\" \\ slash"}),
+            bare_client.get("/info/client"),
+            client.get("/info/database"),
+        )
+    ]
+
+
+# Быстрые ответы побайтно совпадают с ответами через pydantic-модели
+def test_wire_output_identical(monkeypatch):
+    monkeypatch.setattr(main, "server_info_values", lambda: dict(FIXED_SERVER_INFO))
+    assert fetch_all(True, monkeypatch) == fetch_all(False, monkeypatch)
+
+
+# Схема OpenAPI горячих маршрутов та же, что у маршрутов, объявленных
+# только с моделями ответа
+def test_openapi_schema_matches_models():
+    models = {"/info/server": main.ServerInfo, "/info/client": main.ClientInfo, "/info/database": main.DatabaseInfo}
+    reference = FastAPI()
+    for path, model in models.items():
+        reference.add_api_route(path, lambda: None, response_model=model)
+    expected = reference.openapi()
+    actual = main.app.openapi()
+    for path in models:
+        assert actual["paths"][path]["get"]["responses"]["200"] == expected["paths"][path]["get"]["responses"]["200"]
+    for name, schema in expected["components"]["schemas"].items():
+        assert actual["components"]["schemas"][name] == schema
+
+
+# Значения поставщиков проверяются моделями при запуске, даже если хранилище недоступно
+def test_startup_validation(monkeypatch):
+    main.validate_compact_encoders()
+    unreachable = BackendRegistry([SQLiteBackend("main", "/nonexistent/dir/app.db")])
+    monkeypatch.setattr(main, "database_backends", unreachable)
+    main.validate_compact_encoders()
@@ -0,0 +1,72 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from db_backends import BackendRegistry, ConnectionPool, PoolTimeout, SQLiteBackend, duckdb, parse_backends
+from swr_cache import SWRCache
+
+
+class SlowBackend(SQLiteBackend):
+    def version(self, conn, deadline):
+        time.sleep(0.5)
+        return super().version(conn, deadline)
+
+
+# Хранилища задаются строкой настроек, первое считается основным
+def test_parse_backends(tmp_path):
+    path = str(tmp_path / "a.db")
+    backends = parse_backends(f"main=sqlite:{path},scratch=sqlite::memory:,olap=duckdb:x.duckdb")
+    names = [backend.name for backend in backends]
+    assert names[:2] == ["main", "scratch"]
+    assert ("olap" in names) == (duckdb is not None)
+    assert backends[1].target == ":memory:"
+    with pytest.raises(ValueError):
+        parse_backends("main=postgres:localhost")
+
+
+# Пул переиспользует соединения и ограничивает их число
+def test_pool_reuses_and_limits():
+    pool = ConnectionPool(lambda: sqlite3.connect(":memory:"), size=1)
+    with pool.connection() as first:
+        with pytest.raises(PoolTimeout):
+            with pool.connection(timeout=0.01):
+                pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool.stats() == {"size": 1, "open": 1, "idle": 1, "in_use": 0}
+    pool.close()
+
+
+# Медленное хранилище не задерживает остальные: проверки идут параллельно
+def test_probe_all_isolates_slow_backend(tmp_path):
+    registry = BackendRegistry([
+        SQLiteBackend("main", str(tmp_path / "main.db")),
+        SlowBackend("slow", ":memory:"),
+        SQLiteBackend("memory", ":memory:"),
+    ])
+    started = time.monotonic()
+    results = asyncio.run(registry.probe_all(timeout=0.1))
+    assert time.monotonic() - started < 0.4
+    assert [result["status"] for result in results] == ["ok", "timeout", "ok"]
+    registry.close()
+
+
+# /info/database перечисляет все хранилища
+def test_database_info_lists_backends(tmp_path, monkeypatch):
+    registry = BackendRegistry([
+        SQLiteBackend("main", str(tmp_path / "main.db")),
+        SQLiteBackend("memory", ":memory:"),
+    ])
+    monkeypatch.setattr(main, "database_backends", registry)
+    monkeypatch.setattr(main, "database_info_cache", SWRCache("database_info", main.fetch_database_info))
+    response = TestClient(main.app).get("/info/database")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["database"] == "SQLite"
+    assert [backend["name"] for backend in data["backends"]] == ["main", "memory"]
+    assert all(backend["version"] == data["version"] for backend in data["backends"])
+    registry.close()
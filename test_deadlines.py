@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from deadlines import Deadline, DeadlineExceeded, InterruptWatchdog, request_budget, request_timeouts, sqlite_deadline
+
+# Запрос, который без прерывания выполняется очень долго
+ENDLESS_QUERY = """
+WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter)
+SELECT COUNT(*) FROM counter
+"""
+
+
+# Долгий запрос SQLite прерывается по истечении бюджета
+def test_sqlite_query_is_interrupted():
+    conn = sqlite3.connect(":memory:")
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        with sqlite_deadline(conn, Deadline(0.05)):
+            conn.execute(ENDLESS_QUERY).fetchone()
+    assert time.monotonic() - started < 1.0
+    # После выхода соединение снова пригодно для работы
+    assert conn.execute("SELECT 1").fetchone() == (1,)
+    conn.close()
+
+
+class SlowInterrupt:
+    def __init__(self):
+        self.started = threading.Event()
+        self.finished = False
+
+    def interrupt(self):
+        self.started.set()
+        time.sleep(0.05)
+        self.finished = True
+
+
+# Отменённое наблюдение не прерывает соединение, а отмена ждёт идущего прерывания
+def test_watchdog_cancel_is_final():
+    watchdog = InterruptWatchdog()
+    cancelled = SlowInterrupt()
+    watchdog.cancel(watchdog.watch(cancelled, time.monotonic() + 0.02))
+    assert watchdog._active == {}
+
+    expired = SlowInterrupt()
+    token = watchdog.watch(expired, time.monotonic())
+    assert expired.started.wait(1.0)
+    # Соединение возвращается в пул только после cancel — к этому моменту
+    # прерывание уже завершено
+    watchdog.cancel(token)
+    assert expired.finished
+    time.sleep(0.05)
+    assert not cancelled.started.is_set()
+
+
+# Клиент может только сократить бюджет маршрута
+def test_request_budget():
+    budgets = {"/info/database": 2.0}
+    assert request_budget("/info/database", None, budgets, 10.0) == 2.0
+    assert request_budget("/info/database", "0.5", budgets, 10.0) == 0.5
+    assert request_budget("/info/database", "60", budgets, 10.0) == 2.0
+    assert request_budget("/", "bogus", budgets, 10.0) == 10.0
+
+
+# Истёкший бюджет даёт 504 и учитывается в метриках
+def test_database_info_timeout():
+    timeouts = request_timeouts.labels("/info/database")
+    before = timeouts.value
+    response = TestClient(main.app).get("/info/database", headers={"X-Request-Timeout": "0.000001"})
+    assert response.status_code == 504
+    assert response.json()["detail"] == "Превышено время обработки запроса"
+    assert timeouts.value == before + 1
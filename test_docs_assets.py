@@ -0,0 +1,47 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from docs_assets import IMMUTABLE, DocsAssets, main as build_schema
+
+client = TestClient(main.app)
+
+
+# Схема совпадает со схемой FastAPI, повторный запрос с ETag — 304, тело сжато
+def test_openapi_cached():
+    response = client.get("/openapi.json")
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == main.app.openapi()
+    etag = response.headers["etag"]
+    assert client.get("/openapi.json", headers={"If-None-Match": etag}).status_code == 304
+    plain = client.get("/openapi.json", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] == etag
+
+
+# Страницы ссылаются только на локальные версионированные ресурсы
+def test_docs_pages_use_local_assets():
+    for path in ("/docs", "/redoc"):
+        page = client.get(path)
+        assert page.status_code == 200
+        assert "cdn.jsdelivr.net" not in page.text and "fonts.googleapis.com" not in page.text
+        assert "/docs-assets/" in page.text
+    asset_url = main.docs_assets.url("swagger-ui-bundle.js")
+    assert asset_url in client.get("/docs").text
+    asset = client.get(asset_url)
+    assert asset.status_code == 200
+    assert asset.headers["cache-control"] == IMMUTABLE
+    assert "javascript" in asset.headers["content-type"]
+    assert client.get("/docs-assets/missing.js").status_code == 404
+
+
+# Схема, собранная при сборке, отдаётся как есть
+def test_prebuilt_schema(tmp_path):
+    path = tmp_path / "openapi.json"
+    build_schema(["--app", "main:app", "--output", str(path)])
+    assert json.loads(path.read_bytes()) == main.app.openapi()
+    assets = DocsAssets(main.app, settings.DOCS_ASSETS_DIR, schema_path=str(path)).build()
+    assert assets.schema.body == path.read_bytes()
@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from errors import http_errors, negotiate
+
+client = TestClient(main.app)
+
+
+# Язык берётся из значения, сохранённого set_locale
+def test_negotiate():
+    assert negotiate("ru") == "ru"
+    assert negotiate("en-US,ru;q=0.5") == "en"
+    assert negotiate("de-DE, ru-RU;q=0.8, en;q=0.5") == "ru"
+    assert negotiate(None) == "ru"
+
+
+# 404 и 405 — заготовленные тела на языке клиента; счётчики растут
+def test_not_found_and_method_not_allowed():
+    not_found = http_errors.labels("404")
+    before = not_found.value
+    response = client.get("/wp-login.php")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Не найдено"}
+    response = client.get("/.env", headers={"Accept-Language": "en-US,ru;q=0.5"})
+    assert response.json() == {"detail": "Not Found"}
+    assert not_found.value == before + 2
+
+    response = client.post("/info/server")
+    assert response.status_code == 405
+    assert response.headers["allow"] == "GET"
+    assert response.json() == {"detail": "Метод не поддерживается"}
+
+
+# Собственные описания маршрутов не подменяются
+def test_custom_detail_kept(monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "secret")
+    response = client.get("/debug/profile/requests/missing", headers={"X-Debug-Token": "wrong"})
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Неверный токен отладки"}
+
+
+# 422: список ошибок в прежнем виде плюс сообщение на языке клиента
+def test_validation_error():
+    response = client.get("/info/server/history", params={"resolution": "abc"},
+                          headers={"Accept-Language": "en,ru"})
+    assert response.status_code == 422
+    body = response.json()
+    assert body["message"] == "Request validation failed"
+    assert body["detail"][0]["loc"] == ["query", "resolution"]
+    assert set(body["detail"][0]) >= {"type", "loc", "msg", "input"}
@@ -0,0 +1,73 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from fast_routes import StaticDispatcher, install, static_get_routes
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: str):
+        return {"item": item_id}
+
+    @app.get("/items/special")
+    def get_special():
+        return {"item": "special"}
+
+    @app.post("/orders")
+    def create_order():
+        return {"created": True}
+
+    @app.get("/orders")
+    def list_orders():
+        return {"orders": []}
+
+    @app.get("/plain")
+    def plain():
+        return {"plain": True}
+
+    return app
+
+
+# В таблицу попадают только статические GET-маршруты, не перекрытые более ранними
+def test_static_table():
+    app = build_app()
+    table = static_get_routes(app.router.routes)
+    assert "/items/special" not in table
+    assert table["/orders"].endpoint.__name__ == "list_orders"
+    assert table["/plain"].endpoint.__name__ == "plain"
+    client = TestClient(app)
+    install(app.router)
+    assert client.get("/items/special").json() == {"item": "special"}
+    assert client.get("/orders").json() == {"orders": []}
+    assert client.post("/orders").json() == {"created": True}
+
+
+def responses(client):
+    requests = [
+        ("GET", "/health/live"),
+        ("GET", "/"),
+        ("GET", "/info/client"),
+        ("GET", "/info/client/"),
+        ("HEAD", "/health/live"),
+        ("POST", "/info/client"),
+        ("GET", "/missing"),
+        ("GET", "/debug/profile/requests/unknown"),
+    ]
+    results = []
+    for method, path in requests:
+        response = client.request(method, path, follow_redirects=False)
+        results.append((method, path, response.status_code, response.headers.get("location"), response.content))
+    return results
+
+
+# Ответы приложения с быстрым путём и без него совпадают
+def test_routing_unchanged(monkeypatch):
+    client = TestClient(main.app)
+    expected = responses(client)
+    dispatcher = StaticDispatcher(main.app.router)
+    monkeypatch.setattr(main.app.router, "middleware_stack", dispatcher)
+    assert responses(client) == expected
+    assert "/info/client" in dispatcher.table and "/health/live" in dispatcher.table
@@ -0,0 +1,99 @@
+import os
+
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from geoip import GeoIPResolver, MMapDatabase
+
+CITY = {
+    "country": {"iso_code": "RU", "names": {"en": "Russia"}},
+    "city": {"names": {"en": "Yekaterinburg"}},
+}
+ASN = {"autonomous_system_number": 12345, "autonomous_system_organization": "Example Net"}
+
+
+class FakeReader:
+    def __init__(self, records):
+        self.records = records
+        self.calls = 0
+
+    def get(self, ip):
+        self.calls += 1
+        if ip == "not-an-ip":
+            raise ValueError("not an IP address")
+        return self.records.get(ip)
+
+
+def fake_database(tmp_path, name, records, opened):
+    path = tmp_path / name
+    path.write_bytes(b"mmdb")
+
+    def opener(path):
+        reader = FakeReader(dict(records))
+        opened.append(reader)
+        return reader
+    return MMapDatabase(str(path), opener=opener, check_interval=0)
+
+
+# Поля городской базы и базы ASN объединяются, повторный запрос берётся из кэша
+def test_lookup_merges_and_caches(tmp_path):
+    opened = []
+    resolver = GeoIPResolver([
+        fake_database(tmp_path, "city.mmdb", {"203.0.113.7": CITY}, opened),
+        fake_database(tmp_path, "asn.mmdb", {"203.0.113.7": ASN}, opened),
+    ], cache_size=2)
+    expected = {"country_code": "RU", "country": "Russia", "city": "Yekaterinburg",
+                "asn": 12345, "as_org": "Example Net"}
+    assert resolver.lookup("203.0.113.7") == expected
+    assert resolver.lookup("203.0.113.7") == expected
+    assert [reader.calls for reader in opened] == [1, 1]
+    assert resolver.lookup("10.0.0.1") is None
+    assert resolver.lookup("not-an-ip") is None
+    # LRU ограничен двумя адресами: первый уже вытеснен
+    assert [reader.calls for reader in opened] == [3, 2]
+    resolver.lookup("203.0.113.7")
+    assert [reader.calls for reader in opened] == [4, 3]
+
+
+# Заменённый файл открывается заново, кэш сбрасывается
+def test_reload_on_replace(tmp_path):
+    opened = []
+    database = fake_database(tmp_path, "city.mmdb", {"203.0.113.7": CITY}, opened)
+    resolver = GeoIPResolver([database])
+    assert resolver.lookup("203.0.113.7")["city"] == "Yekaterinburg"
+    assert resolver.lookup("203.0.113.7")["city"] == "Yekaterinburg"
+    assert len(opened) == 1
+
+    replacement = tmp_path / "city.mmdb.new"
+    replacement.write_bytes(b"mmdb v2")
+    os.replace(replacement, database.path)
+    assert resolver.lookup("203.0.113.7")["city"] == "Yekaterinburg"
+    assert len(opened) == 2 and database.generation == 2
+    assert opened[1].calls == 1
+
+
+# Ошибка открытия не сбрасывает работающий читатель
+def test_failed_reload_keeps_reader(tmp_path):
+    opened = []
+    database = fake_database(tmp_path, "city.mmdb", {"203.0.113.7": CITY}, opened)
+    database.refresh()
+    database.opener = lambda path: (_ for _ in ()).throw(OSError("corrupt"))
+    (tmp_path / "city.mmdb").write_bytes(b"broken file")
+    assert database.refresh() is False
+    assert database.get("203.0.113.7") == CITY
+
+
+# Маршрут дополняет ответ местоположением в обоих режимах ответов
+def test_client_info_geo(tmp_path, monkeypatch):
+    database = fake_database(tmp_path, "city.mmdb", {"testclient": CITY}, [])
+    monkeypatch.setattr(main, "geoip", GeoIPResolver([database]))
+    client = TestClient(main.app)
+    bodies = []
+    for compact in (False, True):
+        monkeypatch.setattr(settings, "COMPACT_RESPONSES", compact)
+        response = client.get("/info/client")
+        assert response.json()["geo"] == {"country_code": "RU", "country": "Russia",
+                                          "city": "Yekaterinburg", "asn": None, "as_org": None}
+        bodies.append(response.content)
+    assert bodies[0] == bodies[1]
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from health import HealthMonitor, LoopLagProbe
+
+client = TestClient(main.app)
+
+
+# Проверка живости отвечает постоянным телом
+def test_live():
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+# Готовность отдаётся из результата фонового прогона проверок
+def test_ready_reflects_last_run(monkeypatch):
+    monitor = HealthMonitor()
+    monkeypatch.setattr(main, "health_monitor", monitor)
+    assert client.get("/health/ready").status_code == 503
+
+    monitor.add_check("database", main.check_database)
+    monitor.run_checks()
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["checks"]["database"]["ok"]
+
+    def broken():
+        raise RuntimeError("нет соединения")
+
+    monitor.add_check("broken", broken)
+    monitor.run_checks()
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["broken"] == {
+        "ok": False, "detail": "нет соединения", "duration_ms": pytest.approx(0, abs=50),
+    }
+
+
+# Блокировка цикла событий обнаруживается по задержке планирования
+def test_loop_lag_probe_detects_blocking():
+    async def scenario():
+        probe = LoopLagProbe(interval=0.01)
+        probe.start()
+        await asyncio.sleep(0.05)
+        assert "задержка" in probe.check(max_lag=0.5)
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        with pytest.raises(RuntimeError):
+            probe.check(max_lag=0.05)
+        await probe.stop()
+
+    asyncio.run(scenario())
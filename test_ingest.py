@@ -0,0 +1,138 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from db_backends import BackendRegistry, SQLiteBackend
+from deadlines import Deadline
+from ingest import IngestError, Ingestor, LineSplitter
+
+HEADERS = {"X-Debug-Token": "secret"}
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "ingest.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL, price REAL DEFAULT 0)")
+    conn.close()
+    registry = BackendRegistry([SQLiteBackend("main", path, pool_size=1)])
+    yield path, registry
+    registry.close()
+
+
+async def chunked(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*), COALESCE(SUM(price), 0) FROM items").fetchone()
+    finally:
+        conn.close()
+
+
+# Строки собираются из произвольно нарезанных кусков, хвост без перевода строки не теряется
+def test_line_splitter():
+    splitter = LineSplitter(max_line_bytes=16)
+    lines = list(splitter.feed(b'{"a":1}\n{"a"')) + list(splitter.feed(b':2}\n{"a":3}'))
+    assert lines + list(splitter.finish()) == [b'{"a":1}', b'{"a":2}', b'{"a":3}']
+    with pytest.raises(IngestError):
+        list(splitter.feed(b"x" * 17))
+
+
+# Неверные строки пропускаются с номером и причиной, остальные вставляются порциями
+def test_ingest_batches_and_rejects(database):
+    path, registry = database
+    lines = [json.dumps({"name": f"item-{i}", "price": 1.5}) for i in range(10)]
+    lines += ['{"price": 2}', "not json", '{"name": "x", "color": "red"}', '{"name": ["x"]}', '{"name": "last"}']
+    data = ("\n".join(lines) + "\n").encode()
+    ingestor = Ingestor(registry)
+    job = asyncio.run(ingestor.ingest(chunked(data, 7), "items", batch_size=4, commit_interval=60))
+    summary = job.summary()
+    assert summary["status"] == "done"
+    assert (summary["rows"], summary["rejected"], summary["batches"]) == (11, 4, 3)
+    assert [error["line"] for error in summary["errors"]] == [11, 12, 13, 14]
+    assert count_rows(path) == (11, 15.0)
+    assert ingestor.list()[0]["id"] == job.id
+    # Соединение вернулось в пул загрузок, пул хранилища не тронут
+    assert ingestor._pool(registry.primary).stats()["in_use"] == 0
+    assert registry.primary.pool.stats()["open"] == 0
+    ingestor.close()
+
+
+# Пока загрузка держит соединение, проверка хранилища получает своё
+def test_ingest_does_not_starve_backend_pool(database):
+    path, registry = database
+    ingestor = Ingestor(registry, pool_size=1)
+
+    async def scenario():
+        released = asyncio.Event()
+
+        async def body():
+            yield b'{"name": "a"}\n'
+            await released.wait()
+
+        task = asyncio.create_task(ingestor.ingest(body(), "items", batch_size=1, commit_interval=60))
+        await asyncio.sleep(0.05)
+        version = registry.primary.probe(Deadline(0.5))
+        released.set()
+        await task
+        return version
+
+    assert asyncio.run(scenario()) == sqlite3.sqlite_version
+    ingestor.close()
+
+
+# Целое вне диапазона SQLite отклоняется как ошибка строки, загрузка продолжается
+def test_ingest_rejects_out_of_range_integers(database):
+    path, registry = database
+    data = (
+        b'{"name": "big", "price": 99999999999999999999999}\n'
+        b'{"name": "min", "price": -9223372036854775808}\n'
+        b'{"name": "low", "price": -9223372036854775809}\n'
+    )
+    ingestor = Ingestor(registry)
+    summary = asyncio.run(ingestor.ingest(chunked(data, 64), "items")).summary()
+    assert summary["status"] == "done"
+    assert (summary["rows"], summary["rejected"]) == (1, 2)
+    assert [error["line"] for error in summary["errors"]] == [1, 3]
+    assert "64-битного" in summary["errors"][0]["error"]
+    assert count_rows(path)[0] == 1
+    ingestor.close()
+
+
+# Ошибка SQLite откатывает незафиксированную транзакцию
+def test_ingest_rolls_back_on_error(database):
+    path, registry = database
+    data = b'{"id": 1, "name": "a"}\n{"id": 1, "name": "duplicate"}\n'
+    ingestor = Ingestor(registry)
+    with pytest.raises(IngestError):
+        asyncio.run(ingestor.ingest(chunked(data, 64), "items", batch_size=1, commit_interval=60))
+    assert count_rows(path)[0] == 0
+    assert ingestor.list()[0]["status"] == "failed"
+
+
+# Маршрут принимает тело потоком; неизвестная таблица — 404
+def test_ingest_endpoint(database, monkeypatch):
+    path, registry = database
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "secret")
+    monkeypatch.setattr(main, "ingestor", Ingestor(registry))
+    client = TestClient(main.app)
+
+    body = "".join(json.dumps({"name": f"item-{i}", "price": i}) + "\n" for i in range(50))
+    response = client.post("/db/ingest/items?batch_size=20", content=body, headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json()["rows"] == 50
+    assert response.json()["batches"] == 3
+    assert count_rows(path) == (50, 1225.0)
+
+    assert client.post("/db/ingest/missing", content=body, headers=HEADERS).status_code == 404
+    assert client.post("/db/ingest/items", content=body).status_code == 403
+    assert client.get("/db/ingest/jobs", headers=HEADERS).json()[0]["table"] == "items"
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import main
+import settings
+from loop_monitor import LoopMonitor, request_context
+from metrics import REGISTRY
+
+client = TestClient(main.app)
+
+
+def lag_count():
+    return REGISTRY.collect().get(("event_loop_lag_seconds_count", ()), 0.0)
+
+
+def blocking_handler():
+    time.sleep(0.15)
+
+
+# Каждый замер попадает в гистограмму, а блокировка — в журнал со стеком
+def test_detects_blocking_call(caplog):
+    async def scenario():
+        monitor = LoopMonitor(interval=0.01, threshold=0.05, cooldown=0)
+        before = lag_count()
+        monitor.start()
+        await asyncio.sleep(0.05)
+        assert lag_count() > before
+        blocking_handler()
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+        return monitor
+
+    with caplog.at_level(logging.WARNING, logger="loop_monitor"):
+        monitor = asyncio.run(scenario())
+    assert len(monitor.reports) == 1
+    report = monitor.reports[0]
+    assert report["blocked_ms"] >= 50
+    assert "blocking_handler" in "".join(report["stack"])
+    assert report["request"] is None
+    assert "blocking_handler" in caplog.text
+
+
+# Повторная блокировка в пределах паузы считается, но стек не снимается
+def test_cooldown_suppresses_reports():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05, cooldown=60)
+    monitor._loop_thread = threading.get_ident()
+    monitor.last_beat = time.monotonic() - 1
+    assert monitor.inspect() is not None
+    assert monitor.inspect() is None
+    monitor.last_beat = time.monotonic() - 1
+    assert monitor.inspect() is None
+    assert len(monitor.reports) == 1
+
+
+# Контекст запроса берётся из локальных переменных кадров стека
+def test_request_context():
+    def endpoint(request):
+        return request_context(sys._getframe())
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/info/server", "query_string": b"",
+        "headers": [], "client": ("10.0.0.1", 5000), "server": ("test", 80), "scheme": "http",
+    }
+    assert endpoint(Request(scope)) == {"method": "GET", "path": "/info/server", "client": "10.0.0.1"}
+    assert request_context(sys._getframe()) is None
+
+
+# Отчёты о блокировках доступны только с токеном отладки
+def test_blocks_endpoint(monkeypatch):
+    monitor = LoopMonitor()
+    monitor.reports.append({"blocked_ms": 120.0, "request": None, "stack": []})
+    monkeypatch.setattr(main, "loop_lag_probe", monitor)
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "secret")
+    assert client.get("/debug/loop/blocks").status_code == 403
+    response = client.get("/debug/loop/blocks", headers={"X-Debug-Token": "secret"})
+    assert response.json()[0]["blocked_ms"] == 120.0
@@ -0,0 +1,59 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from memory_debug import MemoryTracer, open_sqlite_connections
+
+client = TestClient(main.app)
+HEADERS = {"X-Debug-Token": "secret"}
+
+
+@pytest.fixture
+def debug_token(monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "secret")
+    yield
+    main.memory_tracer.stop()
+
+
+# Незакрытые соединения видны в счётчике, закрытые — нет
+def test_open_sqlite_connections(tmp_path):
+    before = open_sqlite_connections()
+    conn = sqlite3.connect(str(tmp_path / "leak.db"))
+    assert open_sqlite_connections() == before + 1
+    conn.close()
+    assert open_sqlite_connections() == before
+
+
+# Сравнение снимков показывает строку, где выделялась память
+def test_snapshot_diff_points_at_allocation():
+    tracer = MemoryTracer()
+    tracer.start()
+    try:
+        tracer.take("before")
+        leaked = [bytearray(1024) for _ in range(200)]  # noqa: F841
+        tracer.take("after")
+        top = tracer.diff("before", "after", limit=5)
+        assert top[0]["file"] == __file__
+        assert top[0]["size_diff"] >= 200 * 1024
+        by_file = tracer.diff("before", "after", group_by="filename", limit=5)
+        assert by_file[0]["line"] is None
+    finally:
+        tracer.stop()
+
+
+# Маршруты памяти: запуск, снимки, сравнение и счётчики ресурсов
+def test_memory_endpoints(debug_token):
+    assert client.post("/debug/memory/snapshots/a", headers=HEADERS).status_code == 409
+    assert client.post("/debug/memory/start", headers=HEADERS).json()["tracing"]
+    assert client.post("/debug/memory/snapshots/a", headers=HEADERS).status_code == 200
+    response = client.get("/debug/memory/diff", params={"base": "a"}, headers=HEADERS)
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+    assert client.get("/debug/memory/diff", params={"base": "missing"}, headers=HEADERS).status_code == 404
+
+    resources = client.get("/debug/memory/resources", headers=HEADERS).json()
+    assert resources["sqlite_connections"] >= 0
+    assert resources["open_fds"] > 0
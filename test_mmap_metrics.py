@@ -0,0 +1,132 @@
+import os
+import subprocess
+import sys
+
+from metrics import Registry
+from mmap_metrics import ARCHIVE_FILE, FILE_PATTERN, USED, MMapStore, read_file, write_file
+
+CHILD = """
+import sys
+from metrics import Registry
+from mmap_metrics import MMapStore
+registry = Registry(MMapStore(sys.argv[1]))
+registry.counter("jobs", "jobs", ("kind",)).labels("a").inc(5)
+registry.gauge("workers_busy", "busy").set(2)
+registry.histogram("latency", "latency", buckets=(0.1, 1.0)).observe(0.5)
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+# Живой процесс без значений: по его файлу видно, что запуск продолжается
+IDLE_CHILD = """
+import sys
+from mmap_metrics import MMapStore
+store = MMapStore(sys.argv[1])
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def spawn(script, directory):
+    child = subprocess.Popen(
+        [sys.executable, "-c", script, directory],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    assert child.stdout.readline().strip() == "ready"
+    return child
+
+
+def dead_pid():
+    return int(subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True).stdout)
+
+
+# Значения пишутся в файл процесса и читаются оттуда же без процесса-владельца
+def test_store_roundtrip(tmp_path):
+    store = MMapStore(str(tmp_path))
+    store.inc(("requests_total", (("route", "/"),)), 2)
+    store.inc(("requests_total", (("route", "/"),)))
+    store.set(("temperature", ()), 36.6)
+    # Много ключей — файл растёт за начальный размер
+    for i in range(3000):
+        store.inc((f"sample_{i}", (("label", "значение"),)))
+    assert store.get(("requests_total", (("route", "/"),))) == 3.0
+    path = tmp_path / FILE_PATTERN.format(pid=os.getpid())
+    assert os.path.getsize(path) > 64 * 1024
+    assert read_file(str(path)) == store.snapshot()
+    store.close()
+    assert not path.exists()
+
+
+# /metrics сводит процессы: счётчики и гистограммы суммируются, датчики — по процессам
+def test_merged_render_across_processes(tmp_path):
+    child = spawn(CHILD, str(tmp_path))
+    try:
+        registry = Registry(MMapStore(str(tmp_path)))
+        registry.counter("jobs", "jobs", ("kind",)).labels("a").inc(1)
+        registry.gauge("workers_busy", "busy").set(1)
+        registry.histogram("latency", "latency", buckets=(0.1, 1.0)).observe(0.05)
+        output = registry.render()
+        assert 'jobs_total{kind="a"} 6' in output
+        assert f'workers_busy{{worker="{child.pid}"}} 2' in output
+        assert f'workers_busy{{worker="{os.getpid()}"}} 1' in output
+        assert 'latency_bucket{le="0.1"} 1' in output
+        assert 'latency_bucket{le="1"} 2' in output
+        assert "latency_count 2" in output
+    finally:
+        child.communicate("")
+    # Завершившийся процесс убрал свой файл, а его счётчики остались в сумме
+    assert not (tmp_path / FILE_PATTERN.format(pid=child.pid)).exists()
+    output = registry.render()
+    assert 'jobs_total{kind="a"} 6' in output
+    assert "latency_count 2" in output
+    assert str(child.pid) not in output
+    registry.store.close()
+
+
+# Файлы процессов, умерших без очистки, переносятся в архив при запуске следующего
+def test_dead_worker_files_archived(tmp_path):
+    child = spawn(IDLE_CHILD, str(tmp_path))
+    try:
+        path = tmp_path / FILE_PATTERN.format(pid=dead_pid())
+        write_file(str(path), {("jobs_total", (("kind", "a"),)): 4.0, ("workers_busy", ()): 3.0})
+        registry = Registry(MMapStore(str(tmp_path)))
+        registry.counter("jobs", "jobs", ("kind",)).labels("a").inc(1)
+        registry.gauge("workers_busy", "busy").set(1)
+        assert not path.exists()
+        assert read_file(str(tmp_path / ARCHIVE_FILE))[("jobs_total", (("kind", "a"),))] == 4.0
+        output = registry.render()
+        assert 'jobs_total{kind="a"} 5' in output
+        assert f'workers_busy{{worker="{os.getpid()}"}} 1' in output
+        assert "archive" not in output
+        # Собственные значения при выходе тоже уходят в архив
+        registry.store.close()
+        assert read_file(str(tmp_path / ARCHIVE_FILE))[("jobs_total", (("kind", "a"),))] == 5.0
+    finally:
+        child.communicate("")
+
+
+# Первый процесс нового запуска очищает каталог вместе с архивом
+def test_first_process_clears_directory(tmp_path):
+    stale = tmp_path / FILE_PATTERN.format(pid=dead_pid())
+    write_file(str(stale), {("jobs_total", ()): 4.0})
+    write_file(str(tmp_path / ARCHIVE_FILE), {("jobs_total", ()): 10.0})
+    store = MMapStore(str(tmp_path))
+    assert not stale.exists()
+    assert not (tmp_path / ARCHIVE_FILE).exists()
+    assert (tmp_path / FILE_PATTERN.format(pid=os.getpid())).exists()
+    assert dict(store.snapshots()) == {str(os.getpid()): {}}
+    store.close()
+
+
+# Занятый размер за концом отображения и оборванная запись не ломают чтение
+def test_read_file_clamps_to_mapping(tmp_path):
+    path = str(tmp_path / "values.db")
+    write_file(path, {("a_total", ()): 1.0, ("b_total", ()): 2.0})
+    size = os.path.getsize(path)
+    with open(path, "r+b") as file:
+        file.write(USED.pack(size + 4096))
+    assert read_file(path) == {("a_total", ()): 1.0, ("b_total", ()): 2.0}
+    with open(path, "r+b") as file:
+        file.truncate(size - 4)
+    assert read_file(path) == {("a_total", ()): 1.0}
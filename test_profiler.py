@@ -0,0 +1,51 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from profiler import SamplingProfiler
+
+client = TestClient(main.app)
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+# Профилировщик видит стеки других потоков
+def test_profiler_samples_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    profiler = SamplingProfiler(interval=0.002).start()
+    time.sleep(0.1)
+    profile = profiler.stop()
+    stop.set()
+    worker.join()
+
+    assert profile.sample_count > 0
+    collapsed = profile.collapsed()
+    assert any(line.startswith("busy-worker;") and "busy_loop" in line for line in collapsed.splitlines())
+
+    speedscope = profile.speedscope()
+    names = {frame["name"] for frame in speedscope["shared"]["frames"]}
+    assert "busy_loop" in names
+    assert "busy-worker" in {profile["name"] for profile in speedscope["profiles"]}
+
+
+# Маршрут профилирования закрыт токеном и допускает одно профилирование за раз
+def test_profile_endpoint_guarded(monkeypatch):
+    assert client.get("/debug/profile").status_code == 404
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "secret")
+    assert client.get("/debug/profile", headers={"X-Debug-Token": "wrong"}).status_code == 403
+
+    headers = {"X-Debug-Token": "secret"}
+    response = client.get("/debug/profile", params={"seconds": 0.05, "format": "speedscope"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["profiles"]
+
+    with main.profile_lock:
+        assert client.get("/debug/profile", params={"seconds": 0.05}, headers=headers).status_code == 409
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from request_profiler import ProfileStore, RequestProfileMiddleware, current_profile
+
+client = TestClient(main.app)
+
+
+# Без заголовка X-Profile профиль не создаётся
+def test_no_profile_without_header(monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "secret")
+    response = client.get("/info/server")
+    assert "X-Profile-Id" not in response.headers
+    response = client.get("/info/server", headers={"X-Profile": "wrong"})
+    assert "X-Profile-Id" not in response.headers
+
+
+# Профиль запроса включает рабочий поток синхронного обработчика
+def test_profile_covers_threadpool_hop(monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "secret")
+
+    @main.app.get("/test/slow-sync", include_in_schema=False)
+    def slow_sync_handler():
+        assert current_profile.get() is not None
+        deadline = time.monotonic() + 0.05
+        while time.monotonic() < deadline:
+            pass
+        return {"ok": True}
+
+    try:
+        response = client.get("/test/slow-sync", headers={"X-Profile": "secret"})
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+    finally:
+        main.app.router.routes.pop()
+
+    headers = {"X-Debug-Token": "secret"}
+    listed = client.get("/debug/profile/requests", headers=headers).json()
+    assert listed[0]["id"] == profile_id
+    assert listed[0]["path"] == "/test/slow-sync"
+
+    response = client.get(f"/debug/profile/requests/{profile_id}", headers=headers)
+    assert response.status_code == 200
+    assert "attachment" in response.headers["Content-Disposition"]
+    assert "slow_sync_handler" in response.text
+    assert client.get("/debug/profile/requests/missing", headers=headers).status_code == 404
+
+
+# Без заголовка слой не проверяет токен и передаёт исходные receive и send
+def test_middleware_passes_through_without_header():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append((receive, send))
+
+    async def receive():
+        pass
+
+    async def send(message):
+        pass
+
+    def authorize(token):
+        raise AssertionError("токен не должен проверяться")
+
+    middleware = RequestProfileMiddleware(app, ProfileStore(), authorize, lambda: 0.01)
+    asyncio.run(middleware({"type": "http", "headers": []}, receive, send))
+    assert calls == [(receive, send)]
@@ -0,0 +1,79 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from server_timing import ServerTimingMiddleware, ServerTimings, phase
+from swr_cache import SWRCache
+
+client = TestClient(main.app)
+
+
+def parse(header):
+    phases = {}
+    for item in header.split(", "):
+        name, _, duration = item.partition(";dur=")
+        phases[name] = float(duration)
+    return phases
+
+
+# Без настройки заголовка нет, а точки замера ничего не делают
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_TIMING", False)
+    assert "server-timing" not in client.get("/info/server").headers
+    with phase("handler") as measured:
+        pass
+    assert not hasattr(measured, "timings")
+
+
+# Синхронный маршрут: ожидание пула, обработчик и сериализация
+def test_sync_route_phases(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_TIMING", True)
+    phases = parse(client.get("/info/server").headers["server-timing"])
+    assert list(phases) == ["middleware", "locale", "threadpool-wait", "handler", "serialize", "total"]
+    assert all(duration >= 0 for duration in phases.values())
+    assert phases["total"] >= phases["handler"] + phases["threadpool-wait"]
+
+
+# Асинхронный маршрут с хранилищем: соединение и запрос
+def test_database_phases(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_TIMING", True)
+    monkeypatch.setattr(main, "database_info_cache", SWRCache("database_info", main.fetch_database_info))
+    phases = parse(client.get("/info/database").headers["server-timing"])
+    assert {"handler", "db-connect", "db-query", "serialize", "total"} <= set(phases)
+    assert "threadpool-wait" not in phases
+
+
+# Сериализация и middleware выводятся из времени маршрута и общего времени
+def test_finish_derives_phases():
+    timings = ServerTimings()
+    timings.add("locale", 1_000)
+    timings.add("route", 10_000)
+    timings.add("threadpool-wait", 2_000)
+    timings.add("handler", 5_000)
+    timings.finish(15_000)
+    assert timings.durations["serialize"] == 3_000
+    assert timings.durations["middleware"] == 4_000
+    assert timings.header() == (
+        "middleware;dur=0.004, locale;dur=0.001, threadpool-wait;dur=0.002, "
+        "handler;dur=0.005, serialize;dur=0.003, total;dur=0.015"
+    )
+
+
+# Выключенный слой передаёт приложению исходные receive и send
+def test_disabled_middleware_passes_through():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append((receive, send))
+
+    async def receive():
+        pass
+
+    async def send(message):
+        pass
+
+    middleware = ServerTimingMiddleware(app, enabled=lambda: False)
+    asyncio.run(middleware({"type": "http"}, receive, send))
+    assert calls == [(receive, send)]
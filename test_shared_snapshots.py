@@ -0,0 +1,123 @@
+import asyncio
+import subprocess
+import sys
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from access_log import AccessLogWriter
+from shared_snapshots import SEQ, SharedSnapshots, SnapshotSegment
+
+
+@pytest.fixture
+def prefix():
+    prefix = f"test-snapshots-{uuid.uuid4().hex[:8]}"
+    yield prefix
+    for key in ("server", "database", "value"):
+        try:
+            SnapshotSegment.attach(f"{prefix}-{key}").unlink()
+        except FileNotFoundError:
+            pass
+
+
+def make_store(prefix, tmp_path, **kwargs):
+    return SharedSnapshots(prefix, str(tmp_path / "snapshots.lock"), **kwargs)
+
+
+# Запись и чтение под seqlock; незавершённая запись не читается
+def test_segment_seqlock(prefix):
+    segment = SnapshotSegment.create(f"{prefix}-value", 64)
+    assert segment.read() is None
+    segment.publish(b'{"a":1}')
+    assert segment.read()[0] == b'{"a":1}'
+    with pytest.raises(ValueError):
+        segment.publish(b"x" * 65)
+    # Писатель умер посреди записи: счётчик нечётный
+    SEQ.pack_into(segment.segment.buf, 0, 3)
+    assert segment.read() is None
+    segment.publish(b'{"a":2}')
+    assert SEQ.unpack_from(segment.segment.buf, 0)[0] % 2 == 0
+    assert segment.read()[0] == b'{"a":2}'
+    segment.close()
+
+
+# Ведущий один; ведомый читает его снимки, а после его остановки сам становится ведущим
+def test_leadership_and_failover(prefix, tmp_path):
+    leader = make_store(prefix, tmp_path)
+    follower = make_store(prefix, tmp_path)
+    for store in (leader, follower):
+        store.add("value", lambda store=store: asyncio.sleep(0, f"pid-{id(store)}".encode()))
+
+    async def scenario():
+        assert leader.try_lead() and not follower.try_lead()
+        assert follower.read("value") is None
+        await leader.refresh()
+        assert follower.read("value") == f"pid-{id(leader)}".encode()
+        await leader.stop()
+        assert follower.try_lead()
+        await follower.refresh()
+        assert follower.read("value") == f"pid-{id(follower)}".encode()
+        await follower.stop()
+
+    asyncio.run(scenario())
+
+
+# Другой процесс читает те же байты; устаревший снимок не отдаётся
+def test_cross_process_and_max_age(prefix, tmp_path):
+    store = make_store(prefix, tmp_path)
+    store.add("value", lambda: asyncio.sleep(0, b"shared bytes"))
+    assert store.try_lead()
+    asyncio.run(store.refresh())
+    code = (
+        "import sys; from shared_snapshots import SnapshotSegment; "
+        f"sys.stdout.write(SnapshotSegment.attach('{prefix}-value').read()[0].decode())"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert output.stdout == "shared bytes"
+    assert "leaked" not in output.stderr
+
+    reader = make_store(prefix, tmp_path, max_age=0)
+    assert reader.read("value") is None
+    asyncio.run(store.stop())
+
+
+# Маршруты отдают опубликованные снимки как есть
+def test_routes_serve_snapshots(prefix, tmp_path, monkeypatch):
+    store = make_store(prefix, tmp_path)
+    store.add("server", main.server_info_snapshot)
+    store.add("database", main.database_info_snapshot)
+    assert store.try_lead()
+    asyncio.run(store.refresh())
+    monkeypatch.setattr(main, "shared_snapshots", store)
+    monkeypatch.setattr(settings, "SHARED_SNAPSHOTS", True)
+    client = TestClient(main.app)
+    server = client.get("/info/server")
+    assert server.content == store.read("server")
+    assert set(server.json()) == {"python_version", "system", "server_time"}
+    database = client.get("/info/database")
+    assert database.headers["X-Cache"] == "shared"
+    assert database.json()["database"] == "SQLite"
+    asyncio.run(store.stop())
+
+
+# Ошибка фоновой задачи журналируется и повторяется, а остановка сервера
+# с недоступным файлом блокировки доходит до остальных подсистем
+def test_failing_lock_path_does_not_break_shutdown(prefix, tmp_path, monkeypatch, caplog):
+    store = SharedSnapshots(prefix, str(tmp_path / "missing" / "x.lock"), interval=0.01)
+    store.add("value", lambda: asyncio.sleep(0, b"{}"))
+    monkeypatch.setattr(settings, "SHARED_SNAPSHOTS", True)
+    monkeypatch.setattr(main, "shared_snapshots", store)
+    monkeypatch.setattr(main, "access_log", AccessLogWriter(str(tmp_path / "access.db"), flush_interval=0.01))
+    with TestClient(main.app) as client:
+        assert client.get("/health/live").status_code == 200
+        time.sleep(0.05)
+        assert not store._task.done()
+    assert "Общие снимки не обновлены" in caplog.text
+    assert store._task is None and not store.leader
+    assert not main.access_log.running
+    assert not main.system_sampler.running
+    assert not main.health_monitor.running
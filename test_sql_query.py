@@ -0,0 +1,91 @@
+import json
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import settings
+from db_backends import BackendRegistry, SQLiteBackend
+from sql_query import QueryError, ReadOnlyQueries, connect_read_only
+
+HEADERS = {"X-Debug-Token": "secret"}
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "query.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO items (name) VALUES (?)", [(f"item-{i}",) for i in range(25)])
+    conn.commit()
+    conn.close()
+    registry = BackendRegistry([SQLiteBackend("main", path)])
+    queries = ReadOnlyQueries(registry, pool_size=1)
+    yield path, queries
+    queries.close()
+    registry.close()
+
+
+# Строки выбираются порциями, соединение возвращается в пул
+def test_stream_in_batches(database):
+    path, queries = database
+    stream = queries.execute("SELECT id, name FROM items ORDER BY id", batch_size=10)
+    assert [len(rows) for rows in stream.batches()] == [10, 10, 5]
+    # Пул из одного соединения: повторный запрос получает то же соединение
+    stream = queries.execute("SELECT id, name FROM items ORDER BY id", batch_size=10)
+    assert stream.columns == ["id", "name"]
+    stream.close()
+
+
+# Запись запрещена авторизатором и режимом только для чтения
+def test_writes_are_denied(database):
+    path, queries = database
+    for sql in ("DELETE FROM items", "INSERT INTO items (name) VALUES ('x')",
+                "CREATE TABLE t (x)", "ATTACH DATABASE ':memory:' AS other", "PRAGMA journal_mode=DELETE"):
+        with pytest.raises(QueryError):
+            queries.execute(sql)
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 25
+    conn.close()
+
+
+# Символы ?, # и % в пути экранируются и не снимают mode=ro
+def test_connect_read_only_escapes_path(tmp_path):
+    directory = tmp_path / "a?b#c%41"
+    directory.mkdir()
+    path = str(directory / "data.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x)")
+    conn.close()
+    conn = connect_read_only(path, 16)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        # Без авторизатора и query_only запись останавливает только mode=ro
+        conn.set_authorizer(None)
+        conn.execute("PRAGMA query_only = OFF")
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("CREATE TABLE u (x)")
+    finally:
+        conn.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a?b#c%41"]
+
+
+# Маршрут отдаёт NDJSON и CSV, ошибки запроса — 400 до начала ответа
+def test_query_endpoint(database, monkeypatch):
+    path, queries = database
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "secret")
+    monkeypatch.setattr(main, "read_only_queries", queries)
+    client = TestClient(main.app)
+
+    body = {"sql": "SELECT id, name FROM items WHERE id <= ? ORDER BY id", "params": [3]}
+    response = client.post("/db/query", json=body, headers=HEADERS)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"id": 1, "name": "item-0"}, {"id": 2, "name": "item-1"}, {"id": 3, "name": "item-2"}]
+
+    response = client.post("/db/query", json=dict(body, format="csv", max_rows=2), headers=HEADERS)
+    assert response.text.splitlines() == ["id,name", "1,item-0", "2,item-1"]
+
+    response = client.post("/db/query", json={"sql": "DROP TABLE items"}, headers=HEADERS)
+    assert response.status_code == 400
@@ -0,0 +1,76 @@
+import sqlite3
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from access_log import AccessLogWriter, AccessRecord
+from stats import RollupSink, StatsReader, percentile
+
+NOW = 1_700_000_000
+
+
+def write_records(path, records):
+    writer = AccessLogWriter(path)
+    writer.sinks.append(RollupSink())
+    writer.open()
+    writer.write_batch(records)
+    writer.close()
+
+
+def record(route, status, latency_ms, client_ip="10.0.0.1", locale="ru-RU,ru;q=0.9", ts=NOW):
+    return AccessRecord(ts, "GET", route, status, latency_ms, client_ip, "pytest", locale)
+
+
+# Агрегаты обновляются вместе с пачкой и суммируются между пачками
+def test_rollups_accumulate(tmp_path):
+    path = str(tmp_path / "stats.db")
+    write_records(path, [record("/", 200, 3.0), record("/", 500, 40.0, client_ip="10.0.0.2")])
+    write_records(path, [record("/", 404, 7.0, locale="en-US")])
+    reader = StatsReader(path)
+
+    [routes] = reader.routes(3600, now=NOW + 10)
+    assert routes["requests"] == 3
+    assert routes["client_errors"] == 1
+    assert routes["server_errors"] == 1
+    assert routes["max_latency_ms"] == 40.0
+
+    clients = reader.clients(3600, now=NOW + 10)
+    assert clients[0] == {"client_ip": "10.0.0.1", "requests": 2, "errors": 1}
+
+    locales = {row["locale"]: row["requests"] for row in reader.locales(3600, now=NOW + 10)}
+    assert locales == {"ru": 2, "en": 1}
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM access_rollup WHERE resolution = 60").fetchone()[0] == 2
+    conn.close()
+
+
+# Длинные окна читаются из часовых агрегатов
+def test_long_window_uses_hourly_rollups(tmp_path):
+    path = str(tmp_path / "stats.db")
+    write_records(path, [record("/", 200, 3.0, ts=NOW - 20 * 3600)])
+    reader = StatsReader(path)
+    assert reader.routes(3600, now=NOW) == []
+    assert reader.routes(24 * 3600, now=NOW)[0]["requests"] == 1
+    assert reader.locales(24 * 3600, now=NOW)[0]["resolution"] == 3600
+
+
+# Перцентиль интерполируется внутри бакета гистограммы
+def test_percentile_interpolates():
+    # 10 запросов в бакете (5, 10] мс
+    assert percentile({3: 10}, 0.5) == 7.5
+    assert percentile({}, 0.5) is None
+
+
+# Маршрут /stats/latency отдаёт перцентили по маршрутам
+def test_latency_endpoint(tmp_path, monkeypatch):
+    path = str(tmp_path / "stats.db")
+    write_records(path, [record("/info/server", 200, 3.0, ts=time.time())])
+    monkeypatch.setattr(main, "stats_reader", StatsReader(path))
+    response = TestClient(main.app).get("/stats/latency", params={"window": 600})
+    assert response.status_code == 200
+    [latency] = response.json()
+    assert latency["route"] == "/info/server"
+    assert latency["requests"] == 1
+    assert 2.0 <= latency["p50_ms"] <= 5.0
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from deadlines import Deadline, DeadlineExceeded
+from swr_cache import FALLBACK, FRESH, MISS, STALE, CircuitBreaker, CircuitOpen, SWRCache
+
+
+class Provider:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("хранилище недоступно")
+        return {"version": self.calls}
+
+
+# Одновременные промахи ждут одно вычисление
+def test_single_flight():
+    provider = Provider(delay=0.05)
+    cache = SWRCache("test", provider, ttl=10)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get() for _ in range(20)))
+
+    results = asyncio.run(scenario())
+    assert provider.calls == 1
+    assert {result for _, result in results} == {MISS}
+    assert asyncio.run(cache.get()) == ({"version": 1}, FRESH)
+
+
+# Устаревшее значение отдаётся сразу, обновление идёт в фоне
+def test_stale_while_revalidate():
+    provider = Provider(delay=0.01)
+    cache = SWRCache("test", provider, ttl=0, stale_ttl=60)
+
+    async def scenario():
+        await cache.get()
+        value, result = await cache.get()
+        assert (value, result) == ({"version": 1}, STALE)
+        await asyncio.sleep(0.05)
+        return cache.value
+
+    assert asyncio.run(scenario()) == {"version": 2}
+    assert provider.calls == 2
+
+
+# При отказах — последнее удачное значение; предохранитель перестаёт звать поставщика
+def test_fallback_and_circuit_breaker():
+    provider = Provider()
+    breaker = CircuitBreaker(threshold=2, reset_timeout=60)
+    cache = SWRCache("test", provider, ttl=0, stale_ttl=0, breaker=breaker)
+
+    async def scenario():
+        await cache.get()
+        provider.fail = True
+        assert await cache.get() == ({"version": 1}, FALLBACK)
+        assert await cache.get() == ({"version": 1}, FALLBACK)
+        assert breaker.state == "open"
+        calls = provider.calls
+        assert await cache.get() == ({"version": 1}, FALLBACK)
+        assert provider.calls == calls
+        # Пробная попытка после паузы замыкает предохранитель
+        breaker.opened_at -= 60
+        provider.fail = False
+        value, result = await cache.get()
+        assert result == MISS and breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+# Без удачного значения ошибка всплывает, а ожидание ограничено сроком запроса
+def test_errors_without_value():
+    provider = Provider()
+    provider.fail = True
+    cache = SWRCache("test", provider, breaker=CircuitBreaker(threshold=1, reset_timeout=60))
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get())
+    with pytest.raises(CircuitOpen):
+        asyncio.run(cache.get())
+
+    slow = SWRCache("slow", Provider(delay=0.5))
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(slow.get(Deadline(0.01)))
+
+
+# Маршрут сообщает результат обращения к кэшу в заголовке
+def test_database_info_cache_header(monkeypatch):
+    monkeypatch.setattr(main, "database_info_cache", SWRCache("database_info", main.fetch_database_info, ttl=60))
+    client = TestClient(main.app)
+    assert client.get("/info/database").headers["X-Cache"] == MISS
+    assert client.get("/info/database").headers["X-Cache"] == FRESH
@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+
+import main
+from system_metrics import SystemSampler
+
+
+# До первого снимка маршрут отвечает 503, не читая /proc на пути запроса
+def test_system_info_without_sample(monkeypatch):
+    monkeypatch.setattr(main, "system_sampler", SystemSampler())
+    response = TestClient(main.app).get("/info/system")
+    assert response.status_code == 503
+
+
+# Маршрут отдаёт последний снимок сборщика
+def test_system_info_from_latest_sample(monkeypatch):
+    sampler = SystemSampler()
+    # Предыдущее показание с нуля: загрузка CPU считается с момента загрузки системы
+    sampler._cpu = (0, 0)
+    sampler.sample_once()
+    monkeypatch.setattr(main, "system_sampler", sampler)
+    response = TestClient(main.app).get("/info/system")
+    assert response.status_code == 200
+    data = response.json()
+    assert data == sampler.latest
+    assert data["memory_total"] > 0
+    assert 0.0 <= data["cpu_percent"] <= 100.0
+    assert len(data["load_average"]) == 3
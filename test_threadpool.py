@@ -0,0 +1,101 @@
+import threading
+import time
+
+import anyio
+import anyio.to_thread
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import threadpool
+from metrics import REGISTRY
+from threadpool import ThreadHopRoute, ThreadPool, ThreadPools
+
+
+def wait_count(pool):
+    return REGISTRY.collect().get(("threadpool_wait_seconds_count", (("pool", pool.name),)), 0.0)
+
+
+# Группа маршрутов выбирается по самому длинному префиксу пути
+def test_pool_for_path():
+    pools = ThreadPools(8, {"/info": 4, "/info/database": 2})
+    assert pools.for_path("/info/database").name == "/info/database"
+    assert pools.for_path("/info/server").name == "/info"
+    assert pools.for_path("/").name == "default"
+    assert set(pools.stats()) == {"default", "/info", "/info/database"}
+
+
+# Размер пула ограничивает одновременные вызовы, ожидание попадает в гистограмму
+def test_pool_limits_concurrency():
+    pool = ThreadPool("test-limit", 1)
+    active = []
+    peak = []
+
+    def work():
+        active.append(1)
+        peak.append(len(active))
+        time.sleep(0.05)
+        active.pop()
+
+    async def scenario():
+        before = wait_count(pool)
+        async with anyio.create_task_group() as group:
+            for _ in range(3):
+                group.start_soon(pool.run, work, (), {})
+        return wait_count(pool) - before
+
+    assert anyio.run(scenario) == 3
+    assert max(peak) == 1
+    assert pool.stats() == {"size": 1, "busy": 0.0, "queued": 0.0}
+
+
+# Вызов, отменённый в очереди, не остаётся в счётчике ожидающих
+def test_cancelled_while_queued():
+    pool = ThreadPool("test-cancel", 1)
+    release = threading.Event()
+
+    async def scenario():
+        async with anyio.create_task_group() as group:
+            group.start_soon(pool.run, release.wait, (), {})
+            await anyio.sleep(0.02)
+            with anyio.move_on_after(0.02):
+                await pool.run(time.sleep, (0,), {})
+            assert pool.queued.value == 0
+            release.set()
+
+    anyio.run(scenario)
+    assert pool.stats()["busy"] == 0
+
+
+# Пул по умолчанию меняет размер общего ограничителя anyio
+def test_default_pool_resizes_anyio_limiter():
+    pool = ThreadPool("default", 7)
+
+    async def scenario():
+        pool.limiter()
+        return anyio.to_thread.current_default_thread_limiter().total_tokens
+
+    assert anyio.run(scenario) == 7
+
+
+# Синхронный маршрут группы выполняется в её пуле
+def test_route_uses_group_pool(monkeypatch):
+    pools = ThreadPools(4, {"/slow": 1})
+    monkeypatch.setattr(threadpool, "thread_pools", pools)
+    app = FastAPI()
+    app.router.route_class = ThreadHopRoute
+
+    @app.get("/slow/report")
+    def slow_report():
+        return {"ok": True}
+
+    @app.get("/fast")
+    def fast():
+        return {"ok": True}
+
+    client = TestClient(app)
+    slow_before = wait_count(pools.groups["/slow"])
+    default_before = wait_count(pools.default)
+    assert client.get("/slow/report").json() == {"ok": True}
+    assert client.get("/fast").json() == {"ok": True}
+    assert wait_count(pools.groups["/slow"]) == slow_before + 1
+    assert wait_count(pools.default) == default_before + 1
@@ -0,0 +1,69 @@
+from fastapi.testclient import TestClient
+
+import main
+from timeseries import HistoryRecorder, RequestMeter, ServerHistory, Tier
+
+
+# Значения агрегируются в слоты своего разрешения
+def test_tier_downsamples_to_minutes():
+    tier = Tier(60, 3)
+    for second in range(120):
+        tier.add(6000 + second, float(second))
+    result = tier.read(180)
+    assert result["timestamps"] == [6000, 6060]
+    assert result["values"] == [29.5, 89.5]
+    assert result["min"] == 0.0
+    assert result["max"] == 119.0
+    assert result["avg"] == 59.5
+
+
+# Буфер фиксированного размера: старые и пропущенные слоты не попадают в окно
+def test_tier_wraps_and_clears_gaps():
+    tier = Tier(1, 4)
+    for ts in range(10):
+        tier.add(ts, float(ts))
+    assert tier.read(100)["timestamps"] == [6, 7, 8, 9]
+    tier.add(12, 12.0)
+    result = tier.read(4)
+    assert result["timestamps"] == [9, 12]
+    assert result["min"] == 9.0
+    assert len(tier.sums) == 4
+
+
+# Окно отсчитывается от текущего времени: после простоя старые значения не видны
+def test_tier_window_anchored_at_now():
+    tier = Tier(1, 600)
+    for ts in range(1000, 1010):
+        tier.add(ts, float(ts))
+    assert tier.read(60, now=4600)["timestamps"] == []
+    assert tier.read(60, now=4600)["avg"] is None
+    assert tier.read(5, now=1012)["timestamps"] == [1008, 1009]
+    assert tier.read(60, now=1009)["timestamps"] == list(range(1000, 1010))
+
+
+# Слушатель сборщика переводит счётчики запросов в частоту и среднюю задержку
+def test_recorder_computes_request_rate():
+    history = ServerHistory(("cpu_percent", "request_rate", "latency_ms"))
+    meter = RequestMeter()
+    recorder = HistoryRecorder(history, meter)
+    sample = {"cpu_percent": 10.0, "memory_used_percent": 50.0}
+    recorder(dict(sample, sampled_at=100.0))
+    for latency_ms in (10.0, 30.0):
+        meter.record(latency_ms)
+    recorder(dict(sample, sampled_at=102.0))
+    series = history.read(1, 600)
+    assert series["request_rate"]["values"] == [1.0]
+    assert series["latency_ms"]["values"] == [20.0]
+    assert series["cpu_percent"]["timestamps"] == [100, 102]
+
+
+# Маршрут /info/server/history отдаёт выбранные метрики и проверяет разрешение
+def test_history_endpoint(monkeypatch):
+    history = ServerHistory(("cpu_percent", "latency_ms"))
+    history.record(1000.0, {"cpu_percent": 5.0, "latency_ms": 2.0})
+    monkeypatch.setattr(main, "server_history", history)
+    client = TestClient(main.app)
+    response = client.get("/info/server/history", params={"resolution": 60, "metrics": "cpu_percent"})
+    assert response.status_code == 200
+    assert list(response.json()["series"]) == ["cpu_percent"]
+    assert client.get("/info/server/history", params={"resolution": 5}).status_code == 422
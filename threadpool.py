@@ -0,0 +1,188 @@
+import functools
+import inspect
+import time
+
+import anyio
+import anyio.to_thread
+from anyio.lowlevel import RunVar
+from fastapi.routing import APIRoute
+
+from metrics import REGISTRY
+from server_timing import current_timings, phase
+
+# Переход синхронных обработчиков в пул потоков.
+# FastAPI сам отправляет синхронные обработчики в пул; здесь этот переход
+# выполняется явно, чтобы подсистемы могли наблюдать за ним из рабочего потока,
+# а размер пула, отдельные пулы групп маршрутов и ожидание потока были видны
+# в настройках и метриках.
+
+# Наблюдатели с методами enter() -> токен и exit(токен), вызываемые в рабочем
+# потоке вокруг обработчика; контекстные переменные запроса им доступны
+worker_observers = []
+
+DEFAULT_POOL = "default"
+
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+threads_total = REGISTRY.gauge("threadpool_threads", "Размер пула потоков", ("pool",))
+threads_busy = REGISTRY.gauge("threadpool_threads_busy", "Потоки пула, занятые обработчиками", ("pool",))
+tasks_queued = REGISTRY.gauge("threadpool_queued", "Вызовы, ожидающие свободного потока", ("pool",))
+queue_wait = REGISTRY.histogram(
+    "threadpool_wait_seconds", "Ожидание свободного потока", ("pool",), buckets=WAIT_BUCKETS
+)
+
+
+def _call_in_worker(endpoint, args, kwargs):
+    if not worker_observers:
+        return endpoint(*args, **kwargs)
+    tokens = [observer.enter() for observer in worker_observers]
+    try:
+        return endpoint(*args, **kwargs)
+    finally:
+        for observer, token in zip(worker_observers, tokens):
+            observer.exit(token)
+
+
+def _claim(ticket):
+    # Ожидание в очереди снимается ровно один раз: либо рабочим потоком,
+    # либо циклом событий, если вызов отменён до получения потока
+    try:
+        ticket.pop()
+    except IndexError:
+        return False
+    return True
+
+
+class ThreadPool:
+    """Ограничитель потоков с метриками ожидания и занятости.
+
+    Ограничитель anyio привязан к циклу событий, поэтому создаётся при
+    первом вызове в цикле (RunVar). Пул "default" — общий ограничитель anyio,
+    которым пользуется и сам FastAPI; его размер меняется на заданный.
+    """
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self._limiter = RunVar(f"threadpool_{name}")
+        self.busy = threads_busy.labels(name)
+        self.queued = tasks_queued.labels(name)
+        self.wait = queue_wait.labels(name)
+        threads_total.labels(name).set(size)
+
+    def limiter(self):
+        try:
+            return self._limiter.get()
+        except LookupError:
+            pass
+        if self.name == DEFAULT_POOL:
+            limiter = anyio.to_thread.current_default_thread_limiter()
+            limiter.total_tokens = self.size
+        else:
+            limiter = anyio.CapacityLimiter(self.size)
+        self._limiter.set(limiter)
+        return limiter
+
+    def stats(self):
+        return {"size": self.size, "busy": self.busy.value, "queued": self.queued.value}
+
+    async def run(self, func, args, kwargs, abandon_on_cancel=False, handler=False):
+        """Вызвать функцию в потоке пула; у обработчиков (`handler`) ожидание
+        и выполнение попадают в фазы Server-Timing."""
+        ticket = [True]
+        self.queued.inc()
+        try:
+            return await anyio.to_thread.run_sync(
+                self._run_in_worker, ticket, time.perf_counter_ns(), handler, func, args, kwargs,
+                abandon_on_cancel=abandon_on_cancel,
+                limiter=self.limiter(),
+            )
+        finally:
+            if _claim(ticket):
+                self.queued.dec()
+
+    def _run_in_worker(self, ticket, submitted, handler, func, args, kwargs):
+        started = time.perf_counter_ns()
+        if _claim(ticket):
+            self.queued.dec()
+        self.wait.observe((started - submitted) / 1e9)
+        timings = current_timings.get() if handler else None
+        self.busy.inc()
+        try:
+            if timings is None:
+                return _call_in_worker(func, args, kwargs)
+            timings.add("threadpool-wait", started - submitted)
+            try:
+                return _call_in_worker(func, args, kwargs)
+            finally:
+                timings.add("handler", time.perf_counter_ns() - started)
+        finally:
+            self.busy.dec()
+
+
+class ThreadPools:
+    """Пул по умолчанию и отдельные пулы групп маршрутов по префиксу пути."""
+
+    def __init__(self, default_size=40, groups=None):
+        self.configure(default_size, groups)
+
+    def configure(self, default_size, groups=None):
+        """Задать размеры пулов; вызывается до объявления маршрутов."""
+        self.default = ThreadPool(DEFAULT_POOL, default_size)
+        self.groups = {prefix: ThreadPool(prefix, size) for prefix, size in (groups or {}).items()}
+        # Самый длинный префикс проверяется первым
+        self._prefixes = sorted(self.groups, key=len, reverse=True)
+
+    def for_path(self, path):
+        for prefix in self._prefixes:
+            if path.startswith(prefix):
+                return self.groups[prefix]
+        return self.default
+
+    def stats(self):
+        pools = [self.default, *self.groups.values()]
+        return {pool.name: pool.stats() for pool in pools}
+
+
+thread_pools = ThreadPools()
+
+
+async def run_sync(func, *args, abandon_on_cancel=False):
+    """Выполнить функцию в пуле по умолчанию с теми же наблюдателями, что и обработчики."""
+    return await thread_pools.default.run(func, args, {}, abandon_on_cancel=abandon_on_cancel)
+
+
+def offload(endpoint, pool=None):
+    """Асинхронная обёртка синхронного обработчика с той же сигнатурой."""
+    @functools.wraps(endpoint)
+    async def run_in_worker(*args, **kwargs):
+        return await (pool or thread_pools.default).run(endpoint, args, kwargs, handler=True)
+    return run_in_worker
+
+
+def timed(endpoint):
+    """Обёртка асинхронного обработчика, замеряющая фазу handler."""
+    @functools.wraps(endpoint)
+    async def run_timed(*args, **kwargs):
+        with phase("handler"):
+            return await endpoint(*args, **kwargs)
+    return run_timed
+
+
+class ThreadHopRoute(APIRoute):
+    """Маршрут, отправляющий синхронный обработчик в пул своей группы через `offload`."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = timed(endpoint)
+        else:
+            endpoint = offload(endpoint, thread_pools.for_path(path))
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            with phase("route"):
+                return await handler(request)
+        return timed_handler
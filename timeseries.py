@@ -0,0 +1,172 @@
+import math
+import threading
+from array import array
+
+# История метрик сервера в кольцевых буферах фиксированного размера.
+# Каждый уровень хранит на слот только числа в array (min, max, сумма,
+# количество), поэтому память не зависит от времени работы процесса.
+
+# (разрешение в секундах, число слотов): 1 с за 10 минут и 1 мин за сутки
+DEFAULT_TIERS = ((1, 600), (60, 1440))
+
+
+class Tier:
+    """Кольцевой буфер агрегатов с фиксированным шагом по времени."""
+
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.mins = array("d", [math.inf]) * capacity
+        self.maxs = array("d", [-math.inf]) * capacity
+        self.sums = array("d", [0.0]) * capacity
+        self.counts = array("q", [0]) * capacity
+        self.bucket = None
+
+    def _clear(self, slot):
+        self.mins[slot] = math.inf
+        self.maxs[slot] = -math.inf
+        self.sums[slot] = 0.0
+        self.counts[slot] = 0
+
+    def add(self, ts, value):
+        bucket = int(ts // self.resolution)
+        if self.bucket is None:
+            self.bucket = bucket
+            self._clear(bucket % self.capacity)
+        elif bucket > self.bucket:
+            # Очищаем слоты, пропущенные с прошлого значения (не больше всего буфера)
+            for skipped in range(max(self.bucket + 1, bucket - self.capacity + 1), bucket + 1):
+                self._clear(skipped % self.capacity)
+            self.bucket = bucket
+        elif bucket <= self.bucket - self.capacity:
+            return
+        slot = bucket % self.capacity
+        if value < self.mins[slot]:
+            self.mins[slot] = value
+        if value > self.maxs[slot]:
+            self.maxs[slot] = value
+        self.sums[slot] += value
+        self.counts[slot] += 1
+
+    def _slices(self, last, slots):
+        """Срезы индексов `slots` слотов, заканчивающихся бакетом `last`, по порядку."""
+        end = last % self.capacity + 1
+        start = end - slots
+        if start >= 0:
+            return [slice(start, end)]
+        return [slice(self.capacity + start, self.capacity), slice(0, end)]
+
+    def read(self, window, now=None):
+        """Агрегаты за `window` секунд до `now` (по умолчанию — до последнего значения).
+
+        Слоты после последнего значения не читаются: в них ещё лежат данные
+        прошлого оборота буфера, а за время простоя значений не было.
+        """
+        empty = {"timestamps": [], "values": [], "min": None, "max": None, "avg": None}
+        if self.bucket is None:
+            return empty
+        slots = max(1, min(self.capacity, math.ceil(window / self.resolution)))
+        anchor = self.bucket if now is None else max(self.bucket, int(now // self.resolution))
+        first = anchor - slots + 1
+        last = self.bucket
+        if last < first:
+            return empty
+        parts = self._slices(last, last - first + 1)
+        sums = array("d")
+        counts = array("q")
+        mins = array("d")
+        maxs = array("d")
+        for part in parts:
+            sums += self.sums[part]
+            counts += self.counts[part]
+            mins += self.mins[part]
+            maxs += self.maxs[part]
+        # Агрегаты окна — встроенные min/max/sum по срезам array, без цикла на Python
+        total = sum(counts)
+        timestamps = []
+        values = []
+        for offset, count in enumerate(counts):
+            if count:
+                timestamps.append((first + offset) * self.resolution)
+                values.append(sums[offset] / count)
+        return {
+            "timestamps": timestamps,
+            "values": values,
+            "min": min(mins) if total else None,
+            "max": max(maxs) if total else None,
+            "avg": sum(sums) / total if total else None,
+        }
+
+
+class MetricHistory:
+    def __init__(self, tiers=DEFAULT_TIERS):
+        self.tiers = {resolution: Tier(resolution, capacity) for resolution, capacity in tiers}
+
+    def add(self, ts, value):
+        for tier in self.tiers.values():
+            tier.add(ts, value)
+
+
+class ServerHistory:
+    """История нескольких метрик; пишет один фоновый поток, читают обработчики."""
+
+    def __init__(self, names, tiers=DEFAULT_TIERS):
+        self._lock = threading.Lock()
+        self.metrics = {name: MetricHistory(tiers) for name in names}
+        self.resolutions = tuple(resolution for resolution, _ in tiers)
+
+    def record(self, ts, values):
+        with self._lock:
+            for name, value in values.items():
+                if value is not None and name in self.metrics:
+                    self.metrics[name].add(ts, value)
+
+    def read(self, resolution, window, names=None, now=None):
+        with self._lock:
+            return {
+                name: history.tiers[resolution].read(window, now)
+                for name, history in self.metrics.items()
+                if names is None or name in names
+            }
+
+
+class RequestMeter:
+    """Счётчик запросов и суммарной задержки между тиками сборщика."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._latency_ms = 0.0
+
+    def record(self, latency_ms):
+        with self._lock:
+            self._requests += 1
+            self._latency_ms += latency_ms
+
+    def drain(self):
+        with self._lock:
+            requests, latency_ms = self._requests, self._latency_ms
+            self._requests = 0
+            self._latency_ms = 0.0
+        return requests, latency_ms
+
+
+class HistoryRecorder:
+    """Слушатель SystemSampler: переносит снимок и счётчики запросов в историю."""
+
+    def __init__(self, history, meter):
+        self.history = history
+        self.meter = meter
+        self._last_ts = None
+
+    def __call__(self, sample):
+        ts = sample["sampled_at"]
+        requests, latency_ms = self.meter.drain()
+        elapsed = ts - self._last_ts if self._last_ts is not None else None
+        self._last_ts = ts
+        self.history.record(ts, {
+            "cpu_percent": sample["cpu_percent"],
+            "memory_used_percent": sample["memory_used_percent"],
+            "request_rate": requests / elapsed if elapsed else None,
+            "latency_ms": latency_ms / requests if requests else None,
+        })